@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from db import POOL_SIZE, MAX_OVERFLOW
+from deadlines import is_export
+
+#admission.py limita cuántas peticiones se atienden a la vez en cada worker. Sin límite, una ráfaga llena el
+#threadpool de rutas esperando una conexión del pool de SQLAlchemy hasta que los clientes abandonan, y todo va
+#lento. Con él, como mucho MAX_CONCURRENT peticiones (una por conexión del pool) están dentro de la app; las
+#demás esperan en una cola acotada ordenada por prioridad y, si la cola está llena o la espera se alarga, se
+#responden al momento con 503 y Retry-After (el APIClient del frontend ya reintenta respetando esa cabecera).
+
+MAX_CONCURRENT = POOL_SIZE + MAX_OVERFLOW   #peticiones dentro de la app a la vez
+QUEUE_SIZE = 2 * MAX_CONCURRENT             #peticiones esperando turno; con la cola llena se rechaza
+QUEUE_TIMEOUT = 5                           #segundos máximos de espera en la cola (menos que el timeout del cliente)
+RETRY_AFTER_SECONDS = 1
+
+HIGH, NORMAL, LOW = 0, 1, 2
+PRIORITY_NAMES = {HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+#Máximo de peticiones de cada prioridad dentro de la app a la vez: las exportaciones lentas no pueden ocupar
+#todas las conexiones y dejar sin turno a las lecturas rápidas
+PRIORITY_LIMITS = {HIGH: MAX_CONCURRENT, NORMAL: MAX_CONCURRENT, LOW: max(1, MAX_CONCURRENT // 3)}
+
+#Rutas que no pasan por el límite: salud y métricas (deben responder justo cuando hay saturación),
+#los streams de /events (no usan la base) y la documentación
+EXEMPT_PATHS = ("/health", "/ready", "/metrics", "/events", "/docs", "/redoc", "/openapi.json")
+
+#Prioridad por "MÉTODO /ruta" (la primera que coincide); el resto, NORMAL. Los listados sin limit devuelven
+#el catálogo completo (exportaciones) y van siempre con prioridad LOW.
+ROUTE_PRIORITIES = [
+    (re.compile(r"GET /changes"), HIGH),
+    (re.compile(r"GET /(artists|album|song)/(lookup|batch|by-name/|\d)"), HIGH),
+]
+def _priority(scope) -> int:
+    if is_export(scope):
+        return LOW
+    route = f"{scope['method']} {scope['path']}"
+    for pattern, priority in ROUTE_PRIORITIES:
+        if pattern.match(route):
+            return priority
+    return NORMAL
+
+class AdmissionLimiter:
+    # Vive en el event loop del servidor (el middleware es async), así que no necesita locks
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, queue_size: int = QUEUE_SIZE,
+                 queue_timeout: float = QUEUE_TIMEOUT, priority_limits: Optional[dict] = None):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.priority_limits = priority_limits or PRIORITY_LIMITS
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waiters: list = []        #heap de (prioridad, orden de llegada, future)
+        self._order = itertools.count()
+        self._counts = {name: {"admitted": 0, "queued": 0, "shed": 0} for name in PRIORITY_NAMES.values()}
+        self._shed_reasons = {"queue_full": 0, "timeout": 0, "evicted": 0}
+        self._wait_seconds = 0.0
+        self._max_queued = 0
+
+    def _shed(self, priority: int, reason: str) -> str:
+        self._counts[PRIORITY_NAMES[priority]]["shed"] += 1
+        self._shed_reasons[reason] += 1
+        return reason
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._running.values())
+
+    def _can_enter(self, priority: int) -> bool:
+        return self.in_flight < self.max_concurrent and self._running[priority] < self.priority_limits[priority]
+
+    def _dispatch(self):
+        # Pasa los huecos libres a las peticiones de la cola, por orden de prioridad. Si la primera no puede
+        # entrar (límite de su prioridad) tampoco puede ninguna de las siguientes, que son de su misma prioridad.
+        while self._waiters and self._can_enter(self._waiters[0][0]):
+            priority, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._running[priority] += 1
+                future.set_result(True)
+
+    def _remove(self, entry):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    async def acquire(self, priority: int = NORMAL) -> Optional[str]:
+        # None si la petición puede pasar; si no, el motivo del rechazo
+        counts = self._counts[PRIORITY_NAMES[priority]]
+        #En la cola solo quedan peticiones que no pueden entrar; una nueva pasa si ninguna de las que esperan
+        #tiene su misma prioridad o más
+        if self._can_enter(priority) and not (self._waiters and self._waiters[0][0] <= priority):
+            self._running[priority] += 1
+            counts["admitted"] += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            #Cola llena: se rechaza la petición que menos importa, la nueva o la última en llegar de menor prioridad
+            worst = max(self._waiters, key=lambda waiter: waiter[:2])
+            if worst[0] <= priority:
+                return self._shed(priority, "queue_full")
+            self._remove(worst)
+            worst[2].set_result(False)
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._order), future)
+        heapq.heappush(self._waiters, entry)
+        counts["queued"] += 1
+        self._max_queued = max(self._max_queued, len(self._waiters))
+        started = time.monotonic()
+        try:
+            admitted = await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            return self._shed(priority, "timeout")
+        except asyncio.CancelledError:
+            #El cliente se fue o el servidor se apaga; si ya se le había pasado el turno, se devuelve
+            if future.done() and not future.cancelled() and future.result():
+                self.release(priority)
+            self._remove(entry)
+            raise
+        finally:
+            self._wait_seconds += time.monotonic() - started
+        if not admitted:
+            return self._shed(priority, "evicted")
+        counts["admitted"] += 1
+        return None
+
+    def release(self, priority: int = NORMAL):
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "in_flight_by_priority": {PRIORITY_NAMES[priority]: count for priority, count in self._running.items()},
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "max_queued": self._max_queued,
+            "wait_seconds_total": round(self._wait_seconds, 3),
+            "by_priority": self._counts,
+            "shed_reasons": self._shed_reasons,
+        }
+
+class AdmissionMiddleware:
+    # Middleware ASGI puro: las peticiones rechazadas no llegan a la app ni ocupan un hilo
+    def __init__(self, app, limiter: AdmissionLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+        priority = _priority(scope)
+        rejected = await self.limiter.acquire(priority)
+        if rejected:
+            response = JSONResponse({"detail": "Server busy, retry later", "reason": rejected}, status_code=503,
+                                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(priority)
+
+limiter = AdmissionLimiter()
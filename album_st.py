@@ -1,7 +1,10 @@
 import streamlit as st
 from typing import Dict, List, Any, Optional
 from base_st import CRUDView
-from api_st import APIClient
+from api_st import APIClient, VersionConflictError
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from ui_st import format_duration
 from datetime import date
 
 
@@ -11,39 +14,33 @@ class AlbumView(CRUDView):
     Implementa operaciones CRUD para la entidad Album.
     """
     
-    def __init__(self, api_client: APIClient):
+    def __init__(self, api_client: APIClient, async_client: Optional[AsyncAPIClient] = None,
+                 events: Optional[EventListener] = None):
         """
         Inicializa la vista de álbumes.
         
         Args:
             api_client: Cliente API para interactuar con el backend
+            async_client: Cliente asíncrono opcional para cargar datos en paralelo
+            events: Listener opcional de /events para ver los cambios de otros usuarios
         """
-        super().__init__("Gestión de Álbumes")
-        self.api_client = api_client
+        super().__init__("Gestión de Álbumes", api_client, async_client, events)
     
     def render_list_view(self):
         """Renderiza la vista de listado de álbumes"""
         st.header("Lista de Álbumes")
         
-        # Obtener todos los álbumes
-        albums = self.get_all_items()
+        # Tabla paginada en el servidor: solo se pide la página visible
+        albums = self.display_paginated_table(
+            "albums",
+            ["id", "title", "release_date", "artist_name", "track_count", "total_duration_formatted"],
+            {"id": "ID", "title": "Título", "release_date": "Fecha de Lanzamiento", "artist_id": "Artista",
+             "track_count": "Canciones", "total_duration": "Duración total"},
+            include="artist"
+        )
         
-        # Obtener todos los artistas para mostrar nombres en lugar de IDs
-        artists = self.api_client.get_all_artists()
-        artist_dict = {artist["id"]: artist["stage_name"] for artist in artists}
-        
-        # Añadir nombre de artista a cada álbum
-        for album in albums:
-            album["artist_name"] = artist_dict.get(album["artist_id"], f"Artista ID: {album['artist_id']}")
-        
-        # Mostrar tabla de álbumes
         if albums:
-            self.display_data_table(
-                albums, 
-                ["id", "title", "release_date", "artist_name"]
-            )
-            
-            # Opción para ver canciones de un álbum
+            # Opción para ver canciones de un álbum de la página actual
             st.subheader("Ver canciones por álbum")
             album_ids = [album["id"] for album in albums]
             album_titles = [album["title"] for album in albums]
@@ -52,8 +49,19 @@ class AlbumView(CRUDView):
             selected_album = st.selectbox("Seleccionar álbum", album_titles)
             if selected_album:
                 self.show_album_songs(album_dict[selected_album])
-        else:
-            st.info("No hay álbumes registrados")
+    
+    def prepare_rows(self, resource: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Añade el nombre del artista y la duración formateada a álbumes y canciones"""
+        if resource == "albums":
+            # El artista llega embebido en cada álbum (include="artist"), sin peticiones extra
+            for album in rows:
+                artist = album.get("artist")
+                album["artist_name"] = artist["stage_name"] if artist else f"Artista ID: {album['artist_id']}"
+                album["total_duration_formatted"] = format_duration(album.get("total_duration", 0))
+        elif resource == "songs":
+            for song in rows:
+                song["duration_formatted"] = format_duration(song["duration"])
+        return rows
     
     def show_album_songs(self, album_id: int):
         """
@@ -62,49 +70,37 @@ class AlbumView(CRUDView):
         Args:
             album_id: ID del álbum
         """
-        # Obtener todas las canciones
-        songs = self.api_client.get_all_songs()
-        
-        # Filtrar canciones del álbum seleccionado
-        album_songs = [song for song in songs if song["album_id"] == album_id]
-        
-        if album_songs:
-            st.write(f"Canciones del álbum (Total: {len(album_songs)})")
-            
-            # Formatear duración de segundos a minutos:segundos
-            for song in album_songs:
-                minutes = song["duration"] // 60
-                seconds = song["duration"] % 60
-                song["duration_formatted"] = f"{minutes}:{seconds:02d}"
-            
-            self.display_data_table(album_songs, ["id", "title", "duration_formatted"])
-        else:
-            st.info("Este álbum no tiene canciones registradas")
+        # El filtro por álbum se aplica en el servidor
+        st.write("Canciones del álbum")
+        self.display_paginated_table(
+            "songs",
+            ["id", "title", "duration_formatted"],
+            {"id": "ID", "title": "Título", "duration": "Duración"},
+            filters={"album_id": album_id},
+            key="album_songs"
+        )
     
     def render_create_view(self):
         """Renderiza la vista de creación de álbumes"""
         st.header("Crear Nuevo Álbum")
         
-        # Obtener artistas para el selector
-        artists = self.api_client.get_all_artists()
+        # Selector de artista con búsqueda (fuera del formulario para que busque al escribir)
+        selected_artist = self.select_item("artists", "Artista *", key="create_album_artist")
         
-        if not artists:
-            st.warning("No hay artistas disponibles. Debes crear al menos un artista antes de crear un álbum.")
+        if not selected_artist:
+            # Sin texto de búsqueda no hay resultados solo si el catálogo está vacío;
+            # si el texto no coincide con nada, select_item ya lo indica
+            if not st.session_state.get("create_album_artist_query"):
+                st.warning("No hay artistas disponibles. Debes crear al menos un artista antes de crear un álbum.")
             return
         
         # Formulario para crear álbum
         with st.form("create_album_form"):
             title = st.text_input("Título del Álbum *", help="Campo obligatorio")
             
-            # Selector de artista
-            artist_ids = [artist["id"] for artist in artists]
-            artist_names = [artist["stage_name"] for artist in artists]
-            artist_dict = dict(zip(artist_names, artist_ids))
-            
-            selected_artist = st.selectbox("Artista *", artist_names)
-            
             # Selector de fecha
             release_date = st.date_input("Fecha de Lanzamiento", value=None)
+            confirm_duplicate = st.checkbox("Crear aunque parezca duplicado")
             
             submit_button = st.form_submit_button("Crear Álbum")
             
@@ -113,10 +109,13 @@ class AlbumView(CRUDView):
                     self.display_error_message("El título del álbum es obligatorio")
                     return
                 
+                if not self.check_duplicates("album", title, confirm_duplicate, artist_id=selected_artist["id"]):
+                    return
+                
                 # Crear álbum
                 album_data = {
                     "title": title,
-                    "artist_id": artist_dict[selected_artist],
+                    "artist_id": selected_artist["id"],
                     "release_date": release_date.isoformat() if release_date else None
                 }
                 
@@ -124,33 +123,19 @@ class AlbumView(CRUDView):
                 if result:
                     self.display_success_message(f"Álbum '{title}' creado exitosamente")
                 else:
-                    self.display_error_message("Error al crear el álbum. Puede que ya exista un álbum con ese título.")
+                    self.display_error_message("Error al crear el álbum. Puede que el artista ya tenga un álbum con ese título.")
     
     def render_update_view(self):
         """Renderiza la vista de actualización de álbumes"""
         st.header("Actualizar Álbum")
         
-        # Obtener todos los álbumes
-        albums = self.get_all_items()
+        # Seleccionar álbum a actualizar (búsqueda por prefijo)
+        selected_album = self.select_item("albums", "Seleccionar álbum a actualizar", key="update_album")
         
-        if not albums:
+        if not selected_album:
             st.info("No hay álbumes disponibles para actualizar")
             return
-        
-        # Obtener artistas para el selector
-        artists = self.api_client.get_all_artists()
-        
-        if not artists:
-            st.warning("No hay artistas disponibles.")
-            return
-        
-        # Seleccionar álbum a actualizar
-        album_ids = [album["id"] for album in albums]
-        album_titles = [album["title"] for album in albums]
-        album_dict = dict(zip(album_titles, album_ids))
-        
-        selected_album_title = st.selectbox("Seleccionar álbum a actualizar", album_titles)
-        selected_album_id = album_dict[selected_album_title]
+        selected_album_id = selected_album["id"]
         
         # Obtener datos actuales del álbum
         current_album = self.get_item_by_id(selected_album_id)
@@ -159,22 +144,23 @@ class AlbumView(CRUDView):
             st.error("No se pudo obtener la información del álbum")
             return
         
+        # Selector de artista, con el artista actual preseleccionado
+        current_artist = self.data.get_item("artists", current_album["artist_id"])
+        current_option = {
+            "id": current_album["artist_id"],
+            "label": current_artist["stage_name"] if current_artist else f"Artista ID: {current_album['artist_id']}"
+        }
+        selected_artist = self.select_item("artists", "Artista *", key=f"update_album_artist_{selected_album_id}",
+                                           current=current_option)
+        
+        if not selected_artist:
+            st.warning("No hay artistas disponibles.")
+            return
+        
         # Formulario para actualizar álbum
         with st.form("update_album_form"):
             title = st.text_input("Título del Álbum *", value=current_album["title"])
             
-            # Selector de artista
-            artist_ids = [artist["id"] for artist in artists]
-            artist_names = [artist["stage_name"] for artist in artists]
-            artist_dict = dict(zip(artist_ids, artist_names))
-            
-            # Encontrar el índice del artista actual
-            current_artist_name = artist_dict.get(current_album["artist_id"], artist_names[0])
-            artist_index = artist_names.index(current_artist_name) if current_artist_name in artist_names else 0
-            
-            selected_artist = st.selectbox("Artista *", artist_names, index=artist_index)
-            selected_artist_id = [k for k, v in artist_dict.items() if v == selected_artist][0]
-            
             # Selector de fecha
             release_date_value = None
             if current_album.get("release_date"):
@@ -195,11 +181,15 @@ class AlbumView(CRUDView):
                 # Actualizar álbum
                 album_data = {
                     "title": title,
-                    "artist_id": selected_artist_id,
+                    "artist_id": selected_artist["id"],
                     "release_date": release_date.isoformat() if release_date else None
                 }
                 
-                result = self.update_item(selected_album_id, album_data)
+                try:
+                    result = self.update_item(selected_album_id, album_data, current_album.get("version"))
+                except VersionConflictError:
+                    self.display_version_conflict("albums", selected_album_id)
+                    return
                 if result:
                     self.display_success_message(f"Álbum '{title}' actualizado exitosamente")
                 else:
@@ -209,20 +199,14 @@ class AlbumView(CRUDView):
         """Renderiza la vista de eliminación de álbumes"""
         st.header("Eliminar Álbum")
         
-        # Obtener todos los álbumes
-        albums = self.get_all_items()
+        # Seleccionar álbum a eliminar (búsqueda por prefijo)
+        selected_album = self.select_item("albums", "Seleccionar álbum a eliminar", key="delete_album")
         
-        if not albums:
+        if not selected_album:
             st.info("No hay álbumes disponibles para eliminar")
             return
-        
-        # Seleccionar álbum a eliminar
-        album_ids = [album["id"] for album in albums]
-        album_titles = [album["title"] for album in albums]
-        album_dict = dict(zip(album_titles, album_ids))
-        
-        selected_album_title = st.selectbox("Seleccionar álbum a eliminar", album_titles)
-        selected_album_id = album_dict[selected_album_title]
+        selected_album_id = selected_album["id"]
+        selected_album_title = selected_album["label"]
         
         # Advertencia y confirmación
         st.warning(f"¿Estás seguro de que deseas eliminar el álbum '{selected_album_title}'? Esta acción eliminará también todas las canciones asociadas.")
@@ -236,20 +220,30 @@ class AlbumView(CRUDView):
     
     def get_all_items(self) -> List[Dict[str, Any]]:
         """Obtiene todos los álbumes"""
-        return self.api_client.get_all_albums()
+        return self.data.get_all("albums")
     
     def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Obtiene un álbum por su ID"""
-        return self.api_client.get_album_by_id(item_id)
+        return self.data.get_item("albums", item_id)
     
     def create_item(self, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo álbum"""
-        return self.api_client.create_album(item_data)
+        result = self.api_client.create_album(item_data)
+        if result:
+            self.data.invalidate("albums", "create")
+        return result
     
-    def update_item(self, item_id: int, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza un álbum existente"""
-        return self.api_client.update_album(item_id, item_data)
+    def update_item(self, item_id: int, item_data: Dict[str, Any],
+                    version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza un álbum existente (VersionConflictError si otro lo cambió desde version)"""
+        result = self.api_client.update_album(item_id, item_data, version)
+        if result:
+            self.data.invalidate("albums", "update", item_id)
+        return result
     
     def delete_item(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Elimina un álbum por su ID"""
-        return self.api_client.delete_album(item_id)
+        result = self.api_client.delete_album(item_id)
+        if result:
+            self.data.invalidate("albums", "delete", item_id)
+        return result
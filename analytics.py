@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import Integer, cast, extract, func, select
+from sqlalchemy.orm import Session
+
+from models import Artist, Album, Song
+import services
+
+#analytics.py calcula en la base de datos los resúmenes del catálogo para /analytics/* (GROUP BY y funciones
+#de ventana): solo viajan las filas agregadas, nunca las canciones. Los desgloses por género, país y año
+#usan los acumulados de artist/album (track_count, total_duration), así que no recorren la tabla song.
+#Cada resultado se guarda en memoria junto con la versión del catálogo (último seq de change_log) y se
+#reutiliza mientras no haya escrituras nuevas.
+
+MAX_CACHE_ENTRIES = 256
+MAX_AGE_SECONDS = 600       #también se recalcula pasado este tiempo (cargas directas en la base, sin change_log)
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+def _cached(db: Session, key: tuple, compute):
+    version = services.latest_change_seq(db)
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[0] == version and time.monotonic() - entry[1] < MAX_AGE_SECONDS:
+        return entry[2]
+    result = compute()
+    with _cache_lock:
+        if len(_cache) >= MAX_CACHE_ENTRIES:
+            _cache.clear()
+        _cache[key] = (version, time.monotonic(), result)
+    return result
+
+def _share(count_column):
+    # Porcentaje de cada grupo sobre el total, con una función de ventana sobre el resultado agrupado
+    return func.round(count_column * 100.0 / func.nullif(func.sum(count_column).over(), 0), 2)
+
+#DESGLOSES----------------------------------------------------------
+def songs_by_genre(db: Session) -> list[dict]:
+    def compute():
+        songs = func.sum(Artist.track_count)
+        duration = func.sum(Artist.total_duration)
+        query = (select(Artist.music_genre, func.count(Artist.id).label("artists"), songs.label("songs"),
+                        duration.label("total_duration"), _share(songs).label("share"))
+                 .group_by(Artist.music_genre).order_by(songs.desc(), Artist.music_genre))
+        return [{**row._asdict(), "avg_duration": row.total_duration / row.songs if row.songs else None,
+                 "share": float(row.share) if row.share is not None else None}
+                for row in db.execute(query)]
+    return _cached(db, ("genres",), compute)
+
+def artists_by_country(db: Session) -> list[dict]:
+    def compute():
+        artists = func.count(Artist.id)
+        query = (select(Artist.country_of_origin, artists.label("artists"),
+                        func.sum(Artist.album_count).label("albums"), func.sum(Artist.track_count).label("songs"),
+                        _share(artists).label("share"))
+                 .group_by(Artist.country_of_origin).order_by(artists.desc(), Artist.country_of_origin))
+        return [{**row._asdict(), "share": float(row.share) if row.share is not None else None}
+                for row in db.execute(query)]
+    return _cached(db, ("countries",), compute)
+
+def albums_by_release_year(db: Session) -> list[dict]:
+    def compute():
+        year = cast(extract("year", Album.release_date), Integer)
+        albums = func.count(Album.id)
+        query = (select(year.label("year"), albums.label("albums"), func.sum(Album.track_count).label("songs"),
+                        func.sum(albums).over(order_by=year).label("cumulative_albums"))
+                 .where(Album.release_date.isnot(None))
+                 .group_by(year).order_by(year))
+        return [{"year": row.year, "albums": row.albums, "songs": int(row.songs or 0),
+                 "cumulative_albums": int(row.cumulative_albums)} for row in db.execute(query)]
+    return _cached(db, ("release_years",), compute)
+
+def duration_distribution(db: Session, bucket: int, music_genre: Optional[str] = None) -> dict:
+    # Histograma de duraciones en intervalos de `bucket` segundos, opcionalmente de un solo género
+    def compute():
+        source = select(Song.duration).where(Song.duration.isnot(None))
+        if music_genre is not None:
+            source = source.join(Album, Song.album_id == Album.id).join(Artist, Album.artist_id == Artist.id) \
+                           .where(Artist.music_genre == music_genre)
+        songs = source.subquery()
+        start = (songs.c.duration // bucket) * bucket
+        buckets = select(start.label("start"), func.count().label("songs")).group_by(start).order_by(start)
+        summary = select(func.count(), func.min(songs.c.duration), func.max(songs.c.duration),
+                         func.avg(songs.c.duration))
+        count, shortest, longest, average = db.execute(summary).one()
+        return {
+            "bucket": bucket,
+            "songs": count,
+            "min": shortest,
+            "max": longest,
+            "avg": float(average) if average is not None else None,
+            "buckets": [{"start": row.start, "end": row.start + bucket, "songs": row.songs}
+                        for row in db.execute(buckets)],
+        }
+    return _cached(db, ("durations", bucket, music_genre), compute)
@@ -1,5 +1,79 @@
 import requests
-from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Any, Optional, Tuple
+
+# Tiempo máximo (segundos) para conectar y para leer la respuesta
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 15)
+
+# Tamaño del pool de conexiones keep-alive por host
+POOL_SIZE = 20
+
+# Reintentos acotados (con backoff exponencial) solo para métodos idempotentes
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUS = (502, 503, 504)
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+# Con If-Match un PUT/DELETE ya no es idempotente: si el primer intento se aplicó pero la respuesta
+# se perdió, el reintento recibiría 412. Solo se reintentan si no se llegó a conectar.
+CONDITIONAL_RETRY_METHODS = IDEMPOTENT_METHODS - {"PUT", "DELETE"}
+
+# Ids por petición en las lecturas por lotes (el servidor acepta hasta 200)
+BATCH_SIZE = 100
+
+# Tipos de contenido que se piden en Accept para leer listados como DataFrame
+FRAME_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Rutas de las actualizaciones masivas (PATCH) por entidad
+BULK_PATHS = {"artist": "/artists/bulk", "album": "/album/bulk", "song": "/song/bulk"}
+
+
+def build_session(pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES,
+                  retry_methods: frozenset = IDEMPOTENT_METHODS) -> requests.Session:
+    """
+    Crea una sesión HTTP con pool de conexiones keep-alive y reintentos.
+    
+    Args:
+        pool_size: Número máximo de conexiones reutilizables por host
+        max_retries: Número máximo de reintentos para métodos idempotentes
+        retry_methods: Métodos que se reintentan tras un timeout de lectura o un 502/503/504
+        
+    Returns:
+        requests.Session configurada
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=retry_methods,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class VersionConflictError(Exception):
+    """
+    La entidad cambió en el servidor desde que se leyó (412 Precondition Failed):
+    hay que volver a leerla antes de modificarla o borrarla.
+    """
+    
+    def __init__(self, path: str, current_version: Optional[int] = None):
+        super().__init__(f"{path} fue modificado por otro usuario (versión actual: {current_version})")
+        self.path = path
+        self.current_version = current_version
+
 
 class APIClient:
     """
@@ -7,14 +81,38 @@ class APIClient:
     Implementa métodos para realizar operaciones CRUD en las diferentes entidades.
     """
     
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000",
+                 session: Optional[requests.Session] = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
         """
         Inicializa el cliente API con la URL base.
         
         Args:
             base_url: URL base de la API REST
+            session: Sesión HTTP a reutilizar (por defecto se crea una con pool y reintentos)
+            timeout: Tupla (conexión, lectura) en segundos aplicada a cada petición
         """
-        self.base_url = base_url
+        self.base_url = base_url.rstrip("/")
+        self.session = session or build_session()
+        # Modificaciones y borrados con If-Match, sin reintentos una vez enviados
+        self.conditional_session = build_session(retry_methods=CONDITIONAL_RETRY_METHODS)
+        self.timeout = timeout
+    
+    def _request(self, method: str, path: str, session: Optional[requests.Session] = None,
+                 **kwargs) -> requests.Response:
+        """
+        Realiza una petición usando la sesión compartida y el timeout por defecto.
+        
+        Args:
+            method: Método HTTP
+            path: Ruta relativa a la URL base
+            session: Sesión a usar en lugar de la compartida
+            
+        Returns:
+            Objeto de respuesta de requests
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return (session or self.session).request(method, f"{self.base_url}{path}", **kwargs)
         
     def _handle_response(self, response):
         """
@@ -45,80 +143,318 @@ class APIClient:
             print("Error al procesar la respuesta JSON")
             return None
     
+    def _get_page(self, path: str, params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Obtiene una página de un listado.
+        
+        Args:
+            path: Ruta del listado
+            params: Parámetros de paginación, orden y filtro (se omiten los vacíos)
+            
+        Returns:
+            Tupla (filas de la página, total de filas que cumplen el filtro)
+        """
+        params = {key: value for key, value in params.items() if value not in (None, "")}
+        response = self._request("GET", path, params=params)
+        data = self._handle_response(response)
+        if data is None:
+            return [], 0
+        return data, int(response.headers.get("X-Total-Count", len(data)))
+    
+    def _lookup(self, path: str, q: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Busca por prefijo y devuelve pares {"id", "label"} para los selectores.
+        
+        Args:
+            path: Ruta del endpoint de búsqueda
+            q: Texto con el que empieza el nombre
+            limit: Número máximo de resultados
+        """
+        response = self._request("GET", path, params={"q": q, "limit": limit})
+        return self._handle_response(response) or []
+    
+    def _get_by_ids(self, path: str, ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Obtiene varios elementos por ID usando el endpoint /batch, partiendo la lista
+        en lotes de BATCH_SIZE y eliminando duplicados.
+        
+        Args:
+            path: Ruta del endpoint de lotes
+            ids: IDs a resolver
+            
+        Returns:
+            Elementos encontrados, en el orden de los IDs pedidos
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        items = []
+        for start in range(0, len(unique_ids), BATCH_SIZE):
+            chunk = unique_ids[start:start + BATCH_SIZE]
+            response = self._request("GET", path, params={"ids": ",".join(str(item_id) for item_id in chunk)})
+            items.extend(self._handle_response(response) or [])
+        return items
+    
+    def _write_versioned(self, method: str, path: str, version: Optional[int], **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Modifica o borra solo si la entidad sigue en la versión leída (cabecera If-Match).
+        
+        Args:
+            method: "PUT" o "DELETE"
+            path: Ruta de la entidad
+            version: Versión leída (campo "version"); None para escribir sin comprobarla
+            
+        Returns:
+            Datos de la respuesta o None en caso de error
+            
+        Raises:
+            VersionConflictError: si otro usuario la modificó desde esa versión
+        """
+        if version is None:
+            response = self._request(method, path, **kwargs)
+        else:
+            response = self._request(method, path, session=self.conditional_session,
+                                     headers={"If-Match": f'"{version}"'}, **kwargs)
+        if response.status_code == 412:
+            try:
+                current = response.json().get("version")
+            except ValueError:
+                current = None
+            raise VersionConflictError(path, current)
+        return self._handle_response(response)
+    
+    # Registro de cambios
+    def get_changes(self, since: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene los cambios posteriores al cursor since.
+        
+        Returns:
+            {"changes", "next_cursor", "has_more"} o None si falla
+        """
+        response = self._request("GET", "/changes", params={"since": since, "limit": limit})
+        return self._handle_response(response)
+    
+    def get_latest_change(self) -> Optional[int]:
+        """Obtiene el cursor del último cambio registrado"""
+        response = self._request("GET", "/changes/latest")
+        data = self._handle_response(response)
+        return data["cursor"] if data else None
+    
+    def get_stats(self, name: str, **params) -> Optional[Any]:
+        """
+        Obtiene un resumen agregado del catálogo calculado en el servidor.
+        
+        Args:
+            name: "genres", "countries", "release-years" o "durations"
+            params: Parámetros del resumen (por ejemplo bucket=30 para "durations")
+            
+        Returns:
+            Filas agregadas (o el histograma de duraciones) o None si falla
+        """
+        params = {key: value for key, value in params.items() if value is not None}
+        response = self._request("GET", f"/analytics/{name}", params=params)
+        return self._handle_response(response)
+    
+    def get_frame(self, resource: str, fmt: str = "arrow", **params):
+        """
+        Obtiene un listado como DataFrame de pandas, pidiéndolo en formato de columnas
+        (Arrow o Parquet) para no parsear JSON ni inferir tipos.
+    
+        Args:
+            resource: "artist", "album" o "song"
+            fmt: "arrow" o "parquet"
+            params: Parámetros del listado (skip, limit, sort, order, filtros; se omiten los vacíos)
+    
+        Returns:
+            DataFrame con las columnas de la tabla o None si falla. Si el servidor no tiene
+            pyarrow responde en JSON y el DataFrame se construye a partir de esa respuesta.
+        """
+        import io
+        import pandas as pd
+    
+        params = {key: value for key, value in params.items() if value not in (None, "")}
+        response = self._request("GET", f"/{resource}/", params=params, headers={"Accept": FRAME_FORMATS[fmt]})
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            print(f"Error HTTP: {e}")
+            return None
+        content_type = response.headers.get("Content-Type", "")
+        if content_type.startswith(FRAME_FORMATS["arrow"]):
+            import pyarrow as pa
+            return pa.ipc.open_stream(response.content).read_pandas()
+        if content_type.startswith(FRAME_FORMATS["parquet"]):
+            return pd.read_parquet(io.BytesIO(response.content))
+        data = self._handle_response(response)
+        return pd.DataFrame(data) if data is not None else None
+
+    def run_batch(self, operations: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Aplica varias altas, modificaciones y bajas en una sola transacción (POST /batch).
+
+        Args:
+            operations: Lista de {"op": "create"|"update"|"delete", "entity": "artist"|"album"|"song",
+                        "id", "data"}; "$N" en id, artist_id o album_id se refiere al id de la operación N
+
+        Returns:
+            Resultado de cada operación, o None si alguna falló (en ese caso no se aplica ninguna)
+        """
+        response = self._request("POST", "/batch", json={"operations": operations})
+        data = self._handle_response(response)
+        return data["results"] if data else None
+
+    def bulk_update(self, entity: str, values: Dict[str, Any], **filters) -> Optional[Dict[str, Any]]:
+        """
+        Cambia los mismos campos en todas las filas que cumplen el filtro, con un solo UPDATE.
+
+        Args:
+            entity: "artist", "album" o "song"
+            values: Campos a cambiar (p. ej. {"album_id": 3} o {"music_genre": "Rock"})
+            filters: ids=[...] y/o los filtros del listado (q, artist_id, album_id, music_genre...)
+
+        Returns:
+            {"updated", "ids"} o None si falla
+        """
+        filters = {key: value for key, value in filters.items() if value is not None}
+        response = self._request("PATCH", BULK_PATHS[entity], json={"filter": filters, "set": values})
+        return self._handle_response(response)
+
+    def find_duplicates(self, entity: str, name: str, artist_id: Optional[int] = None,
+                        album_id: Optional[int] = None, exclude_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Busca posibles duplicados de un nombre antes de darlo de alta (acentos, espacios, "feat."...).
+
+        Args:
+            entity: "artist", "album" o "song"
+            name: Nombre artístico o título a comprobar
+            artist_id: Artista del álbum (obligatorio para álbumes)
+            album_id: Álbum de la canción (se compara con las canciones del mismo artista)
+            exclude_id: ID a ignorar (el propio elemento al editarlo)
+
+        Returns:
+            Lista de {"id", "label", "similarity"} de más a menos parecido (vacía si no hay o si falla)
+        """
+        params = {"name": name, "artist_id": artist_id, "album_id": album_id, "exclude_id": exclude_id}
+        params = {key: value for key, value in params.items() if value is not None}
+        response = self._request("GET", f"/duplicates/{entity}", params=params)
+        return self._handle_response(response) or []
+
     # Métodos para Artistas
     def get_all_artists(self) -> List[Dict[str, Any]]:
         """Obtiene todos los artistas"""
-        response = requests.get(f"{self.base_url}/artist/")
+        response = self._request("GET", "/artist/")
         return self._handle_response(response) or []
     
-    def get_artist_by_id(self, artist_id: int) -> Optional[Dict[str, Any]]:
-        """Obtiene un artista por su ID"""
-        response = requests.get(f"{self.base_url}/artists/{artist_id}")
+    def get_artists_page(self, skip: int = 0, limit: int = 50, sort: str = "id", order: str = "asc",
+                         q: Optional[str] = None, music_genre: Optional[str] = None,
+                         country_of_origin: Optional[str] = None,
+                         include: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Obtiene una página de artistas y el total (include: relaciones a embeber, p. ej. "albums")"""
+        return self._get_page("/artist/", {"skip": skip, "limit": limit, "sort": sort, "order": order, "q": q,
+                                           "music_genre": music_genre, "country_of_origin": country_of_origin,
+                                           "include": include})
+    
+    def lookup_artists(self, q: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """Busca artistas cuyo nombre artístico empieza por q"""
+        return self._lookup("/artists/lookup", q, limit)
+    
+    def get_artists_by_ids(self, artist_ids: List[int]) -> List[Dict[str, Any]]:
+        """Obtiene varios artistas por su ID (en lotes)"""
+        return self._get_by_ids("/artists/batch", artist_ids)
+    
+    def get_artist_by_id(self, artist_id: int, include: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Obtiene un artista por su ID (include: relaciones a embeber)"""
+        response = self._request("GET", f"/artists/{artist_id}", params={"include": include} if include else None)
         return self._handle_response(response)
     
     def create_artist(self, artist_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo artista"""
-        response = requests.post(f"{self.base_url}/artist/", json=artist_data)
+        response = self._request("POST", "/artist/", json=artist_data)
         return self._handle_response(response)
     
-    def update_artist(self, artist_id: int, artist_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza un artista existente"""
-        response = requests.put(f"{self.base_url}/artist/{artist_id}", json=artist_data)
-        return self._handle_response(response)
+    def update_artist(self, artist_id: int, artist_data: Dict[str, Any],
+                      version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza un artista existente (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("PUT", f"/artist/{artist_id}", version, json=artist_data)
     
-    def delete_artist(self, artist_id: int) -> Optional[Dict[str, Any]]:
-        """Elimina un artista por su ID"""
-        response = requests.delete(f"{self.base_url}/artists/{artist_id}")
-        return self._handle_response(response)
+    def delete_artist(self, artist_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Elimina un artista por su ID (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("DELETE", f"/artists/{artist_id}", version)
     
     # Métodos para Álbumes
     def get_all_albums(self) -> List[Dict[str, Any]]:
         """Obtiene todos los álbumes"""
-        response = requests.get(f"{self.base_url}/album/")
+        response = self._request("GET", "/album/")
         return self._handle_response(response) or []
     
-    def get_album_by_id(self, album_id: int) -> Optional[Dict[str, Any]]:
-        """Obtiene un álbum por su ID"""
-        response = requests.get(f"{self.base_url}/album/{album_id}")
+    def get_albums_page(self, skip: int = 0, limit: int = 50, sort: str = "id", order: str = "asc",
+                        q: Optional[str] = None, artist_id: Optional[int] = None,
+                        include: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Obtiene una página de álbumes y el total (include: relaciones a embeber, p. ej. "artist")"""
+        return self._get_page("/album/", {"skip": skip, "limit": limit, "sort": sort, "order": order, "q": q,
+                                          "artist_id": artist_id, "include": include})
+    
+    def lookup_albums(self, q: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """Busca álbumes cuyo título empieza por q"""
+        return self._lookup("/album/lookup", q, limit)
+    
+    def get_albums_by_ids(self, album_ids: List[int]) -> List[Dict[str, Any]]:
+        """Obtiene varios álbumes por su ID (en lotes)"""
+        return self._get_by_ids("/album/batch", album_ids)
+    
+    def get_album_by_id(self, album_id: int, include: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Obtiene un álbum por su ID (include: relaciones a embeber)"""
+        response = self._request("GET", f"/album/{album_id}", params={"include": include} if include else None)
         return self._handle_response(response)
     
     def create_album(self, album_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo álbum"""
-        response = requests.post(f"{self.base_url}/album/", json=album_data)
+        response = self._request("POST", "/album/", json=album_data)
         return self._handle_response(response)
     
-    def update_album(self, album_id: int, album_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza un álbum existente"""
-        response = requests.put(f"{self.base_url}/album/{album_id}", json=album_data)
-        return self._handle_response(response)
+    def update_album(self, album_id: int, album_data: Dict[str, Any],
+                     version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza un álbum existente (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("PUT", f"/album/{album_id}", version, json=album_data)
     
-    def delete_album(self, album_id: int) -> Optional[Dict[str, Any]]:
-        """Elimina un álbum por su ID"""
-        response = requests.delete(f"{self.base_url}/album/{album_id}")
-        return self._handle_response(response)
+    def delete_album(self, album_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Elimina un álbum por su ID (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("DELETE", f"/album/{album_id}", version)
     
     # Métodos para Canciones
     def get_all_songs(self) -> List[Dict[str, Any]]:
         """Obtiene todas las canciones"""
-        response = requests.get(f"{self.base_url}/song/")
+        response = self._request("GET", "/song/")
         return self._handle_response(response) or []
     
-    def get_song_by_id(self, song_id: int) -> Optional[Dict[str, Any]]:
-        """Obtiene una canción por su ID"""
-        response = requests.get(f"{self.base_url}/song/{song_id}")
+    def get_songs_page(self, skip: int = 0, limit: int = 50, sort: str = "id", order: str = "asc",
+                       q: Optional[str] = None, album_id: Optional[int] = None,
+                       include: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Obtiene una página de canciones y el total (include: relaciones a embeber, p. ej. "album.artist")"""
+        return self._get_page("/song/", {"skip": skip, "limit": limit, "sort": sort, "order": order, "q": q,
+                                         "album_id": album_id, "include": include})
+    
+    def lookup_songs(self, q: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """Busca canciones cuyo título empieza por q"""
+        return self._lookup("/song/lookup", q, limit)
+    
+    def get_songs_by_ids(self, song_ids: List[int]) -> List[Dict[str, Any]]:
+        """Obtiene varias canciones por su ID (en lotes)"""
+        return self._get_by_ids("/song/batch", song_ids)
+    
+    def get_song_by_id(self, song_id: int, include: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Obtiene una canción por su ID (include: relaciones a embeber)"""
+        response = self._request("GET", f"/song/{song_id}", params={"include": include} if include else None)
         return self._handle_response(response)
     
     def create_song(self, song_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea una nueva canción"""
-        response = requests.post(f"{self.base_url}/song/", json=song_data)
+        response = self._request("POST", "/song/", json=song_data)
         return self._handle_response(response)
     
-    def update_song(self, song_id: int, song_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza una canción existente"""
-        response = requests.put(f"{self.base_url}/song/{song_id}", json=song_data)
-        return self._handle_response(response)
+    def update_song(self, song_id: int, song_data: Dict[str, Any],
+                    version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza una canción existente (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("PUT", f"/song/{song_id}", version, json=song_data)
     
-    def delete_song(self, song_id: int) -> Optional[Dict[str, Any]]:
-        """Elimina una canción por su ID"""
-        response = requests.delete(f"{self.base_url}/song/{song_id}")
-        return self._handle_response(response)
+    def delete_song(self, song_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Elimina una canción por su ID (con version, solo si nadie lo cambió; si no, VersionConflictError)"""
+        return self._write_versioned("DELETE", f"/song/{song_id}", version)
@@ -1,8 +1,31 @@
 import streamlit as st
 from api_st import APIClient
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from data_st import DataStore
 from artist_st import ArtistView
 from album_st import AlbumView
 from song_st import SongView
+from stats_st import StatsView
+
+
+@st.cache_resource(show_spinner=False)
+def get_api_client(api_url: str) -> APIClient:
+    """Devuelve un APIClient compartido entre sesiones para la URL dada"""
+    return APIClient(api_url)
+
+
+@st.cache_resource(show_spinner=False)
+def get_async_api_client(api_url: str) -> AsyncAPIClient:
+    """Devuelve un AsyncAPIClient compartido entre sesiones para la URL dada"""
+    return AsyncAPIClient(api_url)
+
+
+@st.cache_resource(show_spinner=False)
+def get_event_listener(api_url: str) -> EventListener:
+    """Devuelve el EventListener de /events compartido entre sesiones para la URL dada"""
+    return EventListener(api_url)
+
 
 class App:
     """
@@ -17,12 +40,15 @@ class App:
         Args:
             api_url: URL base de la API REST
         """
-        self.api_client = APIClient(api_url)
+        self.api_client = get_api_client(api_url)
+        self.async_client = get_async_api_client(api_url)
+        self.events = get_event_listener(api_url)
         
         # Inicializar componentes
-        self.artist_view = ArtistView(self.api_client)
-        self.album_view = AlbumView(self.api_client)
-        self.song_view = SongView(self.api_client)
+        self.artist_view = ArtistView(self.api_client, self.async_client, self.events)
+        self.album_view = AlbumView(self.api_client, self.async_client, self.events)
+        self.song_view = SongView(self.api_client, self.async_client, self.events)
+        self.stats_view = StatsView(self.api_client, self.async_client, self.events)
         
         # Configurar página
         st.set_page_config(
@@ -47,7 +73,7 @@ class App:
             st.subheader("Navegación")
             page = st.radio(
                 "Selecciona una sección:",
-                ["Inicio", "Artistas", "Álbumes", "Canciones"]
+                ["Inicio", "Artistas", "Álbumes", "Canciones", "Estadísticas"]
             )
             
             # Guardar selección en estado de sesión
@@ -68,6 +94,8 @@ class App:
             self.album_view.render()
         elif page == "Canciones":
             self.song_view.render()
+        elif page == "Estadísticas":
+            self.stats_view.render()
     
     def _render_home(self):
         """Renderiza la página de inicio"""
@@ -81,6 +109,7 @@ class App:
         - **Artistas**: Gestiona la información de los artistas de la disquera
         - **Álbumes**: Administra los álbumes publicados por cada artista
         - **Canciones**: Cataloga las canciones incluidas en cada álbum
+        - **Estadísticas**: Consulta el catálogo por género, país, año de lanzamiento y duración
         
         Utiliza el menú de navegación en la barra lateral para acceder a las diferentes secciones.
         """)
@@ -91,17 +120,17 @@ class App:
         try:
             col1, col2, col3 = st.columns(3)
             
+            # Totales agregados en el servidor (sin descargar los listados)
+            countries = DataStore(self.api_client, self.async_client, events=self.events).get_stats("countries") or []
+            
             with col1:
-                artists = self.api_client.get_all_artists()
-                st.metric("Artistas", len(artists))
+                st.metric("Artistas", sum(row["artists"] for row in countries))
             
             with col2:
-                albums = self.api_client.get_all_albums()
-                st.metric("Álbumes", len(albums))
+                st.metric("Álbumes", sum(row["albums"] for row in countries))
             
             with col3:
-                songs = self.api_client.get_all_songs()
-                st.metric("Canciones", len(songs))
+                st.metric("Canciones", sum(row["songs"] for row in countries))
         
         except Exception as e:
             st.error(f"Error al cargar estadísticas: {str(e)}")
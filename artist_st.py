@@ -1,7 +1,10 @@
 import streamlit as st
 from typing import Dict, List, Any, Optional
 from base_st import CRUDView
-from api_st import APIClient
+from api_st import APIClient, VersionConflictError
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from ui_st import format_duration
 
 class ArtistView(CRUDView):
     """
@@ -9,31 +12,34 @@ class ArtistView(CRUDView):
     Implementa operaciones CRUD para la entidad Artist.
     """
     
-    def __init__(self, api_client: APIClient):
+    def __init__(self, api_client: APIClient, async_client: Optional[AsyncAPIClient] = None,
+                 events: Optional[EventListener] = None):
         """
         Inicializa la vista de artistas.
         
         Args:
             api_client: Cliente API para interactuar con el backend
+            async_client: Cliente asíncrono opcional para cargar datos en paralelo
+            events: Listener opcional de /events para ver los cambios de otros usuarios
         """
-        super().__init__("Gestión de Artistas")
-        self.api_client = api_client
+        super().__init__("Gestión de Artistas", api_client, async_client, events)
     
     def render_list_view(self):
         """Renderiza la vista de listado de artistas"""
         st.header("Lista de Artistas")
         
-        # Obtener todos los artistas
-        artists = self.get_all_items()
+        # Tabla paginada en el servidor: solo se pide la página visible
+        artists = self.display_paginated_table(
+            "artists",
+            ["id", "stage_name", "real_name", "music_genre", "country_of_origin", "email", "instagram_handle",
+             "album_count", "track_count", "last_release_date"],
+            {"id": "ID", "stage_name": "Nombre Artístico", "real_name": "Nombre Real",
+             "music_genre": "Género Musical", "country_of_origin": "País de Origen",
+             "album_count": "Álbumes", "track_count": "Canciones", "last_release_date": "Último Lanzamiento"}
+        )
         
-        # Mostrar tabla de artistas
         if artists:
-            self.display_data_table(
-                artists, 
-                ["id", "stage_name", "real_name", "music_genre", "country_of_origin", "email", "instagram_handle"]
-            )
-            
-            # Opción para ver álbumes de un artista
+            # Opción para ver álbumes de un artista de la página actual
             st.subheader("Ver álbumes por artista")
             artist_ids = [artist["id"] for artist in artists]
             artist_names = [artist["stage_name"] for artist in artists]
@@ -42,8 +48,13 @@ class ArtistView(CRUDView):
             selected_artist = st.selectbox("Seleccionar artista", artist_names)
             if selected_artist:
                 self.show_artist_albums(artist_dict[selected_artist])
-        else:
-            st.info("No hay artistas registrados")
+    
+    def prepare_rows(self, resource: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Añade la duración formateada a las canciones"""
+        if resource == "songs":
+            for song in rows:
+                song["duration_formatted"] = format_duration(song["duration"])
+        return rows
     
     def show_artist_albums(self, artist_id: int):
         """
@@ -52,28 +63,26 @@ class ArtistView(CRUDView):
         Args:
             artist_id: ID del artista
         """
-        # Obtener todos los álbumes
-        albums = self.api_client.get_all_albums()
-        
-        # Filtrar álbumes del artista seleccionado
-        artist_albums = [album for album in albums if album["artist_id"] == artist_id]
+        # El filtro por artista se aplica en el servidor
+        st.write("Álbumes del artista")
+        artist_albums = self.display_paginated_table(
+            "albums",
+            ["id", "title", "release_date", "track_count"],
+            {"id": "ID", "title": "Título", "release_date": "Fecha de Lanzamiento", "track_count": "Canciones"},
+            filters={"artist_id": artist_id},
+            key="artist_albums"
+        )
         
         if artist_albums:
-            st.write(f"Álbumes del artista (Total: {len(artist_albums)})")
-            self.display_data_table(artist_albums, ["id", "title", "release_date"])
-            
             # Opción para ver canciones de un álbum
             st.subheader("Ver canciones por álbum")
             album_ids = [album["id"] for album in artist_albums]
             album_titles = [album["title"] for album in artist_albums]
             album_dict = dict(zip(album_titles, album_ids))
             
-            if album_titles:
-                selected_album = st.selectbox("Seleccionar álbum", album_titles)
-                if selected_album:
-                    self.show_album_songs(album_dict[selected_album])
-        else:
-            st.info("Este artista no tiene álbumes registrados")
+            selected_album = st.selectbox("Seleccionar álbum", album_titles)
+            if selected_album:
+                self.show_album_songs(album_dict[selected_album])
     
     def show_album_songs(self, album_id: int):
         """
@@ -82,24 +91,15 @@ class ArtistView(CRUDView):
         Args:
             album_id: ID del álbum
         """
-        # Obtener todas las canciones
-        songs = self.api_client.get_all_songs()
-        
-        # Filtrar canciones del álbum seleccionado
-        album_songs = [song for song in songs if song["album_id"] == album_id]
-        
-        if album_songs:
-            st.write(f"Canciones del álbum (Total: {len(album_songs)})")
-            
-            # Formatear duración de segundos a minutos:segundos
-            for song in album_songs:
-                minutes = song["duration"] // 60
-                seconds = song["duration"] % 60
-                song["duration_formatted"] = f"{minutes}:{seconds:02d}"
-            
-            self.display_data_table(album_songs, ["id", "title", "duration_formatted"])
-        else:
-            st.info("Este álbum no tiene canciones registradas")
+        # El filtro por álbum se aplica en el servidor
+        st.write("Canciones del álbum")
+        self.display_paginated_table(
+            "songs",
+            ["id", "title", "duration_formatted"],
+            {"id": "ID", "title": "Título", "duration": "Duración"},
+            filters={"album_id": album_id},
+            key="artist_album_songs"
+        )
     
     def render_create_view(self):
         """Renderiza la vista de creación de artistas"""
@@ -113,6 +113,7 @@ class ArtistView(CRUDView):
             country = st.text_input("País de Origen")
             email = st.text_input("Email")
             instagram = st.text_input("Instagram")
+            confirm_duplicate = st.checkbox("Crear aunque parezca duplicado")
             
             submit_button = st.form_submit_button("Crear Artista")
             
@@ -121,6 +122,9 @@ class ArtistView(CRUDView):
                     self.display_error_message("El nombre artístico es obligatorio")
                     return
                 
+                if not self.check_duplicates("artist", stage_name, confirm_duplicate):
+                    return
+                
                 # Crear artista
                 artist_data = {
                     "stage_name": stage_name,
@@ -141,20 +145,13 @@ class ArtistView(CRUDView):
         """Renderiza la vista de actualización de artistas"""
         st.header("Actualizar Artista")
         
-        # Obtener todos los artistas
-        artists = self.get_all_items()
+        # Seleccionar artista a actualizar (búsqueda por prefijo)
+        selected_artist = self.select_item("artists", "Seleccionar artista a actualizar", key="update_artist")
         
-        if not artists:
+        if not selected_artist:
             st.info("No hay artistas disponibles para actualizar")
             return
-        
-        # Seleccionar artista a actualizar
-        artist_ids = [artist["id"] for artist in artists]
-        artist_names = [artist["stage_name"] for artist in artists]
-        artist_dict = dict(zip(artist_names, artist_ids))
-        
-        selected_artist_name = st.selectbox("Seleccionar artista a actualizar", artist_names)
-        selected_artist_id = artist_dict[selected_artist_name]
+        selected_artist_id = selected_artist["id"]
         
         # Obtener datos actuales del artista
         current_artist = self.get_item_by_id(selected_artist_id)
@@ -189,7 +186,11 @@ class ArtistView(CRUDView):
                     "instagram_handle": instagram if instagram else None
                 }
                 
-                result = self.update_item(selected_artist_id, artist_data)
+                try:
+                    result = self.update_item(selected_artist_id, artist_data, current_artist.get("version"))
+                except VersionConflictError:
+                    self.display_version_conflict("artists", selected_artist_id)
+                    return
                 if result:
                     self.display_success_message(f"Artista '{stage_name}' actualizado exitosamente")
                 else:
@@ -199,20 +200,14 @@ class ArtistView(CRUDView):
         """Renderiza la vista de eliminación de artistas"""
         st.header("Eliminar Artista")
         
-        # Obtener todos los artistas
-        artists = self.get_all_items()
+        # Seleccionar artista a eliminar (búsqueda por prefijo)
+        selected_artist = self.select_item("artists", "Seleccionar artista a eliminar", key="delete_artist")
         
-        if not artists:
+        if not selected_artist:
             st.info("No hay artistas disponibles para eliminar")
             return
-        
-        # Seleccionar artista a eliminar
-        artist_ids = [artist["id"] for artist in artists]
-        artist_names = [artist["stage_name"] for artist in artists]
-        artist_dict = dict(zip(artist_names, artist_ids))
-        
-        selected_artist_name = st.selectbox("Seleccionar artista a eliminar", artist_names)
-        selected_artist_id = artist_dict[selected_artist_name]
+        selected_artist_id = selected_artist["id"]
+        selected_artist_name = selected_artist["label"]
         
         # Advertencia y confirmación
         st.warning(f"¿Estás seguro de que deseas eliminar al artista '{selected_artist_name}'? Esta acción eliminará también todos sus álbumes y canciones asociadas.")
@@ -226,20 +221,30 @@ class ArtistView(CRUDView):
     
     def get_all_items(self) -> List[Dict[str, Any]]:
         """Obtiene todos los artistas"""
-        return self.api_client.get_all_artists()
+        return self.data.get_all("artists")
     
     def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Obtiene un artista por su ID"""
-        return self.api_client.get_artist_by_id(item_id)
+        return self.data.get_item("artists", item_id)
     
     def create_item(self, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo artista"""
-        return self.api_client.create_artist(item_data)
+        result = self.api_client.create_artist(item_data)
+        if result:
+            self.data.invalidate("artists", "create")
+        return result
     
-    def update_item(self, item_id: int, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza un artista existente"""
-        return self.api_client.update_artist(item_id, item_data)
+    def update_item(self, item_id: int, item_data: Dict[str, Any],
+                    version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza un artista existente (VersionConflictError si otro lo cambió desde version)"""
+        result = self.api_client.update_artist(item_id, item_data, version)
+        if result:
+            self.data.invalidate("artists", "update", item_id)
+        return result
     
     def delete_item(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Elimina un artista por su ID"""
-        return self.api_client.delete_artist(item_id)
+        result = self.api_client.delete_artist(item_id)
+        if result:
+            self.data.invalidate("artists", "delete", item_id)
+        return result
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import httpx
+from typing import Dict, List, Any, Optional
+
+from api_st import DEFAULT_TIMEOUT, POOL_SIZE
+
+# Rutas de listado de cada recurso, para poder pedirlas por nombre en fetch_many
+RESOURCE_PATHS: Dict[str, str] = {
+    "artists": "/artist/",
+    "albums": "/album/",
+    "songs": "/song/",
+}
+
+
+class AsyncAPIClient:
+    """
+    Variante asíncrona del cliente de la API basada en httpx.
+    Permite lanzar varias peticiones independientes en paralelo, de modo que
+    una página que necesita varios recursos tarda lo que la petición más lenta
+    y no la suma de todas.
+
+    Streamlit ejecuta los scripts de forma síncrona, así que el cliente mantiene
+    su propio event loop en un hilo de fondo. El httpx.AsyncClient vive en ese
+    loop, por lo que su pool de conexiones se comparte entre reruns y sesiones.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000",
+                 pool_size: int = POOL_SIZE,
+                 timeout: tuple = DEFAULT_TIMEOUT):
+        """
+        Inicializa el cliente asíncrono con la URL base.
+
+        Args:
+            base_url: URL base de la API REST
+            pool_size: Número máximo de conexiones simultáneas (y keep-alive)
+            timeout: Tupla (conexión, lectura) en segundos
+        """
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Arranca (una sola vez) el event loop de fondo y el cliente httpx"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-api-client", daemon=True)
+                thread.start()
+                connect, read = self.timeout
+                self._client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    timeout=httpx.Timeout(read, connect=connect),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                    transport=httpx.AsyncHTTPTransport(retries=1),
+                )
+                self._loop = loop
+            return self._loop
+
+    def _run(self, coro):
+        """Ejecuta una corrutina en el loop de fondo y espera su resultado"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def _get(self, path: str) -> Any:
+        """
+        Realiza un GET y devuelve el JSON, o None en caso de error.
+
+        Args:
+            path: Ruta relativa a la URL base
+        """
+        try:
+            response = await self._client.get(path)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            print(f"Error HTTP: {e}")
+        except httpx.TimeoutException:
+            print("Error de tiempo de espera: La solicitud tomó demasiado tiempo")
+        except httpx.HTTPError as e:
+            print(f"Error en la solicitud: {e}")
+        except ValueError:
+            print("Error al procesar la respuesta JSON")
+        return None
+
+    async def _gather(self, paths: List[str]) -> List[Any]:
+        return await asyncio.gather(*(self._get(path) for path in paths))
+
+    def fetch_many(self, *resources: str) -> List[Any]:
+        """
+        Obtiene varios recursos en paralelo.
+
+        Args:
+            resources: Nombres de recurso ("artists", "albums", "songs") o rutas
+                relativas (por ejemplo "/album/3")
+
+        Returns:
+            Lista con la respuesta de cada recurso, en el mismo orden. Los
+            listados fallidos se devuelven como lista vacía y el resto como None.
+        """
+        paths = [RESOURCE_PATHS.get(resource, resource) for resource in resources]
+        results = self._run(self._gather(paths))
+        return [
+            ([] if result is None else result) if resource in RESOURCE_PATHS else result
+            for resource, result in zip(resources, results)
+        ]
+
+    def close(self):
+        """Cierra el cliente httpx y detiene el loop de fondo"""
+        if self._loop is None:
+            return
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._client = None
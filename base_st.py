@@ -1,42 +1,56 @@
 import streamlit as st
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Callable, TypeVar, Generic
+from data_st import DataStore
 
 T = TypeVar('T')
 
+# Tamaños de página disponibles en las tablas paginadas
+PAGE_SIZES = [25, 50, 100]
+
 class CRUDView(Generic[T], ABC):
     """
     Clase base abstracta para vistas CRUD en Streamlit.
     Define la estructura común y métodos que deben implementar todas las vistas CRUD.
     """
     
-    def __init__(self, title: str):
+    def __init__(self, title: str, api_client=None, async_client=None, events=None):
         """
         Inicializa la vista CRUD con un título.
         
         Args:
             title: Título de la vista
+            api_client: Cliente API para interactuar con el backend
+            async_client: Cliente asíncrono opcional para cargar datos en paralelo
+            events: Listener opcional de /events para ver los cambios de otros usuarios
         """
         self.title = title
+        self.api_client = api_client
+        self.async_client = async_client
+        self.data = DataStore(api_client, async_client, events=events)
     
     def render(self):
         """Renderiza la vista completa"""
         st.title(self.title)
         
-        # Tabs para las diferentes operaciones CRUD
-        tab_list, tab_create, tab_update, tab_delete = st.tabs(["Listar", "Crear", "Actualizar", "Eliminar"])
+        # Selector de operación CRUD. A diferencia de st.tabs, que ejecuta el cuerpo de
+        # todas las pestañas en cada rerun, aquí solo se renderiza (y se piden datos para)
+        # la operación seleccionada. La selección se conserva en session_state.
+        renderers = {
+            "Listar": self.render_list_view,
+            "Crear": self.render_create_view,
+            "Actualizar": self.render_update_view,
+            "Eliminar": self.render_delete_view,
+        }
+        operation = st.radio(
+            "Operación",
+            list(renderers),
+            horizontal=True,
+            label_visibility="collapsed",
+            key=f"{type(self).__name__}_operation",
+        )
         
-        with tab_list:
-            self.render_list_view()
-            
-        with tab_create:
-            self.render_create_view()
-            
-        with tab_update:
-            self.render_update_view()
-            
-        with tab_delete:
-            self.render_delete_view()
+        renderers[operation]()
     
     @abstractmethod
     def render_list_view(self):
@@ -74,8 +88,9 @@ class CRUDView(Generic[T], ABC):
         pass
     
     @abstractmethod
-    def update_item(self, item_id: int, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza un elemento existente"""
+    def update_item(self, item_id: int, item_data: Dict[str, Any],
+                    version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza un elemento existente (solo si sigue en la versión leída)"""
         pass
     
     @abstractmethod
@@ -83,6 +98,20 @@ class CRUDView(Generic[T], ABC):
         """Elimina un elemento por su ID"""
         pass
     
+    def fetch_many(self, *resources: str) -> List[Any]:
+        """
+        Obtiene varios listados a la vez ("artists", "albums", "songs") a través
+        de la capa de datos de la sesión. Los que no están en caché se piden en
+        paralelo si la vista tiene un cliente asíncrono.
+        
+        Args:
+            resources: Nombres de los recursos a obtener
+            
+        Returns:
+            Lista con los datos de cada recurso, en el mismo orden
+        """
+        return self.data.get_many(*resources)
+    
     def display_success_message(self, message: str):
         """Muestra un mensaje de éxito"""
         st.success(message)
@@ -95,6 +124,138 @@ class CRUDView(Generic[T], ABC):
         """Muestra un mensaje informativo"""
         st.info(message)
     
+    def check_duplicates(self, entity: str, name: str, confirmed: bool, **scope) -> bool:
+        """
+        Antes de crear, avisa si ya hay nombres casi iguales (acentos, espacios,
+        "feat."...) y pide marcar la casilla de confirmación para continuar.
+        
+        Args:
+            entity: "artist", "album" o "song"
+            name: Nombre o título que se va a crear
+            confirmed: Si el usuario marcó "Crear aunque parezca duplicado"
+            scope: artist_id (álbumes) o album_id (canciones)
+            
+        Returns:
+            True si se puede crear
+        """
+        if confirmed:
+            return True
+        matches = self.api_client.find_duplicates(entity, name, **scope)
+        if not matches:
+            return True
+        listing = ", ".join(f"'{match['label']}' (ID {match['id']})" for match in matches)
+        st.warning(f"Ya existe algo muy parecido: {listing}. "
+                   "Si de verdad es distinto, marca 'Crear aunque parezca duplicado' y vuelve a enviar.")
+        return False
+    
+    def display_version_conflict(self, resource: str, item_id: int):
+        """
+        Avisa de que otro usuario modificó el elemento mientras se editaba y
+        descarta la copia en caché para que el formulario muestre sus datos actuales.
+        
+        Args:
+            resource: Recurso editado ("artists", "albums", "songs")
+            item_id: ID del elemento
+        """
+        self.data.invalidate(resource, "update", item_id)
+        st.warning("Otro usuario modificó este elemento mientras lo editabas y no se guardaron tus cambios. "
+                   "Revisa sus datos actuales y vuelve a guardar.")
+    
+    def select_item(self, resource: str, label: str, key: str,
+                    current: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Selector con búsqueda por prefijo: en lugar de cargar todos los elementos,
+        se piden a la API solo los primeros que empiezan por el texto escrito.
+        
+        Args:
+            resource: Recurso a buscar ("artists", "albums", "songs")
+            label: Etiqueta del selector
+            key: Prefijo para las claves de los widgets
+            current: Opción {"id", "label"} preseleccionada (por ejemplo el valor actual)
+            
+        Returns:
+            Opción elegida {"id", "label"} o None si no hay resultados
+        """
+        query = st.text_input(
+            f"Buscar: {label}",
+            key=f"{key}_query",
+            placeholder="Escribe el inicio del nombre y pulsa Enter"
+        )
+        options = self.data.lookup(resource, query)
+        if current and not query and all(option["id"] != current["id"] for option in options):
+            options.insert(0, current)
+        elif current:
+            options.sort(key=lambda option: option["id"] != current["id"])
+        
+        if not options:
+            if query:
+                st.info(f"No se encontraron resultados para '{query}'")
+            return None
+        
+        return st.selectbox(label, options, format_func=lambda option: option["label"], key=f"{key}_select")
+    
+    def prepare_rows(self, resource: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Permite a cada vista añadir columnas derivadas (nombres, duración formateada...)
+        a las filas de una página antes de mostrarlas. Por defecto no hace nada.
+        
+        Args:
+            resource: Recurso al que pertenecen las filas
+            rows: Filas de la página
+        """
+        return rows
+    
+    def display_paginated_table(self, resource: str, columns: List[str], sort_options: Dict[str, str],
+                                filters: Optional[Dict[str, Any]] = None, key: Optional[str] = None,
+                                include: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Muestra una tabla paginada en el servidor, con búsqueda y orden.
+        Solo se pide y se guarda en memoria la página visible, así que el coste
+        no depende del tamaño del catálogo.
+        
+        Args:
+            resource: Recurso a listar ("artists", "albums", "songs")
+            columns: Columnas a mostrar
+            sort_options: Columnas por las que se puede ordenar -> etiqueta
+            filters: Filtros exactos fijos (por ejemplo {"album_id": 3})
+            key: Prefijo para las claves de los widgets (por defecto el recurso)
+            include: Relaciones que la API embebe en cada fila (por ejemplo "artist"),
+                para no tener que pedirlas aparte
+            
+        Returns:
+            Filas de la página mostrada
+        """
+        key = key or resource
+        page_key = f"{key}_page"
+        
+        col_q, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+        q = col_q.text_input("Buscar", key=f"{key}_q")
+        sort = col_sort.selectbox("Ordenar por", list(sort_options), format_func=sort_options.get, key=f"{key}_sort")
+        order = col_order.selectbox("Orden", ["asc", "desc"],
+                                    format_func={"asc": "Ascendente", "desc": "Descendente"}.get,
+                                    key=f"{key}_order")
+        page_size = col_size.selectbox("Filas", PAGE_SIZES, key=f"{key}_size")
+        
+        # Si cambia la búsqueda, el orden o el tamaño, se vuelve a la primera página
+        signature = (q, sort, order, page_size, tuple(sorted((filters or {}).items())))
+        if st.session_state.get(f"{key}_signature") != signature:
+            st.session_state[f"{key}_signature"] = signature
+            st.session_state[page_key] = 1
+        page = st.session_state.get(page_key, 1)
+        
+        rows, total = self.data.get_page(resource, (page - 1) * page_size, page_size, sort, order, q, filters, include)
+        pages = max(1, -(-total // page_size))
+        if page > pages:
+            page = st.session_state[page_key] = pages
+            rows, total = self.data.get_page(resource, (page - 1) * page_size, page_size, sort, order, q, filters, include)
+        
+        self.display_data_table(self.prepare_rows(resource, rows), columns)
+        
+        col_page, col_info = st.columns([1, 3])
+        col_page.number_input("Página", min_value=1, max_value=pages, step=1, key=page_key)
+        col_info.caption(f"Página {page} de {pages} · {total} registros")
+        return rows
+    
     def display_data_table(self, data: List[Dict[str, Any]], columns: List[str]):
         """
         Muestra una tabla de datos.
@@ -107,12 +268,9 @@ class CRUDView(Generic[T], ABC):
             st.info("No hay datos disponibles")
             return
         
-        # Crear un DataFrame para mostrar los datos
-        import pandas as pd
-        df = pd.DataFrame(data)
-        
-        # Mostrar solo las columnas especificadas
-        if columns and all(col in df.columns for col in columns):
-            df = df[columns]
+        # Mostrar solo las columnas especificadas, en su orden. st.dataframe acepta
+        # la lista de filas directamente: sin construir aquí un DataFrame intermedio
+        if columns and all(col in data[0] for col in columns):
+            data = [{col: row[col] for col in columns} for row in data]
         
-        st.dataframe(df)
+        st.dataframe(data)
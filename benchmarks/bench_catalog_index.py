@@ -0,0 +1,71 @@
+# python benchmarks/bench_catalog_index.py [canciones]
+# Mide la memoria por canción del índice en columnas (catalog_index.py) frente a cargar las mismas
+# canciones como objetos ORM, y el tiempo de un listado filtrado y ordenado con cada uno.
+# Usa una base SQLite temporal con datos sintéticos, así que no necesita PostgreSQL; los tiempos de la
+# base real serán mayores (hay un viaje de red por consulta), la memoria del índice es la misma.
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.orm import sessionmaker
+
+from synthetic import build_catalog
+from models import Song
+import catalog_index
+import services
+
+SONGS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPEAT = 20
+
+def measure(label, load):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = load()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{label:<28} {used / 1024 / 1024:8.1f} MB  {used / SONGS:8.1f} bytes/canción")
+    return kept
+
+def timed(label, run):
+    run()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        run()
+    print(f"{label:<28} {(time.perf_counter() - start) / REPEAT * 1000:8.2f} ms/consulta")
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_catalog(os.path.join(directory, "bench.sqlite"), SONGS)
+        Session = sessionmaker(bind=engine)
+        print(f"{SONGS} canciones\n")
+
+        def load_orm():
+            db = Session()
+            return db, db.query(Song).all()
+        orm = measure("Objetos ORM (Song)", load_orm)
+
+        def load_index():
+            index = catalog_index.CatalogIndex(Session)
+            index.load()
+            return index
+        index = measure("Índice en columnas (todo)", load_index)
+        print(f"{'Índice, solo canciones':<28} {index.memory_report()['songs']['bytes_per_row']:8.1f} bytes/canción (arrays)\n")
+        orm[0].close()
+        del orm
+
+        db = Session()
+        timed("SQL: q + orden + página", lambda: services.list_songs(db, 0, 50, "duration", True, "número 1"))
+        timed("Índice: q + orden + página", lambda: index.list("songs", 0, 50, "duration", True, "número 1"))
+        timed("SQL: filtro por álbum", lambda: services.list_songs(db, 0, 50, "title", False, None, 7))
+        timed("Índice: filtro por álbum", lambda: index.list("songs", 0, 50, "title", False, None, {"album_id": 7}))
+        timed("Índice: suma por álbum", lambda: index.aggregate("songs", "album_id", "duration", "sum"))
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# python benchmarks/bench_duplicates.py [artistas]
+# Mide el detector de posibles duplicados (dedup.py): carga del índice, tiempo por comprobación al dar de alta un
+# artista o una canción y tiempo de la auditoría completa con catálogos de distinto tamaño.
+# Los nombres son aleatorios (los de synthetic.py, "Artista 1", "Artista 2"..., son todos casi duplicados entre sí)
+# y el índice se llena directamente, sin base de datos.
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup
+
+ARTISTS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+ALBUMS_PER_ARTIST = 5
+SONGS_PER_ALBUM = 10
+CHECKS = 2000
+
+CONSONANTS, VOWELS = "bcdfghjklmnprstvwxyz", "aeiou"
+PREFIXES = ["", "", "", "The ", "Los ", "La ", "DJ "]
+
+def word(rng):
+    return "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4))).capitalize()
+
+def name(rng):
+    return rng.choice(PREFIXES) + " ".join(word(rng) for _ in range(rng.randint(1, 2)))
+
+def build(rng, artists):
+    detector = dedup.DuplicateDetector()
+    for artist_id in range(artists):
+        detector._put_artist(artist_id, name(rng))
+    for album_id in range(artists * ALBUMS_PER_ARTIST):
+        detector._put_child(detector.albums, detector.artist_albums, album_id, album_id % artists, name(rng))
+    for song_id in range(artists * ALBUMS_PER_ARTIST * SONGS_PER_ALBUM):
+        detector._put_child(detector.songs, detector.album_songs, song_id, song_id % (artists * ALBUMS_PER_ARTIST),
+                            name(rng))
+    detector.cursor, detector._refreshed = 0, float("inf")     #sin refrescos desde la base
+    detector.refresh = lambda db: None
+    return detector
+
+def per_check_ms(detector, entity, queries, **scope):
+    start = time.perf_counter()
+    for query in queries:
+        detector.find(None, entity, query, **scope)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    rng = random.Random(7)
+    for artists in (ARTISTS // 4, ARTISTS // 2, ARTISTS):
+        dedup.trigrams.cache_clear()
+        dedup.band_keys.cache_clear()
+        start = time.perf_counter()
+        detector = build(rng, artists)
+        load_s = time.perf_counter() - start
+        #Mitad nombres nuevos, mitad variantes de nombres existentes ("ft.", mayúsculas, sin espacios)
+        queries = [name(rng) for _ in range(CHECKS // 2)]
+        queries += [detector.artists[rng.randrange(artists)].upper().replace(" ", "") + " ft. Otro"
+                    for _ in range(CHECKS // 2)]
+        artist_ms = per_check_ms(detector, "artist", queries)
+        song_ms = per_check_ms(detector, "song", queries[:CHECKS // 4], album_id=0)
+        start = time.perf_counter()
+        pairs = detector.audit(None)
+        audit_s = time.perf_counter() - start
+        print(f"{artists:>7} artistas: carga {load_s:5.1f} s | alta artista {artist_ms:.3f} ms | "
+              f"alta canción {song_ms:.3f} ms | auditoría {audit_s:5.1f} s "
+              f"({', '.join(f'{entity}={len(found)}' for entity, found in pairs.items())})")
+
+if __name__ == "__main__":
+    main()
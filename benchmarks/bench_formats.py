@@ -0,0 +1,62 @@
+# python benchmarks/bench_formats.py [canciones]
+# Compara la exportación completa de /song/ en JSON, Arrow y Parquet (formats.py): tamaño de la respuesta,
+# tiempo de la petición (consulta + serialización en el servidor) y tiempo de convertirla en un DataFrame
+# de pandas en el cliente, como hace APIClient.get_frame.
+# Sirve un catálogo sintético en modo snapshot dentro del mismo proceso, así que no necesita PostgreSQL.
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_catalog
+
+SONGS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPEAT = 5
+
+FORMATS = [
+    ("JSON", "application/json"),
+    ("Arrow", "application/vnd.apache.arrow.stream"),
+    ("Parquet", "application/vnd.apache.parquet"),
+]
+
+def to_frame(content_type, content):
+    import pandas as pd
+    import pyarrow as pa
+    if content_type.startswith("application/vnd.apache.arrow.stream"):
+        return pa.ipc.open_stream(content).read_pandas()
+    if content_type.startswith("application/vnd.apache.parquet"):
+        return pd.read_parquet(io.BytesIO(content))
+    return pd.DataFrame(json.loads(content))
+
+def best_of(run):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite")
+        build_catalog(path, SONGS).dispose()
+        os.environ["BUENAONDA_SNAPSHOT_PATH"] = path     #antes de importar la app
+        from fastapi.testclient import TestClient
+        import main as api
+
+        client = TestClient(api.app)
+        print(f"{SONGS} canciones, exportación completa de /song/ (mejor de {REPEAT})\n")
+        print(f"{'Formato':<9} {'Tamaño':>10} {'Petición':>11} {'DataFrame':>11}")
+        for label, accept in FORMATS:
+            request_ms, response = best_of(lambda: client.get("/song/", headers={"Accept": accept}))
+            content_type = response.headers["content-type"]
+            frame_ms, frame = best_of(lambda: to_frame(content_type, response.content))
+            assert len(frame) == SONGS, (label, len(frame))
+            print(f"{label:<9} {len(response.content) / 1024 / 1024:7.2f} MB {request_ms:8.1f} ms "
+                  f"{frame_ms:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
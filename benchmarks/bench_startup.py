@@ -0,0 +1,74 @@
+# python benchmarks/bench_startup.py [repeticiones]
+# Mide el arranque en frío de la API: tiempo de `import main`, arranque (lifespan, donde se precalientan
+# mappers, esquemas y conexiones), primera petición y una petición ya en caliente; y el tiempo de importar
+# las vistas del frontend. Cada medición es un intérprete nuevo, como un worker recién creado por el
+# autoescalado; se muestra la mediana. La API sirve un catálogo sintético en modo snapshot, así que no
+# necesita PostgreSQL (contra PostgreSQL el arranque incluye además abrir la primera conexión).
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5
+SONGS = 10_000
+REQUEST = "/song/?limit=50&include=album"
+
+def _ms(started):
+    return (time.perf_counter() - started) * 1000
+
+def child_api():
+    started = time.perf_counter()
+    import main
+    result = {"import": _ms(started)}
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:       #el bloque with ejecuta el lifespan
+        result["startup"] = _ms(started) - result["import"]
+        started = time.perf_counter()
+        assert client.get(REQUEST).status_code == 200
+        result["first"] = _ms(started)
+        started = time.perf_counter()
+        assert client.get(REQUEST).status_code == 200
+        result["warm"] = _ms(started)
+    print(json.dumps(result))
+
+def child_frontend():
+    started = time.perf_counter()
+    import artist_st, album_st, song_st, data_st  # noqa: F401
+    print(json.dumps({"import": _ms(started), "pandas": "pandas" in sys.modules}))
+
+def _run(kind, env):
+    output = subprocess.run([sys.executable, __file__, f"--child-{kind}"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _median(results, key):
+    return statistics.median(result[key] for result in results)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].startswith("--child-"):
+        sys.path.insert(0, ROOT)
+        child_api() if sys.argv[1] == "--child-api" else child_frontend()
+        sys.exit()
+
+    from synthetic import build_catalog
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite")
+        build_catalog(path, SONGS).dispose()
+        env = dict(os.environ, BUENAONDA_SNAPSHOT_PATH=path)
+        api = [_run("api", env) for _ in range(REPEAT)]
+        frontend = [_run("frontend", env) for _ in range(REPEAT)]
+
+    print(f"API (mediana de {REPEAT}, GET {REQUEST})")
+    for key, label in [("import", "import main"), ("startup", "arranque (lifespan)"),
+                       ("first", "primera petición"), ("warm", "petición en caliente")]:
+        print(f"  {label:<22}{_median(api, key):8.1f} ms")
+    print("Frontend")
+    print(f"  {'import de las vistas':<22}{_median(frontend, 'import'):8.1f} ms"
+          f"  (pandas cargado: {'sí' if any(r['pandas'] for r in frontend) else 'no'})")
@@ -0,0 +1,108 @@
+# python benchmarks/bench_workers.py [workers] [segundos] [concurrencia]
+# Compara el rendimiento de la API con 1 worker frente a N workers (serve.py), con la misma carga:
+# listados paginados y ordenados, búsquedas, listados con ?include= y detalles por id.
+# Sirve un catálogo sintético en modo snapshot (BUENAONDA_SNAPSHOT_PATH), así que no necesita PostgreSQL
+# y mide solo el trabajo de la app (serialización, validación, ORM); contra PostgreSQL el límite suele
+# ser el pool y la base. El generador de carga corre en la misma máquina y también gasta CPU: para cifras
+# representativas ejecútalo en el hardware de destino con más CPUs que workers, o lánzalo desde otra máquina.
+
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from synthetic import build_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+CONCURRENCY = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+SONGS = 50_000
+PORT = 8765
+
+def _paths():
+    # Mezcla de rutas de lectura representativa del frontend
+    song_id = random.randint(1, SONGS)
+    return random.choice([
+        "/song/?limit=50&sort=title",
+        f"/song/?limit=50&offset={random.randint(0, SONGS - 50)}",
+        f"/song/?limit=50&q=n%C3%BAmero%20{random.randint(0, 999)}",
+        "/song/?limit=50&include=album",
+        "/album/?limit=50&include=artist",
+        f"/song/{song_id}",
+        f"/song/{song_id}?include=album",
+    ])
+
+async def _user(client, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(_paths())
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+async def _load(base_url):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        # Calentamiento: imports perezosos, pools, cachés de SQLite
+        await asyncio.gather(*(client.get(path) for path in ["/song/?limit=50"] * CONCURRENCY))
+        deadline = time.monotonic() + DURATION
+        await asyncio.gather(*(_user(client, deadline, latencies, errors) for _ in range(CONCURRENCY)))
+    return latencies, errors
+
+def _wait_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("serve.py terminó antes de estar listo")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("serve.py no respondió a /ready")
+
+def run(snapshot_path, workers):
+    env = dict(os.environ, BUENAONDA_SNAPSHOT_PATH=snapshot_path)
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{PORT}"
+    try:
+        _wait_ready(base_url, process)
+        latencies, errors = asyncio.run(_load(base_url))
+    finally:
+        process.send_signal(signal.SIGTERM)     #apagado ordenado, como en producción
+        process.wait(timeout=60)
+    latencies.sort()
+    count = len(latencies)
+    p50 = latencies[count // 2] * 1000 if count else float("nan")
+    p99 = latencies[min(count - 1, int(count * 0.99))] * 1000 if count else float("nan")
+    print(f"{workers:>3} worker(s)  {count / DURATION:8.1f} req/s  p50 {p50:7.1f} ms  "
+          f"p99 {p99:7.1f} ms  errores {len(errors)}")
+    return count / DURATION
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite")
+        build_catalog(path, SONGS).dispose()
+        print(f"{SONGS} canciones, {CONCURRENCY} clientes concurrentes, {DURATION:.0f} s por prueba, "
+              f"{os.cpu_count()} CPU(s)")
+        single = run(path, 1)
+        if WORKERS > 1:
+            multi = run(path, WORKERS)
+            print(f"Mejora con {WORKERS} workers: x{multi / single:.2f}")
@@ -0,0 +1,35 @@
+# Catálogo sintético en un archivo SQLite para los benchmarks (no necesita PostgreSQL).
+
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from db import Base
+from models import Artist, Album, Song, name_key
+
+SONGS_PER_ALBUM = 10
+ALBUMS_PER_ARTIST = 5
+
+def build_catalog(path: str, songs: int) -> Engine:
+    # Crea el esquema completo y lo llena con `songs` canciones y sus álbumes y artistas
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    albums = max(1, songs // SONGS_PER_ALBUM)
+    artists = max(1, albums // ALBUMS_PER_ARTIST)
+    with engine.begin() as connection:
+        connection.execute(insert(Artist), [
+            {"id": i + 1, "stage_name": f"Artista {i}", "stage_name_key": name_key(f"Artista {i}"),
+             "music_genre": ("Rock", "Pop", "Jazz")[i % 3],
+             "country_of_origin": ("MX", "AR", "CL", "ES")[i % 4]} for i in range(artists)])
+        connection.execute(insert(Album), [
+            {"id": i + 1, "title": f"Álbum {i}", "title_key": name_key(f"Álbum {i}"), "artist_id": 1 + i % artists,
+             "release_date": date(2000 + i % 25, 1 + i % 12, 1)} for i in range(albums)])
+        connection.execute(insert(Song), [
+            {"id": i + 1, "title": f"Canción número {i}", "title_key": name_key(f"Canción número {i}"),
+             "duration": 120 + i % 240, "album_id": 1 + i % albums} for i in range(songs)])
+    return engine
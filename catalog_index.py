@@ -0,0 +1,345 @@
+import os
+import threading
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, Integer, select
+from sqlalchemy.orm import Session
+
+from models import Artist, Album, Song, public_columns
+import services
+import events
+
+#catalog_index.py es un índice opcional del catálogo en memoria, en columnas de NumPy.
+#Con BUENAONDA_CATALOG_INDEX=1 los listados sin include (/artist/, /album/, /song/) se resuelven en el
+#proceso con operaciones vectorizadas (filtro, búsqueda, orden, paginación) sin ir a la base de datos.
+#Se carga completo al arrancar y después aplica /changes (change_log) cada REFRESH_SECONDS, o enseguida
+#si la escritura se hizo en este mismo proceso. Las lecturas pueden ir como mucho REFRESH_SECONDS por detrás.
+#
+#Cada entidad se guarda como un array por columna: enteros en int32/int64, fechas en datetime64[D],
+#textos en StringDType (cadenas cortas dentro del propio array) y las columnas de pocos valores
+#(género, país) como códigos int32 sobre una lista de valores internados. El id -> fila es una búsqueda
+#binaria sobre el array de ids ordenado, sin diccionarios por fila.
+#Ver benchmarks/bench_catalog_index.py para la medición de memoria por canción frente a objetos ORM.
+
+ENABLED = os.environ.get("BUENAONDA_CATALOG_INDEX") == "1"
+REFRESH_SECONDS = float(os.environ.get("BUENAONDA_CATALOG_INDEX_REFRESH", "2"))
+
+CHANGES_BATCH = 1000                            #cambios leídos por consulta al refrescar
+CATEGORY_COLUMNS = {"music_genre", "country_of_origin"}
+SEARCH_COLUMNS = {"artists": "stage_name", "albums": "title", "songs": "title"}
+MODELS = {"artists": Artist, "albums": Album, "songs": Song}
+
+INT_NULL = -(2 ** 31)                           #marca de NULL en columnas enteras
+
+class _Table:
+    # Columnas de una entidad. Los textos NULL se guardan como "" con una máscara aparte (columna "<nombre>:null"),
+    # porque las operaciones de np.strings no admiten valores ausentes.
+    # Las filas borradas solo se marcan en `alive` hasta la siguiente compactación.
+    def __init__(self, np, model, search_column: str):
+        self.np = np
+        self.search_column = search_column
+        self.kinds = {}
+        for column in public_columns(model):
+            if column.name in CATEGORY_COLUMNS:
+                self.kinds[column.name] = "category"
+            elif isinstance(column.type, Integer):
+                self.kinds[column.name] = "int"
+            elif isinstance(column.type, Date):
+                self.kinds[column.name] = "date"
+            else:
+                self.kinds[column.name] = "str"
+        self.categories = {name: [] for name, kind in self.kinds.items() if kind == "category"}
+        self._codes = {name: {} for name in self.categories}
+        self.columns = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.set_rows([])
+
+    #Conversión fila <-> columnas
+    def _encode(self, rows: list[dict]) -> dict:
+        np = self.np
+        arrays = {}
+        for name, kind in self.kinds.items():
+            values = [row.get(name) for row in rows]
+            if kind == "int":
+                dtype = np.int64 if name == "id" else np.int32
+                arrays[name] = np.array([INT_NULL if v is None else v for v in values], dtype=dtype)
+            elif kind == "date":
+                arrays[name] = np.array([None if v is None else (v if isinstance(v, date) else date.fromisoformat(v))
+                                         for v in values], dtype="datetime64[D]")
+            elif kind == "category":
+                codes, categories = self._codes[name], self.categories[name]
+                for v in values:
+                    if v not in codes:
+                        codes[v] = len(categories)
+                        categories.append(v)
+                arrays[name] = np.array([codes[v] for v in values], dtype=np.int32)
+            else:
+                arrays[name] = np.array(["" if v is None else v for v in values], dtype=np.dtypes.StringDType())
+                arrays[f"{name}:null"] = np.array([v is None for v in values], dtype=bool)
+                if name == self.search_column:      #copia en minúsculas para la búsqueda
+                    arrays[f"{name}:lower"] = np.strings.lower(arrays[name])
+        return arrays
+
+    def _decode(self, name, value, is_null=False):
+        kind = self.kinds[name]
+        if kind == "int":
+            value = int(value)
+            return None if value == INT_NULL else value
+        if kind == "date":
+            return None if self.np.isnat(value) else value.astype(date)
+        if kind == "category":
+            return self.categories[name][value]
+        return None if is_null else str(value)
+
+    def set_rows(self, rows: list[dict]):
+        # Reconstruye todas las columnas a partir de filas (carga completa)
+        self.columns = self._encode(sorted(rows, key=lambda row: row["id"]))
+        self.alive = self.np.ones(len(rows), dtype=bool)
+
+    @property
+    def lower(self):
+        return self.columns[f"{self.search_column}:lower"]
+
+    def rows_at(self, positions) -> list[dict]:
+        values = {name: column[positions] for name, column in self.columns.items()}
+        return [
+            {name: self._decode(name, values[name][i], kind == "str" and values[f"{name}:null"][i])
+             for name, kind in self.kinds.items()}
+            for i in range(len(positions))
+        ]
+
+    def positions(self, ids, alive_only: bool = True):
+        # id -> fila con búsqueda binaria sobre el array ordenado de ids; -1 si no está
+        np = self.np
+        all_ids = self.columns["id"]
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(all_ids):
+            return np.full(len(ids), -1)
+        pos = np.minimum(np.searchsorted(all_ids, ids), len(all_ids) - 1)
+        found = all_ids[pos] == ids
+        if alive_only:
+            found &= self.alive[pos]
+        return np.where(found, pos, -1)
+
+    def sort_key(self, name, positions):
+        # (clave de orden, es NULL) de una columna para las filas dadas
+        np = self.np
+        key = self.columns[name][positions]
+        kind = self.kinds[name]
+        if kind == "category":
+            # los códigos siguen el orden de aparición; se ordena por el texto de cada valor
+            categories = self.categories[name]
+            ranks = np.empty(len(categories), dtype=np.int32)
+            ranks[sorted(range(len(categories)), key=lambda i: categories[i] or "")] = np.arange(len(categories))
+            return ranks[key], key == self._codes[name].get(None, -1)
+        if kind == "int":
+            return key, key == INT_NULL
+        if kind == "date":
+            return key, np.isnat(key)
+        return key, self.columns[f"{name}:null"][positions]
+
+    def apply(self, upserts: dict[int, dict], deletes: set[int]):
+        # Aplica cambios: modifica en su sitio las filas existentes y añade las nuevas de una vez
+        np = self.np
+        if deletes:
+            pos = self.positions(sorted(deletes))
+            self.alive[pos[pos >= 0]] = False
+        if upserts:
+            ids = sorted(upserts)
+            pos = self.positions(ids, alive_only=False)
+            existing = [(p, upserts[i]) for p, i in zip(pos, ids) if p >= 0]
+            new = [upserts[i] for p, i in zip(pos, ids) if p < 0]
+            if existing:
+                at = np.array([p for p, _ in existing])
+                for name, values in self._encode([row for _, row in existing]).items():
+                    self.columns[name][at] = values
+                self.alive[at] = True
+            if new:
+                for name, values in self._encode(new).items():
+                    self.columns[name] = np.concatenate([self.columns[name], values])
+                self.alive = np.concatenate([self.alive, np.ones(len(new), dtype=bool)])
+                if len(self.alive) > 1 and not (np.diff(self.columns["id"]) > 0).all():
+                    self._take(np.argsort(self.columns["id"], kind="stable"))
+        # Compacta cuando más de un cuarto de las filas son borradas
+        if (~self.alive).sum() * 4 > len(self.alive):
+            self._take(np.flatnonzero(self.alive))
+
+    def _take(self, positions):
+        self.columns = {name: column[positions] for name, column in self.columns.items()}
+        self.alive = self.alive[positions]
+
+    def memory(self) -> dict:
+        # Bytes de los arrays; en los textos se suma su longitud, cota superior de lo guardado fuera del array
+        np = self.np
+        total = self.alive.nbytes
+        for column in self.columns.values():
+            total += column.nbytes
+            if column.dtype.kind == "T":
+                total += int(np.strings.str_len(column).sum())
+        rows = int(self.alive.sum())
+        return {"rows": rows, "bytes": total, "bytes_per_row": round(total / rows, 1) if rows else 0}
+
+
+class CatalogIndex:
+    def __init__(self, session_factory):
+        import numpy as np      #dependencia opcional: solo se importa si el índice está activado
+        self.np = np
+        self.session_factory = session_factory
+        self.tables = {name: _Table(np, model, SEARCH_COLUMNS[name]) for name, model in MODELS.items()}
+        self.cursor = 0
+        self.ready = False
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    #Carga y refresco
+    def load(self):
+        # Carga completa. El cursor se lee antes que las tablas: lo que cambie entre medias se vuelve a
+        # aplicar al refrescar, y aplicar un cambio dos veces no altera el resultado.
+        db: Session = self.session_factory()
+        try:
+            cursor = services.latest_change_seq(db)
+            loaded = {}
+            for name, model in MODELS.items():
+                loaded[name] = [dict(row._mapping) for row in db.execute(select(*public_columns(model)))]
+        finally:
+            db.close()
+        with self._lock:
+            for name, rows in loaded.items():
+                self.tables[name].set_rows(rows)
+            self.cursor = cursor
+            self.ready = True
+
+    def refresh(self) -> int:
+        # Aplica los cambios de change_log posteriores al cursor; devuelve cuántos se aplicaron
+        db: Session = self.session_factory()
+        applied = 0
+        try:
+            while True:
+                changes, has_more = services.list_changes(db, self.cursor, CHANGES_BATCH)
+                if not changes:
+                    break
+                upserts = {name: {} for name in self.tables}
+                deletes = {name: set() for name in self.tables}
+                for change in changes:       #el último cambio de cada elemento es el que vale
+                    if change.op == "delete":
+                        upserts[change.entity].pop(change.entity_id, None)
+                        deletes[change.entity].add(change.entity_id)
+                    else:
+                        deletes[change.entity].discard(change.entity_id)
+                        upserts[change.entity][change.entity_id] = change.data
+                with self._lock:
+                    for name, table in self.tables.items():
+                        if upserts[name] or deletes[name]:
+                            table.apply(upserts[name], deletes[name])
+                    self.cursor = changes[-1].seq
+                applied += len(changes)
+                if not has_more:
+                    break
+        finally:
+            db.close()
+        return applied
+
+    def notify(self, changes=None, seq=None):
+        # Una escritura de este proceso acaba de confirmarse: refrescar sin esperar al temporizador
+        self._wake.set()
+
+    def start(self, interval: float = REFRESH_SECONDS):
+        # La carga completa también se hace en el hilo: el arranque no espera a la base ni falla si no está
+        # lista todavía. Hasta que termina, ready es False, /ready responde 503 y los listados van a la base.
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.refresh() if self.ready else self.load()
+                except Exception as e:      #la base puede no estar disponible; se reintenta en la siguiente vuelta
+                    print(f"Error al {'refrescar' if self.ready else 'cargar'} el índice del catálogo: {e}")
+                self._wake.wait(interval)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=run, name="catalog-index", daemon=True)
+        self._thread.start()
+        events.broker.add_listener(self.notify)
+
+    def stop(self):
+        events.broker.remove_listener(self.notify)
+        self._stop.set()
+        self._wake.set()
+
+    #Consultas
+    def list(self, entity: str, skip: int = 0, limit: Optional[int] = None, sort: str = "id",
+             descending: bool = False, q: Optional[str] = None, filters: Optional[dict] = None) -> tuple[list[dict], int]:
+        # Mismo resultado que services.list_*: filtro "contiene" sin mayúsculas, filtros exactos,
+        # orden por (columna, id) y NULL al final en orden ascendente (como PostgreSQL)
+        np = self.np
+        with self._lock:
+            table = self.tables[entity]
+            mask = table.alive.copy()
+            if q:
+                mask &= np.strings.find(table.lower, q.lower()) >= 0
+            for name, value in (filters or {}).items():
+                if value is None:
+                    continue
+                if table.kinds[name] == "category":
+                    code = table._codes[name].get(value)
+                    if code is None:
+                        return [], 0
+                    mask &= table.columns[name] == code
+                else:
+                    mask &= table.columns[name] == value
+            candidates = np.flatnonzero(mask)
+            total = len(candidates)
+
+            key, is_null = table.sort_key(sort, candidates)
+            order = np.lexsort((table.columns["id"][candidates], key, is_null))
+            if descending:
+                order = order[::-1]
+            end = None if limit is None else skip + limit
+            return table.rows_at(candidates[order[skip:end]]), total
+
+    def aggregate(self, entity: str, by: str, column: Optional[str] = None, func: str = "count") -> dict:
+        # Agrupa por una columna y calcula count, sum, avg, min o max de otra (ignorando NULL)
+        np = self.np
+        with self._lock:
+            table = self.tables[entity]
+            keys = table.columns[by][table.alive]
+            groups, inverse = np.unique(keys, return_inverse=True)
+            if func == "count" or column is None:
+                values = np.bincount(inverse, minlength=len(groups))
+            else:
+                data = table.columns[column][table.alive]
+                valid = data != INT_NULL
+                sums = np.bincount(inverse[valid], weights=data[valid], minlength=len(groups))
+                counts = np.bincount(inverse[valid], minlength=len(groups))
+                if func == "sum":
+                    values = sums
+                elif func == "avg":
+                    values = np.divide(sums, counts, out=np.zeros(len(groups)), where=counts > 0)
+                elif func in ("min", "max"):
+                    fill = np.iinfo(np.int64).max if func == "min" else np.iinfo(np.int64).min
+                    values = np.full(len(groups), fill, dtype=np.int64)
+                    (np.minimum if func == "min" else np.maximum).at(values, inverse[valid], data[valid])
+                else:
+                    raise ValueError(f"Unknown aggregate: {func}")
+            return {table._decode(by, group): value.item() for group, value in zip(groups, values)}
+
+    def memory_report(self) -> dict:
+        with self._lock:
+            return {"cursor": self.cursor, **{name: table.memory() for name, table in self.tables.items()}}
+
+index: Optional[CatalogIndex] = None
+
+def start(session_factory) -> Optional[CatalogIndex]:
+    # Crea y arranca el índice si está activado (lo llama el arranque de la app)
+    global index
+    if ENABLED and index is None:
+        index = CatalogIndex(session_factory)
+        index.start()
+    return index
+
+def stop():
+    global index
+    if index is not None:
+        index.stop()
+        index = None
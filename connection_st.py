@@ -2,9 +2,15 @@ import streamlit as st
 import requests
 import time
 
+# Tiempo máximo de espera (segundos) para las comprobaciones de salud
+HEALTH_TIMEOUT = 2
+
+# Segundos durante los que se reutiliza el último estado de conexión conocido
+HEALTH_TTL = 10
+
 def test_api_connection(api_url):
     """
-    Prueba la conexión con la API REST.
+    Prueba la conexión con la API REST usando el endpoint ligero /health.
     
     Args:
         api_url: URL base de la API
@@ -13,12 +19,44 @@ def test_api_connection(api_url):
         bool: True si la conexión es exitosa, False en caso contrario
     """
     try:
-        response = requests.get(f"{api_url}/artist/")
+        response = requests.get(f"{api_url}/health", timeout=HEALTH_TIMEOUT)
+        response.raise_for_status()
+        return True
+    except Exception:
+        return False
+
+def test_api_ready(api_url):
+    """
+    Comprueba si la API está lista para atender peticiones (base de datos accesible).
+    
+    Args:
+        api_url: URL base de la API
+        
+    Returns:
+        bool: True si /ready responde correctamente, False en caso contrario
+    """
+    try:
+        response = requests.get(f"{api_url}/ready", timeout=HEALTH_TIMEOUT)
         response.raise_for_status()
         return True
     except Exception:
         return False
 
+@st.cache_data(ttl=HEALTH_TTL, show_spinner=False)
+def get_api_status(api_url):
+    """
+    Estado de la API, en caché durante HEALTH_TTL segundos para no consultarlo
+    en cada interacción.
+    
+    Args:
+        api_url: URL base de la API
+        
+    Returns:
+        dict: {"alive": bool, "ready": bool}
+    """
+    alive = test_api_connection(api_url)
+    return {"alive": alive, "ready": alive and test_api_ready(api_url)}
+
 def wait_for_api(api_url, max_attempts=5, delay=2):
     """
     Espera a que la API esté disponible, con reintentos.
@@ -47,9 +85,12 @@ def display_connection_status(api_url):
     Args:
         api_url: URL base de la API
     """
+    status = get_api_status(api_url)
     with st.sidebar:
-        if test_api_connection(api_url):
+        if status["ready"]:
             st.success("✅ Conectado a la API")
+        elif status["alive"]:
+            st.warning("⚠️ La API responde, pero la base de datos no está disponible")
         else:
             st.error("❌ No se pudo conectar a la API")
             st.warning(f"Asegúrate de que el backend esté en ejecución en {api_url}")
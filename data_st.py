@@ -0,0 +1,279 @@
+import time
+import streamlit as st
+from typing import Dict, List, Any, Optional, Tuple
+from api_st import APIClient
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+
+# Recursos que quedan obsoletos al escribir en cada entidad.
+# Borrar un artista o un álbum elimina en cascada sus álbumes y canciones, y los
+# álbumes y artistas muestran acumulados (canciones, duración) de sus hijos.
+INVALIDATIONS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "artists": {
+        "create": ("artists",),
+        "update": ("artists",),
+        "delete": ("artists", "albums", "songs"),
+    },
+    "albums": {
+        "create": ("albums", "artists"),
+        "update": ("albums", "artists"),
+        "delete": ("albums", "songs", "artists"),
+    },
+    "songs": {
+        "create": ("songs", "albums", "artists"),
+        "update": ("songs", "albums", "artists"),
+        "delete": ("songs", "albums", "artists"),
+    },
+}
+
+# Los resúmenes de estadísticas dependen de todo el catálogo: cualquier escritura los deja obsoletos
+STATS_RESOURCES = ("artists", "albums", "songs")
+
+# Número máximo de páginas (y de búsquedas) en caché por recurso; así la memoria
+# no depende del tamaño del catálogo
+PAGE_CACHE_SIZE = 8
+
+# Resultados por búsqueda en los selectores
+LOOKUP_LIMIT = 20
+
+# Tiempo (segundos) tras el cual un listado se vuelve a pedir aunque no haya
+# escrituras en esta sesión, para ver los cambios de otros usuarios
+DEFAULT_TTL = 60
+
+
+class DataStore:
+    """
+    Capa de datos compartida por las vistas de Streamlit.
+    Guarda en st.session_state los listados y elementos ya obtenidos, de modo que
+    en una misma sesión cada recurso se pide a la API una sola vez, aunque varias
+    vistas o pestañas lo necesiten. Las escrituras invalidan solo los recursos
+    afectados (ver INVALIDATIONS). Con un EventListener, las escrituras de otros
+    usuarios invalidan también las entradas afectadas en cuanto llega el aviso.
+    """
+
+    SESSION_KEY = "_data_store_cache"
+
+    def __init__(self, api_client: APIClient, async_client: Optional[AsyncAPIClient] = None,
+                 ttl: float = DEFAULT_TTL, events: Optional[EventListener] = None):
+        """
+        Inicializa la capa de datos.
+
+        Args:
+            api_client: Cliente API síncrono
+            async_client: Cliente asíncrono opcional para cargar varios recursos en paralelo
+            ttl: Segundos de validez de cada entrada
+            events: Listener opcional de /events para descartar entradas cambiadas por otros
+        """
+        self.api_client = api_client
+        self.async_client = async_client
+        self.ttl = ttl
+        self.events = events
+
+    @property
+    def _cache(self) -> Dict[Any, Tuple[float, int, Any]]:
+        """Diccionario de caché de la sesión actual: clave -> (momento, versión de eventos, datos)"""
+        if self.SESSION_KEY not in st.session_state:
+            st.session_state[self.SESSION_KEY] = {}
+        return st.session_state[self.SESSION_KEY]
+
+    def _lookup(self, key) -> Optional[Any]:
+        """Devuelve los datos en caché para la clave si siguen vigentes"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        fetched_at, version, data = entry
+        if time.monotonic() - fetched_at > self.ttl or self._is_stale(key, version):
+            del self._cache[key]
+            return None
+        return data
+
+    def _is_stale(self, key, version: int) -> bool:
+        """Indica si el EventListener ha avisado de cambios posteriores a la versión de la entrada"""
+        if self.events is None:
+            return False
+        if isinstance(key, tuple) and key[0] == "stats":
+            return any(self.events.is_stale(resource, version) for resource in STATS_RESOURCES)
+        return self.events.is_stale(self._event_key(key), version)
+
+    def _version(self) -> int:
+        """Versión de eventos actual; se toma antes de pedir datos para no perder avisos durante la petición"""
+        return self.events.version if self.events is not None else 0
+
+    def _store(self, key, data, version: int):
+        self._cache[key] = (time.monotonic(), version, data)
+
+    @staticmethod
+    def _event_key(key):
+        """Clave del EventListener para una entrada: (recurso, id) para elementos, recurso para el resto"""
+        if isinstance(key, tuple):
+            return key if len(key) == 2 else key[0]
+        return key
+
+    def get_all(self, resource: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene todos los elementos de un recurso ("artists", "albums", "songs").
+
+        Returns:
+            Copia de la lista, para que las vistas puedan añadir campos sin
+            modificar la caché
+        """
+        return self.get_many(resource)[0]
+
+    def get_many(self, *resources: str) -> List[List[Dict[str, Any]]]:
+        """
+        Obtiene varios listados; los que no están en caché se piden juntos
+        (en paralelo si hay cliente asíncrono).
+
+        Args:
+            resources: Nombres de los recursos
+
+        Returns:
+            Lista con una copia de cada listado, en el mismo orden
+        """
+        missing = [resource for resource in dict.fromkeys(resources) if self._lookup(resource) is None]
+        if missing:
+            version = self._version()
+            if self.async_client is not None:
+                fetched = self.async_client.fetch_many(*missing)
+            else:
+                fetched = [getattr(self.api_client, f"get_all_{resource}")() for resource in missing]
+            for resource, rows in zip(missing, fetched):
+                if rows:
+                    self._store(resource, rows, version)
+            results = dict(zip(missing, fetched))
+        else:
+            results = {}
+
+        return [
+            [dict(row) for row in (self._lookup(resource) or results.get(resource) or [])]
+            for resource in resources
+        ]
+
+    def get_item(self, resource: str, item_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un elemento por su ID, reutilizando el listado en caché si existe.
+
+        Args:
+            resource: Nombre del recurso
+            item_id: ID del elemento
+        """
+        rows = self._lookup(resource)
+        if rows is not None:
+            for row in rows:
+                if row["id"] == item_id:
+                    return dict(row)
+
+        key = (resource, item_id)
+        item = self._lookup(key)
+        if item is None:
+            version = self._version()
+            item = getattr(self.api_client, f"get_{resource[:-1]}_by_id")(item_id)
+            if item is not None:
+                self._store(key, item, version)
+        return dict(item) if item is not None else None
+
+    def get_page(self, resource: str, skip: int, limit: int, sort: str = "id", order: str = "asc",
+                 q: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                 include: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Obtiene una página de un recurso con orden y filtros aplicados en el servidor.
+
+        Args:
+            resource: Nombre del recurso
+            skip: Filas a saltar
+            limit: Tamaño de la página
+            sort: Columna de orden
+            order: "asc" o "desc"
+            q: Texto a buscar
+            filters: Filtros exactos adicionales (por ejemplo {"album_id": 3})
+            include: Relaciones a embeber en cada fila (por ejemplo "album.artist")
+
+        Returns:
+            Tupla (copia de las filas de la página, total de filas)
+        """
+        filters = filters or {}
+        key = (resource, "page", skip, limit, sort, order, q or "", tuple(sorted(filters.items())), include or "")
+        page = self._lookup(key)
+        if page is None:
+            version = self._version()
+            page = getattr(self.api_client, f"get_{resource}_page")(
+                skip=skip, limit=limit, sort=sort, order=order, q=q, include=include, **filters
+            )
+            # Las páginas vacías (o fallidas) no se guardan, igual que los listados
+            if page[0]:
+                self._evict(resource, "page")
+                self._store(key, page, version)
+        rows, total = page
+        return [dict(row) for row in rows], total
+
+    def lookup(self, resource: str, q: str = "", limit: int = LOOKUP_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Busca por prefijo para los selectores; cada búsqueda se pide una sola vez.
+
+        Args:
+            resource: Nombre del recurso
+            q: Texto con el que empieza el nombre
+            limit: Número máximo de resultados
+
+        Returns:
+            Lista de {"id", "label"}
+        """
+        key = (resource, "lookup", q.strip().lower(), limit)
+        options = self._lookup(key)
+        if options is None:
+            version = self._version()
+            options = getattr(self.api_client, f"lookup_{resource}")(q.strip(), limit)
+            if options:
+                self._evict(resource, "lookup")
+                self._store(key, options, version)
+        return [dict(option) for option in options]
+
+    def get_stats(self, name: str, **params) -> Optional[Any]:
+        """
+        Obtiene un resumen de estadísticas (ver APIClient.get_stats); cada
+        combinación de parámetros se pide una sola vez hasta la siguiente escritura.
+
+        Args:
+            name: Nombre del resumen
+            params: Parámetros del resumen
+        """
+        key = ("stats", name, tuple(sorted(params.items())))
+        data = self._lookup(key)
+        if data is None:
+            version = self._version()
+            data = self.api_client.get_stats(name, **params)
+            if data is not None:
+                self._store(key, data, version)
+        return data
+
+    def _evict(self, resource: str, kind: str):
+        """Deja sitio para una entrada nueva ("page" o "lookup") descartando las más antiguas del recurso"""
+        keys = [key for key in self._cache if isinstance(key, tuple) and key[0] == resource and key[1] == kind]
+        keys.sort(key=lambda key: self._cache[key][0])
+        for key in keys[:max(0, len(keys) - PAGE_CACHE_SIZE + 1)]:
+            del self._cache[key]
+
+    def invalidate(self, resource: str, operation: str, item_id: Optional[int] = None):
+        """
+        Invalida las entradas afectadas por una escritura.
+
+        Args:
+            resource: Recurso sobre el que se escribió
+            operation: "create", "update" o "delete"
+            item_id: ID del elemento modificado, si se conoce
+        """
+        affected = INVALIDATIONS[resource][operation] + ("stats",)
+        for key in list(self._cache):
+            name = key[0] if isinstance(key, tuple) else key
+            if name not in affected:
+                continue
+            # Los elementos individuales de la propia entidad solo caen si son el modificado;
+            # los de entidades borradas en cascada y todas las páginas y búsquedas caen siempre
+            is_item = isinstance(key, tuple) and len(key) == 2
+            if is_item and name == resource and item_id is not None and key[1] != item_id:
+                continue
+            del self._cache[key]
+
+    def clear(self):
+        """Vacía toda la caché de la sesión"""
+        self._cache.clear()
@@ -0,0 +1,127 @@
+import asyncio
+import re
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+#deadlines.py pone un tiempo máximo a las consultas de cada petición para que una consulta patológica no
+#retenga una conexión del pool durante minutos:
+#- get_db anota en la sesión el límite de la ruta y, al empezar cada transacción, se envía a PostgreSQL con
+#  SET LOCAL statement_timeout; si se supera, el servidor cancela la consulta y la API responde 504.
+#- Si el cliente se desconecta mientras su petición consulta la base, se cancela la consulta en el servidor
+#  (psycopg2 cancel(), o interrupt() en SQLite) en lugar de terminarla para nadie.
+
+STATEMENT_TIMEOUT_MS = 5000             #límite por defecto de cada consulta
+EXPORT_STATEMENT_TIMEOUT_MS = 60000     #listados completos sin limit
+
+#Límite por "MÉTODO /ruta" (el primero que coincide)
+ROUTE_STATEMENT_TIMEOUTS = [
+    (re.compile(r"GET /(artists|album|song)/(lookup|by-name/)"), 2000),
+]
+
+QUERY_CANCELED = "57014"     #SQLSTATE de PostgreSQL para statement_timeout y cancelaciones
+
+LIST_PATH = re.compile(r"/(artist|album|song)/$")
+
+def is_export(scope) -> bool:
+    # Listado sin limit: devuelve todas las filas
+    return scope["method"] == "GET" and bool(LIST_PATH.match(scope["path"])) and b"limit=" not in scope["query_string"]
+
+def statement_timeout_ms(scope) -> int:
+    if is_export(scope):
+        return EXPORT_STATEMENT_TIMEOUT_MS
+    route = f"{scope['method']} {scope['path']}"
+    for pattern, timeout in ROUTE_STATEMENT_TIMEOUTS:
+        if pattern.match(route):
+            return timeout
+    return STATEMENT_TIMEOUT_MS
+
+def attach(db: Session, scope):
+    # Se llama desde get_db: límite de la ruta y registro de la sesión para cancelarla si el cliente se va
+    db.info["statement_timeout_ms"] = statement_timeout_ms(scope)
+    watcher = scope.get("buenaonda.disconnect")
+    if watcher is not None:
+        watcher.sessions.append(db)
+
+def is_query_canceled(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == QUERY_CANCELED or str(exc.orig) == "interrupted"
+
+#TRANSACCIONES-------------------------------------------------------
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(session, transaction, connection):
+    # Conexión de la transacción en curso, para poder cancelarla desde otro hilo
+    session.info["dbapi_connection"] = connection.connection.dbapi_connection
+    timeout = session.info.get("statement_timeout_ms")
+    if timeout and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_connection(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("dbapi_connection", None)
+
+def cancel(db: Session):
+    # Seguro desde cualquier hilo: solo usa la API de cancelación del driver
+    connection = db.info.get("dbapi_connection")
+    cancel_query = getattr(connection, "cancel", None) or getattr(connection, "interrupt", None)
+    if cancel_query is not None:
+        cancel_query()
+
+#DESCONEXIONES------------------------------------------------------
+class _DisconnectWatcher:
+    def __init__(self):
+        self.sessions: list[Session] = []
+        self.responded = False
+        self.disconnected = asyncio.Event()
+
+    def cancel_all(self):
+        for db in self.sessions:
+            cancel(db)
+
+class CancelOnDisconnectMiddleware:
+    # Middleware ASGI: lee el cuerpo de la petición, se lo pasa a la app y mientras tanto espera el aviso de
+    # desconexión del servidor. Si llega antes de empezar la respuesta, cancela las consultas de la petición.
+    def __init__(self, app, exempt_paths: tuple = ("/events",)):
+        self.app = app
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        body = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message)
+            if not message.get("more_body", False):
+                break
+        watcher = _DisconnectWatcher()
+        scope["buenaonda.disconnect"] = watcher
+
+        async def replay():
+            if body:
+                return body.pop(0)
+            await watcher.disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def tracked_send(message):
+            if message["type"] == "http.response.start":
+                watcher.responded = True
+            await send(message)
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            watcher.disconnected.set()
+            if not watcher.responded:
+                #las consultas corren en el threadpool; cancel() no bloquea el event loop
+                await asyncio.to_thread(watcher.cancel_all)
+
+        task = asyncio.create_task(watch())
+        try:
+            await self.app(scope, replay, tracked_send)
+        finally:
+            task.cancel()
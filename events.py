@@ -0,0 +1,100 @@
+import asyncio
+import json
+from typing import Optional
+
+#events.py reparte avisos de cambios del catálogo a los clientes conectados a /events (Server-Sent Events).
+#services.py publica un aviso por (entidad, operación) después de cada commit; cada suscriptor tiene
+#una cola asyncio en el event loop del servidor, así que mil suscriptores inactivos no cuestan
+#ningún hilo ni ninguna consulta: solo una cola vacía esperando.
+#El broker vive en memoria del proceso: con varios workers cada uno avisa solo de sus propias escrituras.
+
+QUEUE_SIZE = 100            #avisos pendientes por suscriptor antes de considerarlo atascado
+HEARTBEAT_SECONDS = 15      #comentario periódico para mantener viva la conexión a través de proxies
+RETRY_MS = 3000             #tiempo que espera el navegador/cliente antes de reconectar
+
+_CLOSE = object()           #marca de cierre del servidor
+
+def _encode(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    # Mensaje SSE ya codificado; se construye una vez y se comparte entre todos los suscriptores
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+RESET = _encode("reset", {})
+
+class EventBroker:
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self._listeners: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        # Se llama al arrancar la app; sin loop (scripts, manage.py) no se envía nada a /events
+        self._loop = loop
+
+    def add_listener(self, callback):
+        # Callback del propio proceso (por ejemplo catalog_index) llamado con (changes, seq) tras cada commit
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, changes: list[tuple[str, int, str]], seq: Optional[int] = None):
+        # changes: (entidad, id, operación). Se puede llamar desde cualquier hilo (las rutas síncronas
+        # corren en el threadpool); el reparto se hace en el loop.
+        for callback in self._listeners:
+            callback(changes, seq)
+        if self._loop is None or not changes or self._loop.is_closed():
+            return
+        grouped: dict[tuple[str, str], list[int]] = {}
+        for entity, entity_id, op in changes:
+            grouped.setdefault((entity, op), []).append(entity_id)
+        messages = [_encode("change", {"entity": entity, "op": op, "ids": ids}, seq)
+                    for (entity, op), ids in grouped.items()]
+        self._loop.call_soon_threadsafe(self._fanout, messages)
+
+    def _fanout(self, messages: list):
+        for queue in self._subscribers:
+            for message in messages:
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # Cliente demasiado lento: se descartan sus avisos y se le pide recargar todo
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(RESET)
+                    break
+
+    def close(self):
+        # Termina todos los streams para que el servidor pueda apagarse sin esperar a los clientes
+        for queue in self._subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_CLOSE)
+
+    async def stream(self, request):
+        # Generador para StreamingResponse: avisos, y un latido si no hay nada que enviar
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": ping\n\n"
+                    continue
+                if message is _CLOSE:
+                    break
+                yield message
+        finally:
+            self._subscribers.discard(queue)
+
+broker = EventBroker()
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+import requests
+from typing import Any, Dict
+
+from api_st import DEFAULT_TIMEOUT
+
+# Segundos sin recibir nada (ni siquiera el latido del servidor) tras los que se da la
+# conexión por perdida y se reconecta
+READ_TIMEOUT = 45
+
+# Espera máxima (segundos) entre reintentos de conexión
+MAX_BACKOFF = 30
+
+# Elementos individuales cuyo último cambio se recuerda; al superarlo se olvidan y las
+# entradas de caché anteriores se consideran obsoletas
+MAX_TRACKED = 10000
+
+
+class EventListener:
+    """
+    Escucha en un hilo de fondo el stream /events de la API y lleva la cuenta de
+    qué recursos y elementos han cambiado.
+
+    Cada aviso incrementa un número de versión global y anota esa versión en el
+    recurso ("songs") y en cada elemento afectado (("songs", 7)). La capa de datos
+    guarda con cada entrada de caché la versión en la que se pidió y, al leerla,
+    pregunta a is_stale si algo de lo que contiene ha cambiado después. Así solo
+    se descartan las entradas afectadas, sin consultar la API para comprobarlo.
+
+    Un solo listener (y una sola conexión) se comparte entre todas las sesiones.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000"):
+        """
+        Inicializa el listener y arranca el hilo de fondo.
+
+        Args:
+            base_url: URL base de la API REST
+        """
+        self.base_url = base_url.rstrip("/")
+        self.version = 0
+        self.connected = False
+        self._changed: Dict[Any, int] = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="api-events", daemon=True)
+        self._thread.start()
+
+    def is_stale(self, key: Any, version: int) -> bool:
+        """
+        Indica si una entrada de caché pedida en la versión dada está obsoleta.
+
+        Args:
+            key: Recurso ("songs") para listados, páginas y búsquedas, o
+                (recurso, id) para un elemento
+            version: Versión en la que se pidió la entrada
+        """
+        with self._lock:
+            changed = self._changed.get(key)
+            if changed is None:
+                return version < self._floor
+            return changed > version
+
+    def _apply(self, event: str, data: Dict[str, Any]):
+        """Anota un aviso recibido"""
+        with self._lock:
+            self.version += 1
+            if event != "change" or len(self._changed) > MAX_TRACKED:
+                # reset del servidor o demasiados elementos: todo lo anterior queda obsoleto
+                self._changed.clear()
+                self._floor = self.version
+                return
+            resource = data["entity"]
+            self._changed[resource] = self.version
+            for item_id in data["ids"]:
+                self._changed[(resource, item_id)] = self.version
+
+    def _listen(self):
+        """Lee el stream hasta que se corta"""
+        with requests.get(f"{self.base_url}/events", stream=True,
+                          timeout=(DEFAULT_TIMEOUT[0], READ_TIMEOUT)) as response:
+            response.raise_for_status()
+            # Al (re)conectar no se sabe qué se perdió mientras tanto
+            self.connected = True
+            self._apply("reset", {})
+            event, data = "message", ""
+            for line in response.iter_lines(decode_unicode=True):
+                if self._stop.is_set():
+                    return
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data += line[5:].strip()
+                elif not line:
+                    if data:
+                        self._apply(event, json.loads(data))
+                    event, data = "message", ""
+
+    def _run(self):
+        """Bucle del hilo: escucha y reconecta con espera creciente si falla"""
+        backoff = 1
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._listen()
+            except (requests.RequestException, ValueError):
+                pass
+            self.connected = False
+            if time.monotonic() - started > MAX_BACKOFF:
+                backoff = 1
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def close(self):
+        """Detiene el hilo de fondo (termina al recibir el siguiente mensaje o latido)"""
+        self._stop.set()
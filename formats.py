@@ -0,0 +1,93 @@
+import io
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import BigInteger, Date, DateTime, Integer
+
+from models import public_columns
+
+#formats.py permite pedir los listados en formato de columnas con la cabecera Accept, para cargarlos
+#directamente en pandas/pyarrow sin parsear JSON ni inferir tipos:
+#- application/vnd.apache.arrow.stream: stream IPC de Apache Arrow
+#- application/vnd.apache.parquet: archivo Parquet comprimido (lo más pequeño para tablas grandes)
+#La tabla se construye por columnas a partir de las filas de la consulta, con los tipos de models.py.
+#pyarrow es opcional: si no está instalado se responde en JSON como siempre.
+
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+MEDIA_TYPES = (ARROW, PARQUET)
+
+PARQUET_COMPRESSION = "zstd"
+
+#Para /docs: los listados también pueden responder en estos formatos
+OPENAPI_RESPONSES = {200: {"content": {ARROW: {}, PARQUET: {}}}}
+
+def _pyarrow():
+    try:
+        import pyarrow      #dependencia opcional: solo se importa al pedir Arrow/Parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def negotiate(request: Request) -> Optional[str]:
+    # Formato de columnas pedido en Accept (el de mayor q), o None para responder en JSON
+    accepted = []
+    for position, item in enumerate(request.headers.get("accept", "").split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in MEDIA_TYPES and quality > 0:
+            accepted.append((-quality, position, media_type))
+    if not accepted or _pyarrow() is None:
+        return None
+    return min(accepted)[2]
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, BigInteger):
+        return pa.int64()
+    if isinstance(column.type, Integer):
+        return pa.int32()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+def schema(model):
+    pa = _pyarrow()
+    return pa.schema([pa.field(column.key, _arrow_type(pa, column), nullable=column.nullable)
+                      for column in public_columns(model)])
+
+def table(rows: list, model):
+    # rows: tuplas con las columnas de la tabla en orden (services.list_*(as_rows=True)) o diccionarios
+    # (índice en memoria). Se transponen a una lista por columna, sin pasar por objetos por fila.
+    pa = _pyarrow()
+    table_schema = schema(model)
+    if rows and isinstance(rows[0], dict):
+        columns = [[row[name] for row in rows] for name in table_schema.names]
+    else:
+        columns = list(zip(*rows)) if rows else [[] for _ in table_schema.names]
+    return pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, table_schema)],
+                                schema=table_schema)
+
+def response(rows: list, model, media_type: str, total: int) -> Response:
+    pa = _pyarrow()
+    data = table(rows, model)
+    sink = io.BytesIO()
+    if media_type == ARROW:
+        with pa.ipc.new_stream(sink, data.schema) as writer:
+            writer.write_table(data)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(data, sink, compression=PARQUET_COMPRESSION)
+    return Response(sink.getvalue(), media_type=media_type, headers={"X-Total-Count": str(total), "Vary": "Accept"})
+
+def reject_include(include: tuple):
+    # Las relaciones anidadas solo se devuelven en JSON
+    if include:
+        raise HTTPException(status_code=400, detail="include is only supported in JSON responses")
@@ -2,10 +2,17 @@
 # http://127.0.0.1:8000/redoc
 # http://127.0.0.1:8000/docs
 
-from fastapi import FastAPI, Depends, HTTPException
-import services, schemas
-from db import get_db
-from sqlalchemy.orm import Session
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, Request, Header
+from fastapi.responses import StreamingResponse, JSONResponse
+import services, schemas, models, events, snapshot, catalog_index, admission, deadlines, analytics, formats, dedup
+from db import get_db, get_engine, dispose_engine, pool_status, SessionLocal
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, configure_mappers
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Literal, Optional
 
 #services: Aquí están las funciones que hacen la lógica real de CRUD.
 #schemas: Valida y estructura la entrada/salida de datos.
@@ -17,18 +24,354 @@ from sqlalchemy.orm import Session
 #En FastAPI, el decorador @app.get(...) o @app.post(...)
 # le dice a la aplicación que esa función se debe ejecutar cuando un cliente (como un navegador o frontend) haga una petición HTTP de cierto tipo a cierta URL.
 
-app = FastAPI() #crea la aplicacion web
+#ARRANQUE EN FRÍO-----------------------------------------------------------------------------------------------
+#SQLAlchemy configura los mappers y compila cada consulta la primera vez que se usa, y la primera petición abre
+#la primera conexión del pool. Hacerlo en el arranque, antes de aceptar tráfico, evita que el primer usuario
+#de cada worker nuevo (autoescalado) pague ese coste. `python benchmarks/bench_startup.py` lo mide.
+def _warm_up(session_factory):
+    configure_mappers()     #relaciones entre Artist, Album y Song
+    app.openapi()           #esquema de /docs, que se genera en la primera visita
+    try:
+        db = session_factory()
+    except OSError as e:    #snapshot aún no disponible
+        print(f"Precalentamiento omitido: {e}")
+        return
+    try:
+        #Una página (con COUNT) de cada entidad, sin relaciones y con cada include: quedan compiladas las
+        #consultas de los listados y de ?include= (cada combinación de relaciones es una consulta distinta)
+        for model, list_items in ((models.Artist, services.list_artists), (models.Album, services.list_albums),
+                                  (models.Song, services.list_songs)):
+            list_items(db, limit=1)
+            for path in services.INCLUDES[model]:
+                for item in list_items(db, limit=1, include=(path,))[0]:
+                    _expand(item, _include_tree((path,)))
+        dedup.detector.load(db)     #índice de posibles duplicados (firmas de todos los nombres)
+    except Exception as e:  #la base puede no estar lista todavía; /ready lo indica
+        print(f"Precalentamiento incompleto: {e}")
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #Arranque: se precalientan mappers, esquemas, consultas y conexiones
+    session_factory = snapshot.reader.session if snapshot.reader is not None else SessionLocal
+    _warm_up(session_factory)
+    #El broker de /events reparte los avisos en el event loop del servidor
+    events.broker.bind(asyncio.get_running_loop())
+    #Índice en memoria opcional (BUENAONDA_CATALOG_INDEX=1), cargado desde la misma fuente que las lecturas
+    catalog_index.start(session_factory)
+    yield
+    #Apagado: se cierran los streams abiertos
+    events.broker.close()
+    catalog_index.stop()
+    dispose_engine()        #cierra las conexiones del pool una vez terminadas las peticiones en curso
+
+app = FastAPI(lifespan=lifespan) #crea la aplicacion web
+
+#MODO SOLO LECTURA (snapshot)----------------------------------------------------------------------------------
+#Con BUENAONDA_SNAPSHOT_PATH las lecturas salen del archivo exportado con `python manage.py export-snapshot`
+#y no se abre ninguna conexión a PostgreSQL; las escrituras se rechazan.
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+if snapshot.reader is not None:
+    app.dependency_overrides[get_db] = snapshot.reader.get_db
+
+    @app.middleware("http")
+    async def read_only(request: Request, call_next):
+        if request.method not in READ_METHODS:
+            return JSONResponse({"detail": "Read-only snapshot mode"}, status_code=405,
+                                headers={"Allow": ", ".join(READ_METHODS)})
+        return await call_next(request)
+
+#LÍMITES DE TIEMPO--------------------------------------------------------------------------------------------
+#Cada consulta tiene un statement_timeout según la ruta (deadlines.ROUTE_STATEMENT_TIMEOUTS) y se cancela en el
+#servidor si el cliente se desconecta; una consulta cancelada por tiempo responde 504.
+app.add_middleware(deadlines.CancelOnDisconnectMiddleware)
+
+@app.exception_handler(OperationalError)
+async def query_canceled(request: Request, exc: OperationalError):
+    if deadlines.is_query_canceled(exc):
+        return JSONResponse({"detail": "Query exceeded its deadline"}, status_code=504)
+    raise exc
+
+#CONTROL DE ADMISIÓN------------------------------------------------------------------------------------------
+#Como mucho POOL_SIZE + MAX_OVERFLOW peticiones a la vez; el resto espera en una cola por prioridad o recibe
+#503 con Retry-After (ver admission.py). Se añade al final para que sea el middleware más externo.
+app.add_middleware(admission.AdmissionMiddleware, limiter=admission.limiter)
+
+#Paginación de los listados: si no se envía limit se devuelve todo (comportamiento original).
+#El total de filas que cumplen el filtro se devuelve en la cabecera X-Total-Count.
+MAX_PAGE_SIZE = 500
+Order = Literal["asc", "desc"]
+
+def _set_total(response: Response, total: int):
+    response.headers["X-Total-Count"] = str(total)
+
+#Búsqueda por prefijo para los selectores (typeahead). Estas rutas deben declararse antes que /{id}.
+MAX_LOOKUP_RESULTS = 50
+
+#Lectura por lotes: /batch?ids=1,2,3 resuelve hasta MAX_BATCH_IDS ids en una sola consulta. También antes que /{id}.
+MAX_BATCH_IDS = 200
+
+def _parse_ids(ids: str) -> list[int]:
+    try:
+        parsed = [int(item) for item in ids.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return parsed
+
+#Relaciones embebidas: ?include=artist,songs (rutas con punto para anidar, p. ej. album.artist).
+#Las relaciones admitidas por entidad y cómo se cargan están en services.INCLUDES.
+def _parse_include(include: Optional[str], model) -> tuple:
+    if not include:
+        return ()
+    paths = tuple(dict.fromkeys(path.strip() for path in include.split(",") if path.strip()))
+    unknown = [path for path in paths if path not in services.INCLUDES[model]]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(unknown)}. "
+                                                    f"Allowed: {', '.join(services.INCLUDES[model])}")
+    return paths
+
+def _include_tree(paths: tuple) -> dict:
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+def _expand(obj, tree: dict) -> dict:
+    # Columnas de la entidad más solo las relaciones pedidas (ya cargadas por services, sin lazy loads)
+    data = {column.key: getattr(obj, column.key) for column in inspect(obj).mapper.column_attrs}
+    for name, subtree in tree.items():
+        related = getattr(obj, name)
+        if related is None:
+            data[name] = None
+        elif isinstance(related, list):
+            data[name] = [_expand(item, subtree) for item in related]
+        else:
+            data[name] = _expand(related, subtree)
+    return data
+
+#SALUD--------------------------------------------------------------------------------------------------------
+#/health solo indica que el proceso responde (no toca la base de datos).
+#/ready comprueba que la base de datos responde y que queda al menos una conexión libre en el pool.
+#/metrics muestra la carga del worker (control de admisión y pool).
+MIN_POOL_HEADROOM = 1
+
+@app.get("/health", tags=["Salud"])
+def health():
+    return {"status": "ok"}
+
+@app.get("/ready", tags=["Salud"])
+def ready(response: Response):
+    if catalog_index.index is not None and not catalog_index.index.ready:
+        response.status_code = 503
+        return {"status": "unavailable", "reason": "catalog index loading"}
+    if snapshot.reader is not None:     #modo solo lectura: basta con que el archivo se pueda leer
+        try:
+            return {"status": "ready", "snapshot": snapshot.reader.info()}
+        except OSError:
+            response.status_code = 503
+            return {"status": "unavailable", "reason": "snapshot missing"}
+    pool = pool_status()
+    if pool["available"] < MIN_POOL_HEADROOM:     #Se comprueba antes de pedir conexión para no quedarse esperando al pool
+        response.status_code = 503
+        return {"status": "unavailable", "reason": "pool exhausted", "pool": pool}
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        response.status_code = 503
+        return {"status": "unavailable", "reason": "database unreachable", "pool": pool}
+    return {"status": "ready", "pool": pool}
+
+@app.get("/metrics", tags=["Salud"])
+def metrics():
+    #Peticiones en curso, en cola y rechazadas por el control de admisión, y uso del pool
+    return {"admission": admission.limiter.metrics(), "pool": pool_status()}
+
+#CAMBIOS------------------------------------------------------------------------------------------------------
+#Registro incremental de escrituras: un cliente carga el catálogo una vez, guarda el cursor de /changes/latest
+#y después pide /changes?since=<cursor> para aplicar solo los cambios posteriores.
+MAX_CHANGES = 1000
+
+@app.get("/changes", response_model=schemas.ChangeFeed, tags=["Cambios"])
+def get_changes(since: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=MAX_CHANGES), db: Session = Depends(get_db)):
+    changes, has_more = services.list_changes(db, since, limit)
+    return {"changes": changes, "next_cursor": changes[-1].seq if changes else since, "has_more": has_more}
+
+@app.get("/changes/latest", tags=["Cambios"])
+def get_latest_change(db: Session = Depends(get_db)):
+    return {"cursor": services.latest_change_seq(db)}
+
+#Avisos en vivo (Server-Sent Events): "event: change" con {"entity", "op", "ids"} tras cada escritura
+#(el id del mensaje es el seq de /changes). "event: reset" pide al cliente recargar todo.
+@app.get("/events", tags=["Cambios"])
+async def stream_events(request: Request):
+    return StreamingResponse(events.broker.stream(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+#ESTADÍSTICAS-------------------------------------------------------------------------------------------------
+#Resúmenes agregados en la base de datos (ver analytics.py); se recalculan solo tras nuevas escrituras.
+MIN_DURATION_BUCKET = 10
+
+@app.get("/analytics/genres", response_model=list[schemas.GenreStats], tags=["Estadísticas"])
+def get_genre_stats(db: Session = Depends(get_db)):
+    return analytics.songs_by_genre(db)
+
+@app.get("/analytics/countries", response_model=list[schemas.CountryStats], tags=["Estadísticas"])
+def get_country_stats(db: Session = Depends(get_db)):
+    return analytics.artists_by_country(db)
+
+@app.get("/analytics/release-years", response_model=list[schemas.ReleaseYearStats], tags=["Estadísticas"])
+def get_release_year_stats(db: Session = Depends(get_db)):
+    return analytics.albums_by_release_year(db)
+
+@app.get("/analytics/durations", response_model=schemas.DurationStats, tags=["Estadísticas"])
+def get_duration_stats(bucket: int = Query(30, ge=MIN_DURATION_BUCKET, le=3600),
+                       music_genre: Optional[str] = None, db: Session = Depends(get_db)):
+    return analytics.duration_distribution(db, bucket, music_genre)
+
+#LOTES DE ESCRITURAS------------------------------------------------------------------------------------------
+#POST /batch aplica en orden varias altas, modificaciones y bajas de artistas, álbumes y canciones en una sola
+#transacción (un commit y un aviso a /events). Si una operación falla se deshace todo y se responde con el
+#código de esa operación y su posición en "index".
+MAX_BATCH_OPERATIONS = 200
+
+@app.post("/batch", response_model=schemas.BatchResponse, tags=["Lotes"])
+def run_batch(batch: schemas.BatchRequest, db: Session = Depends(get_db)):
+    if not 1 <= len(batch.operations) <= MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=422, detail=f"Between 1 and {MAX_BATCH_OPERATIONS} operations per batch")
+    try:
+        return {"results": services.run_batch(db, batch.operations)}
+    except services.BatchError as e:
+        operation = batch.operations[e.index]
+        return JSONResponse({"detail": e.detail, "index": e.index, "op": operation.op, "entity": operation.entity},
+                            status_code=e.status_code)
+
+#PATCH /artists/bulk, /album/bulk y /song/bulk cambian los mismos campos en todas las filas que cumplen el filtro
+#con un solo UPDATE (ver services.bulk_update_*). Se exige algún filtro para no modificar la tabla entera por error.
+def _bulk_arguments(update, model) -> tuple[dict, dict]:
+    # (valores a cambiar, filtros) de un *BulkUpdate
+    values = update.set.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=422, detail="No fields to update")
+    for key, value in values.items():
+        if value is None and not model.__table__.columns[key].nullable:
+            raise HTTPException(status_code=422, detail=f"{key} cannot be null")
+    #Los filtros vacíos ("q": "") no filtran nada en el listado, así que tampoco cuentan aquí
+    filters = {key: value for key, value in update.filter.model_dump(exclude_none=True).items() if value != ""}
+    if not filters:
+        raise HTTPException(status_code=422, detail="A filter or a list of ids is required")
+    return values, filters
+
+def _bulk_result(ids: list[int]) -> dict:
+    return {"updated": len(ids), "ids": ids}
+
+#DUPLICADOS---------------------------------------------------------------------------------------------------
+#Posibles duplicados de un nombre antes de darlo de alta (dedup.py): mismo nombre salvo acentos, mayúsculas,
+#espacios, signos o un "feat.". Los álbumes se comparan con los del mismo artista y las canciones con las del
+#mismo artista que su álbum. Las altas devuelven además los ids parecidos en la cabecera X-Possible-Duplicates.
+@app.get("/duplicates/{entity}", response_model=list[schemas.DuplicateCandidate], tags=["Duplicados"])
+def find_duplicates(entity: Literal["artist", "album", "song"], name: str = Query(min_length=1),
+                    artist_id: Optional[int] = None, album_id: Optional[int] = None,
+                    exclude_id: Optional[int] = None, db: Session = Depends(get_db)):
+    if entity == "album" and artist_id is None:
+        raise HTTPException(status_code=422, detail="artist_id is required for albums")
+    if entity == "song" and artist_id is None and album_id is None:
+        raise HTTPException(status_code=422, detail="album_id or artist_id is required for songs")
+    return dedup.detector.find(db, entity, name, artist_id=artist_id, album_id=album_id, exclude_id=exclude_id)
+
+def _flag_duplicates(response: Response, db: Session, entity: str, created, name: str, **scope):
+    # Cabecera X-Possible-Duplicates con los ids parecidos al recién creado (no impide el alta)
+    if created is None:
+        return
+    matches = dedup.detector.find(db, entity, name, exclude_id=created.id, **scope)
+    if matches:
+        response.headers["X-Possible-Duplicates"] = ",".join(str(match["id"]) for match in matches)
+
+#CONCURRENCIA OPTIMISTA---------------------------------------------------------------------------------------
+#Las lecturas por id y las modificaciones devuelven la versión de la fila en la cabecera ETag ("3"). Quien la
+#envía en If-Match al modificar o borrar solo escribe si nadie la ha cambiado desde que la leyó; si no, recibe
+#412 con la versión actual y vuelve a leer. Sin If-Match (o con If-Match: *) se escribe como siempre.
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+def _expected_version(if_match: Optional[str]) -> Optional[int]:
+    # If-Match: "3" -> 3; sin cabecera o * -> None (sin comprobación)
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+        return int(tag[1:-1])
+    raise HTTPException(status_code=412, detail="If-Match must be an ETag returned by this API")
+
+@app.exception_handler(services.VersionConflictError)
+async def version_conflict(request: Request, exc: services.VersionConflictError):
+    return JSONResponse({"detail": str(exc), "version": exc.current}, status_code=412,
+                        headers={"ETag": _etag(exc.current)})
+
+@app.exception_handler(StaleDataError)
+async def concurrent_write(request: Request, exc: StaleDataError):
+    #Otra escritura cambió la fila entre la lectura y el UPDATE/DELETE condicional
+    return JSONResponse({"detail": "Modified concurrently, read it again"}, status_code=412)
 
 #ARTIST--------------------------------------------------------------------------------------------------------
-@app.get("/artist/", response_model=list[schemas.ArtistResponse], tags=["Artistas"])
-def get_all_artist(db: Session = Depends(get_db)):  #Depends(get_db): Inyecta automáticamente una sesión de la base de datos a cada función.
-    return services.get_all_artists(db)
+@app.get("/artist/", response_model=list[schemas.ArtistDetail], response_model_exclude_unset=True, tags=["Artistas"],
+         responses=formats.OPENAPI_RESPONSES)
+def get_all_artist(request: Request, response: Response,
+                   skip: int = Query(0, ge=0),
+                   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                   sort: Literal["id", "stage_name", "real_name", "music_genre", "country_of_origin",
+                                 "album_count", "track_count", "total_duration", "last_release_date"] = "id",
+                   order: Order = "asc",
+                   q: Optional[str] = None,
+                   music_genre: Optional[str] = None,
+                   country_of_origin: Optional[str] = None,
+                   include: Optional[str] = None,
+                   db: Session = Depends(get_db)):  #Depends(get_db): Inyecta automáticamente una sesión de la base de datos a cada función.
+    include = _parse_include(include, models.Artist)
+    media_type = formats.negotiate(request)     #Arrow/Parquet según Accept, o None para JSON
+    if media_type:
+        formats.reject_include(include)
+    if catalog_index.index is not None and catalog_index.index.ready and not include:     #listado resuelto en memoria
+        artists, total = catalog_index.index.list("artists", skip, limit, sort, order == "desc", q,
+                                                  {"music_genre": music_genre, "country_of_origin": country_of_origin})
+        if media_type:
+            return formats.response(artists, models.Artist, media_type, total)
+        _set_total(response, total)
+        return artists
+    artists, total = services.list_artists(db, skip, limit, sort, order == "desc", q, music_genre, country_of_origin, include,
+                                           as_rows=media_type is not None)
+    if media_type:
+        return formats.response(artists, models.Artist, media_type, total)
+    _set_total(response, total)
+    tree = _include_tree(include)
+    return [_expand(artist, tree) for artist in artists]
+
+@app.get("/artists/lookup", response_model=list[schemas.LookupItem], tags=["Artistas"])
+def lookup_artists(q: str = "", limit: int = Query(10, ge=1, le=MAX_LOOKUP_RESULTS), db: Session = Depends(get_db)):
+    return services.lookup_artists(db, q, limit)
 
-@app.get("/artists/{id}", response_model= schemas.ArtistResponse, tags=["Artistas"])
-def get_artist_by_id(id: int, db: Session= Depends(get_db)):
-    artist_queryset = services.get_artist_by_id(db, id)
+@app.get("/artists/batch", response_model=list[schemas.ArtistResponse], tags=["Artistas"])
+def get_artists_by_ids(ids: str, db: Session = Depends(get_db)):
+    return services.get_artists_by_ids(db, _parse_ids(ids))
+
+@app.patch("/artists/bulk", response_model=schemas.BulkUpdateResult, tags=["Artistas"])
+def bulk_update_artists(update: schemas.ArtistBulkUpdate, db: Session = Depends(get_db)):
+    values, filters = _bulk_arguments(update, models.Artist)
+    return _bulk_result(services.bulk_update_artists(db, values, **filters))
+
+@app.get("/artists/{id}", response_model= schemas.ArtistDetail, response_model_exclude_unset=True, tags=["Artistas"])
+def get_artist_by_id(id: int, response: Response, include: Optional[str] = None, db: Session= Depends(get_db)):
+    include = _parse_include(include, models.Artist)
+    artist_queryset = services.get_artist_by_id(db, id, include)
     if artist_queryset:
-        return artist_queryset
+        response.headers["ETag"] = _etag(artist_queryset.version)
+        return _expand(artist_queryset, _include_tree(include))
     raise HTTPException(status_code= 404, detail="Invalid artist id Provided")
 
 @app.get("/artists/by-name/{name}", response_model= schemas.ArtistResponse, tags=["Artistas"])
@@ -39,33 +382,80 @@ def get_artist_by_name(name : str, db: Session = Depends(get_db)):
     raise HTTPException(status_code = 404, detail="Artist not Found")
 
 @app.post("/artist/", response_model=schemas.ArtistCreate, tags=["Artistas"])     #Recibe un JSON con la info del artista y lo guarda en la base de datos.
-def create_artist(artist : schemas.ArtistCreate, db: Session = Depends(get_db)):
-    return services.create_artist(db, artist)
+def create_artist(artist : schemas.ArtistCreate, response: Response, db: Session = Depends(get_db)):
+    new_artist = services.create_artist(db, artist)
+    _flag_duplicates(response, db, "artist", new_artist, artist.stage_name)
+    return new_artist
 
 @app.put("/artist/{id}", response_model=schemas.ArtistResponse, tags=["Artistas"])
-def update_artist(artist : schemas.ArtistCreate, id: int, db: Session = Depends(get_db)): #artist son los nuevos datos validados por artist create
-    db_update = services.update_artist(db, artist,id)
+def update_artist(artist : schemas.ArtistCreate, id: int, response: Response, if_match: Optional[str] = Header(None),
+                  db: Session = Depends(get_db)): #artist son los nuevos datos validados por artist create
+    db_update = services.update_artist(db, artist,id, _expected_version(if_match))
     if not db_update:
         raise HTTPException(status_code=404, detail="Artist not Found")
+    response.headers["ETag"] = _etag(db_update.version)
     return db_update
 
 @app.delete("/artists/{id}", response_model= schemas.ArtistResponse, tags=["Artistas"])
-def delete_artist(id: int, db: Session = Depends(get_db)):
-    delete_entry = services.delete_artist(db,id)
+def delete_artist(id: int, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    delete_entry = services.delete_artist(db,id, _expected_version(if_match))
     if delete_entry:
         return delete_entry
     raise HTTPException(status_code=404, detail = "Artist not Found")
 
 #ALBUM---------------------------------------------------------------------------------------------------
-@app.get("/album/", response_model=list[schemas.AlbumResponse], tags=["Albums"])
-def get_all_albums(db: Session = Depends(get_db)):
-    return services.get_all_albums(db)
+@app.get("/album/", response_model=list[schemas.AlbumDetail], response_model_exclude_unset=True, tags=["Albums"],
+         responses=formats.OPENAPI_RESPONSES)
+def get_all_albums(request: Request, response: Response,
+                   skip: int = Query(0, ge=0),
+                   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                   sort: Literal["id", "title", "release_date", "artist_id", "track_count", "total_duration"] = "id",
+                   order: Order = "asc",
+                   q: Optional[str] = None,
+                   artist_id: Optional[int] = None,
+                   include: Optional[str] = None,
+                   db: Session = Depends(get_db)):
+    include = _parse_include(include, models.Album)
+    media_type = formats.negotiate(request)     #Arrow/Parquet según Accept, o None para JSON
+    if media_type:
+        formats.reject_include(include)
+    if catalog_index.index is not None and catalog_index.index.ready and not include:
+        albums, total = catalog_index.index.list("albums", skip, limit, sort, order == "desc", q, {"artist_id": artist_id})
+        if media_type:
+            return formats.response(albums, models.Album, media_type, total)
+        _set_total(response, total)
+        return albums
+    albums, total = services.list_albums(db, skip, limit, sort, order == "desc", q, artist_id, include,
+                                         as_rows=media_type is not None)
+    if media_type:
+        return formats.response(albums, models.Album, media_type, total)
+    _set_total(response, total)
+    tree = _include_tree(include)
+    return [_expand(album, tree) for album in albums]
+
+@app.get("/album/lookup", response_model=list[schemas.LookupItem], tags=["Albums"])
+def lookup_albums(q: str = "", limit: int = Query(10, ge=1, le=MAX_LOOKUP_RESULTS), db: Session = Depends(get_db)):
+    return services.lookup_albums(db, q, limit)
+
+@app.get("/album/batch", response_model=list[schemas.AlbumResponse], tags=["Albums"])
+def get_albums_by_ids(ids: str, db: Session = Depends(get_db)):
+    return services.get_albums_by_ids(db, _parse_ids(ids))
+
+@app.patch("/album/bulk", response_model=schemas.BulkUpdateResult, tags=["Albums"])
+def bulk_update_albums(update: schemas.AlbumBulkUpdate, db: Session = Depends(get_db)):
+    values, filters = _bulk_arguments(update, models.Album)
+    updated = services.bulk_update_albums(db, values, **filters)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Artist not Found")
+    return _bulk_result(updated)
 
-@app.get("/album/{id}", response_model= schemas.AlbumResponse, tags=["Albums"])
-def get_album_by_id(id: int, db: Session= Depends(get_db)):
-    album_queryset = services.get_album_by_id(db, id)
+@app.get("/album/{id}", response_model= schemas.AlbumDetail, response_model_exclude_unset=True, tags=["Albums"])
+def get_album_by_id(id: int, response: Response, include: Optional[str] = None, db: Session= Depends(get_db)):
+    include = _parse_include(include, models.Album)
+    album_queryset = services.get_album_by_id(db, id, include)
     if album_queryset:
-        return album_queryset
+        response.headers["ETag"] = _etag(album_queryset.version)
+        return _expand(album_queryset, _include_tree(include))
     raise HTTPException(status_code= 404, detail="Invalid album id Provided")
 
 @app.get("/album/by-name/{name}", response_model= schemas.AlbumResponse, tags=["Albums"])
@@ -76,44 +466,95 @@ def get_album_by_name(name : str, db: Session = Depends(get_db)):
     raise HTTPException(status_code = 404, detail="Album not Found")
 
 @app.post("/album/", response_model=schemas.AlbumCreate, tags=["Albums"])
-def create_album(album : schemas.AlbumCreate, db: Session = Depends(get_db)):
-    return services.create_album(db, album)
+def create_album(album : schemas.AlbumCreate, response: Response, db: Session = Depends(get_db)):
+    new_album = services.create_album(db, album)
+    _flag_duplicates(response, db, "album", new_album, album.title, artist_id=album.artist_id)
+    return new_album
 
 @app.put("/album/{id}", response_model=schemas.AlbumResponse, tags=["Albums"])
-def update_album(album : schemas.AlbumCreate, id: int, db: Session = Depends(get_db)):
-    db_update = services.update_album(db, id, album)
+def update_album(album : schemas.AlbumCreate, id: int, response: Response, if_match: Optional[str] = Header(None),
+                 db: Session = Depends(get_db)):
+    db_update = services.update_album(db, id, album, _expected_version(if_match))
     if not db_update:
         raise HTTPException(status_code=404, detail="Album not Found")
+    response.headers["ETag"] = _etag(db_update.version)
     return db_update
 
 @app.delete("/album/{id}", response_model= schemas.AlbumResponse, tags=["Albums"])
-def delete_album(id: int, db: Session = Depends(get_db)):
-    delete_entry = services.delete_album(db,id)
+def delete_album(id: int, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    delete_entry = services.delete_album(db,id, _expected_version(if_match))
     if delete_entry:
         return delete_entry
     raise HTTPException(status_code=404, detail = "Album not Found")
 
 #SONGS-----------------------------------------------------------------------------------------
 @app.post("/song/", response_model=schemas.SongCreate, tags=["Songs"])
-def create_song(song: schemas.SongCreate, db: Session = Depends(get_db)):
-    return services.create_song(db, song)
+def create_song(song: schemas.SongCreate, response: Response, db: Session = Depends(get_db)):
+    new_song = services.create_song(db, song)
+    _flag_duplicates(response, db, "song", new_song, song.title, album_id=song.album_id)
+    return new_song
 
 @app.put("/song/{id}", response_model=schemas.SongResponse, tags=["Songs"])
-def update_song(song : schemas.SongCreate, id: int, db: Session = Depends(get_db)):
-    db_update = services.update_song(db, id, song)
+def update_song(song : schemas.SongCreate, id: int, response: Response, if_match: Optional[str] = Header(None),
+                db: Session = Depends(get_db)):
+    db_update = services.update_song(db, id, song, _expected_version(if_match))
     if not db_update:
         raise HTTPException(status_code=404, detail="Song not Found")
+    response.headers["ETag"] = _etag(db_update.version)
     return db_update
 
-@app.get("/song/", response_model=list[schemas.SongResponse], tags=["Songs"])   #@app.get("/artist/") está diciendo:
-def get_all_songs(db: Session = Depends(get_db)):                               #“Cuando alguien haga un GET a la ruta /artist/, ejecuta la función get_all_artists()”.
-    return services.get_all_songs(db)
+@app.get("/song/", response_model=list[schemas.SongDetail], response_model_exclude_unset=True, tags=["Songs"],
+         responses=formats.OPENAPI_RESPONSES)   #@app.get("/artist/") está diciendo:
+def get_all_songs(request: Request, response: Response,                                           #“Cuando alguien haga un GET a la ruta /artist/, ejecuta la función get_all_artists()”.
+                  skip: int = Query(0, ge=0),
+                  limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                  sort: Literal["id", "title", "duration", "album_id"] = "id",
+                  order: Order = "asc",
+                  q: Optional[str] = None,
+                  album_id: Optional[int] = None,
+                  include: Optional[str] = None,
+                  db: Session = Depends(get_db)):
+    include = _parse_include(include, models.Song)
+    media_type = formats.negotiate(request)     #Arrow/Parquet según Accept, o None para JSON
+    if media_type:
+        formats.reject_include(include)
+    if catalog_index.index is not None and catalog_index.index.ready and not include:
+        songs, total = catalog_index.index.list("songs", skip, limit, sort, order == "desc", q, {"album_id": album_id})
+        if media_type:
+            return formats.response(songs, models.Song, media_type, total)
+        _set_total(response, total)
+        return songs
+    songs, total = services.list_songs(db, skip, limit, sort, order == "desc", q, album_id, include,
+                                       as_rows=media_type is not None)
+    if media_type:
+        return formats.response(songs, models.Song, media_type, total)
+    _set_total(response, total)
+    tree = _include_tree(include)
+    return [_expand(song, tree) for song in songs]
+
+@app.get("/song/lookup", response_model=list[schemas.LookupItem], tags=["Songs"])
+def lookup_songs(q: str = "", limit: int = Query(10, ge=1, le=MAX_LOOKUP_RESULTS), db: Session = Depends(get_db)):
+    return services.lookup_songs(db, q, limit)
+
+@app.get("/song/batch", response_model=list[schemas.SongResponse], tags=["Songs"])
+def get_songs_by_ids(ids: str, db: Session = Depends(get_db)):
+    return services.get_songs_by_ids(db, _parse_ids(ids))
 
-@app.get("/song/{id}", response_model= schemas.SongResponse, tags=["Songs"])
-def get_song_by_id(id: int, db: Session= Depends(get_db)):
-    song_queryset = services.get_song_by_id(db, id)
+@app.patch("/song/bulk", response_model=schemas.BulkUpdateResult, tags=["Songs"])
+def bulk_update_songs(update: schemas.SongBulkUpdate, db: Session = Depends(get_db)):
+    values, filters = _bulk_arguments(update, models.Song)
+    updated = services.bulk_update_songs(db, values, **filters)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Album not Found")
+    return _bulk_result(updated)
+
+@app.get("/song/{id}", response_model= schemas.SongDetail, response_model_exclude_unset=True, tags=["Songs"])
+def get_song_by_id(id: int, response: Response, include: Optional[str] = None, db: Session= Depends(get_db)):
+    include = _parse_include(include, models.Song)
+    song_queryset = services.get_song_by_id(db, id, include)
     if song_queryset:
-        return song_queryset
+        response.headers["ETag"] = _etag(song_queryset.version)
+        return _expand(song_queryset, _include_tree(include))
     raise HTTPException(status_code= 404, detail="Invalid song id Provided")
 
 @app.get("/song/by-name/{title}", response_model= schemas.SongResponse, tags=["Songs"])
@@ -125,8 +566,8 @@ def get_song_by_title(title : str, db: Session = Depends(get_db)):
 
 
 @app.delete("/song/{id}", response_model= schemas.SongResponse, tags=["Songs"])
-def delete_song(id: int, db: Session = Depends(get_db)):
-    delete_entry = services.delete_song(db,id)
+def delete_song(id: int, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    delete_entry = services.delete_song(db,id, _expected_version(if_match))
     if delete_entry:
         return delete_entry
     raise HTTPException(status_code=404, detail = "Song not Found")
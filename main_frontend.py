@@ -2,9 +2,41 @@
 
 import streamlit as st
 from api_st import APIClient
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from data_st import DataStore
+from connection_st import display_connection_status
 from artist_st import ArtistView
 from album_st import AlbumView
 from song_st import SongView
+from stats_st import StatsView
+
+
+@st.cache_resource(show_spinner=False)
+def get_api_client(api_url: str) -> APIClient:
+    """
+    Devuelve un APIClient compartido entre sesiones y reruns para la URL dada,
+    de modo que el pool de conexiones keep-alive se reutilice.
+    """
+    return APIClient(api_url)
+
+
+@st.cache_resource(show_spinner=False)
+def get_async_api_client(api_url: str) -> AsyncAPIClient:
+    """
+    Devuelve un AsyncAPIClient compartido para la URL dada, usado para cargar
+    en paralelo los datos de una página.
+    """
+    return AsyncAPIClient(api_url)
+
+
+@st.cache_resource(show_spinner=False)
+def get_event_listener(api_url: str) -> EventListener:
+    """
+    Devuelve el EventListener compartido para la URL dada: una sola conexión a
+    /events para todas las sesiones, que invalida en cada una solo lo que cambió.
+    """
+    return EventListener(api_url)
 
 
 def main():
@@ -26,15 +58,12 @@ def main():
     )
     
     # Verificar conexión con la API
-    api_client = APIClient(api_url)
+    api_client = get_api_client(api_url)
+    async_client = get_async_api_client(api_url)
+    events = get_event_listener(api_url)
     
-    try:
-        # Intentar obtener artistas para verificar conexión
-        api_client.get_all_artists()
-        st.sidebar.success("Conectado a la API")
-    except Exception as e:
-        st.sidebar.error(f"Error de conexión: {str(e)}")
-        st.sidebar.warning("Asegúrate de que el backend esté en ejecución")
+    # /health y /ready, con caché de pocos segundos en el cliente
+    display_connection_status(api_url)
 
     
     # Renderizar sidebar
@@ -47,7 +76,7 @@ def main():
         st.subheader("Navegación")
         page = st.radio(
             "Selecciona una sección:",
-            ["Inicio", "Artistas", "Álbumes", "Canciones"]
+            ["Inicio", "Artistas", "Álbumes", "Canciones", "Estadísticas"]
         )
         
         st.markdown("---")
@@ -55,19 +84,22 @@ def main():
     
     # Renderizar contenido principal
     if page == "Inicio":
-        render_home(api_client)
+        render_home(api_client, async_client, events)
     elif page == "Artistas":
-        artist_view = ArtistView(api_client)
+        artist_view = ArtistView(api_client, async_client, events)
         artist_view.render()
     elif page == "Álbumes":
-        album_view = AlbumView(api_client)
+        album_view = AlbumView(api_client, async_client, events)
         album_view.render()
     elif page == "Canciones":
-        song_view = SongView(api_client)
+        song_view = SongView(api_client, async_client, events)
         song_view.render()
+    elif page == "Estadísticas":
+        stats_view = StatsView(api_client, async_client, events)
+        stats_view.render()
 
 
-def render_home(api_client):
+def render_home(api_client, async_client, events=None):
     """Renderiza la página de inicio"""
     # st.image("B Y N.jpg", width=300)
     st.title("Bienvenido a Buena Onda Música")
@@ -80,6 +112,7 @@ def render_home(api_client):
     - **Artistas**: Gestiona la información de los artistas de la disquera
     - **Álbumes**: Administra los álbumes publicados por cada artista
     - **Canciones**: Cataloga las canciones incluidas en cada álbum
+    - **Estadísticas**: Consulta el catálogo por género, país, año de lanzamiento y duración
     
     Utiliza el menú de navegación en la barra lateral para acceder a las diferentes secciones.
     """)
@@ -90,17 +123,17 @@ def render_home(api_client):
     try:
         col1, col2, col3 = st.columns(3)
         
+        # Totales agregados en el servidor (sin descargar los listados)
+        countries = DataStore(api_client, async_client, events=events).get_stats("countries") or []
+        
         with col1:
-            artists = api_client.get_all_artists()
-            st.metric("Artistas", len(artists))
+            st.metric("Artistas", sum(row["artists"] for row in countries))
         
         with col2:
-            albums = api_client.get_all_albums()
-            st.metric("Álbumes", len(albums))
+            st.metric("Álbumes", sum(row["albums"] for row in countries))
         
         with col3:
-            songs = api_client.get_all_songs()
-            st.metric("Canciones", len(songs))
+            st.metric("Canciones", sum(row["songs"] for row in countries))
     
     except Exception as e:
         st.error(f"Error al cargar estadísticas: {str(e)}")
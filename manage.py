@@ -0,0 +1,147 @@
+# python manage.py <comando>
+# Comandos de mantenimiento de la base de datos para Buena Onda Música.
+
+import argparse
+import os
+from sqlalchemy import text, select, update, bindparam, func, inspect
+from db import get_engine, Base, SessionLocal
+import models  # registra los modelos en Base.metadata
+import services
+import snapshot
+import dedup
+
+# Archivo de snapshot por defecto para export-snapshot
+DEFAULT_SNAPSHOT_PATH = snapshot.SNAPSHOT_PATH or "catalog.sqlite"
+
+# Columnas añadidas a tablas que ya existían. Cada sentencia es idempotente.
+MIGRATIONS = [
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS album_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS track_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS total_duration INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS last_release_date DATE",
+    "ALTER TABLE album ADD COLUMN IF NOT EXISTS track_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE album ADD COLUMN IF NOT EXISTS total_duration INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS stage_name_key VARCHAR(255)",
+    "ALTER TABLE album ADD COLUMN IF NOT EXISTS title_key VARCHAR(255)",
+    "ALTER TABLE song ADD COLUMN IF NOT EXISTS title_key VARCHAR(255)",
+    "ALTER TABLE artist ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE album ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE song ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+]
+
+# Claves normalizadas (models.name_key) que se rellenan en las filas que no la tienen: (modelo, nombre, clave)
+NAME_KEYS = [
+    (models.Artist, "stage_name", "stage_name_key"),
+    (models.Album, "title", "title_key"),
+    (models.Song, "title", "title_key"),
+]
+BACKFILL_BATCH = 1000
+
+# Columnas de acumulados (rollups) por tabla; si alguna se acaba de añadir se recalculan todos
+ROLLUP_COLUMNS = {
+    "artist": {"album_count", "track_count", "total_duration", "last_release_date"},
+    "album": {"track_count", "total_duration"},
+}
+
+def sync_schema(args):
+    # Crea las tablas que falten, añade las columnas nuevas y, en las tablas que ya existen,
+    # los índices nuevos definidos en models.py
+    engine = get_engine()
+    missing_rollups = _missing_rollup_columns(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+    _backfill_name_keys(engine)     #antes de crear los índices de las claves
+    if missing_rollups:
+        #Las columnas nuevas quedan a 0 (DEFAULT) en las filas existentes
+        rebuild_rollups(args)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print("Esquema sincronizado")
+
+def _missing_rollup_columns(engine) -> bool:
+    # Hay tablas ya existentes a las que les falta alguna columna de acumulados
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    return any(columns - {column["name"] for column in inspector.get_columns(table)}
+               for table, columns in ROLLUP_COLUMNS.items() if table in existing)
+
+def _backfill_name_keys(engine) -> int:
+    # La clave se calcula en Python (la misma función que usan las escrituras), por lotes de BACKFILL_BATCH
+    filled = 0
+    for model, source, target in NAME_KEYS:
+        table = model.__table__
+        with engine.begin() as connection:
+            rows = connection.execute(select(table.c.id, table.c[source]).where(table.c[target].is_(None))).all()
+            statement = update(table).where(table.c.id == bindparam("row_id")).values({target: bindparam("key")})
+            for start in range(0, len(rows), BACKFILL_BATCH):
+                connection.execute(statement, [{"row_id": row_id, "key": models.name_key(name)}
+                                               for row_id, name in rows[start:start + BACKFILL_BATCH]])
+        filled += len(rows)
+    #El índice único de stage_name_key no se puede crear si dos artistas solo difieren en acentos o mayúsculas
+    with engine.connect() as connection:
+        key = models.Artist.stage_name_key
+        duplicates = connection.execute(select(key, func.count()).group_by(key).having(func.count() > 1)).all()
+    for duplicate, count in duplicates:
+        print(f"Aviso: {count} artistas con la clave '{duplicate}'; renómbralos antes de crear ix_artist_stage_name_key")
+    return filled
+
+def backfill_name_keys(args):
+    # Rellena las claves normalizadas que falten (por ejemplo, tras cargar datos directamente en la base)
+    print(f"Claves normalizadas rellenadas: {_backfill_name_keys(get_engine())}")
+
+def rebuild_rollups(args):
+    # Recalcula los acumulados de álbumes y artistas desde las canciones (reparación de desvíos)
+    db = SessionLocal()
+    try:
+        services.rebuild_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+    print("Acumulados reconstruidos")
+
+def audit_duplicates(args):
+    # Lista los pares de posibles duplicados de todo el catálogo (mismo criterio que /duplicates)
+    db = SessionLocal()
+    try:
+        pairs = dedup.detector.audit(db, args.threshold)
+    finally:
+        db.close()
+    names = {
+        "artist": dedup.detector.artists,
+        "album": {album_id: title for album_id, (_, title) in dedup.detector.albums.items()},
+        "song": {song_id: title for song_id, (_, title) in dedup.detector.songs.items()},
+    }
+    for entity, entity_pairs in pairs.items():
+        print(f"{entity}: {len(entity_pairs)} pares")
+        for first, second, score in entity_pairs:
+            print(f"  {score:.2f}  {first} '{names[entity][first]}'  ~  {second} '{names[entity][second]}'")
+
+def export_snapshot(args):
+    # Exporta el catálogo a un archivo SQLite para el modo solo lectura (reemplazo atómico)
+    counts = snapshot.export_snapshot(get_engine(), args.output)
+    size = os.path.getsize(args.output)
+    print(f"Snapshot escrito en {args.output} ({size / 1024 / 1024:.1f} MB): "
+          + ", ".join(f"{table}={count}" for table, count in counts.items()))
+
+COMMANDS = {
+    "sync-schema": sync_schema,
+    "rebuild-rollups": rebuild_rollups,
+    "backfill-name-keys": backfill_name_keys,
+    "export-snapshot": export_snapshot,
+    "audit-duplicates": audit_duplicates,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento de Buena Onda Música")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_PATH, help="Archivo de export-snapshot")
+    parser.add_argument("--threshold", type=float, default=dedup.SIMILARITY_THRESHOLD,
+                        help="Similitud mínima (0-1) de audit-duplicates")
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    main()
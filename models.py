@@ -1,6 +1,9 @@
+import unicodedata
+from typing import Optional
+
 from db import Base
-from sqlalchemy import Integer, Column, String, Date, ForeignKey, Table, Numeric
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, BigInteger, Column, String, Date, DateTime, ForeignKey, Table, Numeric, Index, JSON, func
+from sqlalchemy.orm import relationship, validates
 
 #models.py no crea la base de datos por sí solo, pero le dice a SQLAlchemy cómo se ve la base para que pueda trabajar con ella desde Python.
 #models.py es la forma en que SQLAlchemy “entiende” cómo están estructuradas tus tablas. Aunque las tablas ya existan en la base de datos, SQLAlchemy necesita conocer:
@@ -9,6 +12,27 @@ from sqlalchemy.orm import relationship
 #Relaciones entre tablas: para hacer JOIN, acceder a claves foráneas, y usar relationship().
 #Piensa en models.py como el “mapa” que SQLAlchemy necesita para moverse por la base de datos.
 
+#CLAVES NORMALIZADAS-----------------------------------------------------
+#Cada nombre (stage_name, title) tiene una columna *_key con el nombre sin acentos, sin mayúsculas y con los
+#espacios normalizados ("Canción  Uno" -> "cancion uno"). Se rellena con @validates en cada escritura y tiene
+#su índice, así las búsquedas por nombre y las comprobaciones de duplicados son una búsqueda en el índice.
+#Las columnas marcadas con info={"internal": True} no se devuelven en la API (ver public_columns).
+def name_key(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", text)
+    unaccented = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(unaccented.casefold().split())
+
+def public_columns(model) -> list:
+    return [column for column in model.__table__.columns if not column.info.get("internal")]
+
+#CONCURRENCIA OPTIMISTA--------------------------------------------------
+#Artist, Album y Song tienen una columna version que SQLAlchemy sube en cada modificación (version_id_col) y
+#añade al WHERE de sus UPDATE y DELETE: UPDATE song SET ..., version=4 WHERE id=? AND version=3. Si otro lo
+#cambió antes, no se modifica ninguna fila y SQLAlchemy lanza StaleDataError. La API la devuelve como ETag
+#y la compara con If-Match (ver services.py). Los acumulados se actualizan aparte y no cambian la versión.
+
 # Artist model
 class Artist(Base):
     __tablename__ = 'artist'
@@ -20,12 +44,35 @@ class Artist(Base):
     country_of_origin: str = Column(String(255))
     email: str = Column(String(255), unique=True)
     instagram_handle: str = Column(String(30), unique=True)
+    stage_name_key: str = Column(String(255), info={"internal": True})     #name_key(stage_name)
+
+    # Acumulados mantenidos por services.py en la misma transacción que cada escritura
+    # (se pueden reconstruir con: python manage.py rebuild-rollups)
+    album_count: int = Column(Integer, nullable=False, default=0, server_default="0")
+    track_count: int = Column(Integer, nullable=False, default=0, server_default="0")
+    total_duration: int = Column(Integer, nullable=False, default=0, server_default="0")
+    last_release_date: Date = Column(Date)
+
+    version: int = Column(Integer, nullable=False, default=1, server_default="1")    #ver CONCURRENCIA OPTIMISTA
 
     # Relationships
     albums = relationship("Album", back_populates="artist", cascade="all, delete-orphan")
     # events = relationship("Event", secondary="artist_event", back_populates="artists")
     # services = relationship("Service", secondary="artist_service", back_populates="artists")
 
+    # Índice para la búsqueda por prefijo (typeahead): lower(stage_name) LIKE 'abc%'
+    __table_args__ = (
+        Index("ix_artist_stage_name_prefix", func.lower(stage_name).label("stage_name_lower"),
+              postgresql_ops={"stage_name_lower": "text_pattern_ops"}),
+        Index("ix_artist_stage_name_key", stage_name_key, unique=True),     #dos artistas no pueden diferir solo en acentos o mayúsculas
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+    @validates("stage_name")
+    def _set_stage_name_key(self, key, value):
+        self.stage_name_key = name_key(value)
+        return value
+
     def __repr__(self):
         return f"<Artist(stage_name='{self.stage_name}', real_name='{self.real_name}')>"
 
@@ -37,13 +84,33 @@ class Album(Base):
     id: int = Column(Integer, primary_key=True)
     title: str = Column(String(255), nullable=False)
     release_date: Date = Column(Date)
-    artist_id: int = Column(Integer, ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
+    title_key: str = Column(String(255), info={"internal": True})      #name_key(title)
+    artist_id: int = Column(Integer, ForeignKey('artist.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    # Acumulados mantenidos por services.py en la misma transacción que cada escritura
+    track_count: int = Column(Integer, nullable=False, default=0, server_default="0")
+    total_duration: int = Column(Integer, nullable=False, default=0, server_default="0")
+
+    version: int = Column(Integer, nullable=False, default=1, server_default="1")    #ver CONCURRENCIA OPTIMISTA
 
     # Relationships
     artist = relationship("Artist", back_populates="albums")
     songs = relationship("Song", back_populates="album", cascade="all, delete-orphan")
     #studios = relationship("Studio", secondary="album_studio", back_populates="albums")
 
+    # Índice para la búsqueda por prefijo (typeahead): lower(title) LIKE 'abc%'
+    __table_args__ = (
+        Index("ix_album_title_prefix", func.lower(title).label("title_lower"),
+              postgresql_ops={"title_lower": "text_pattern_ops"}),
+        Index("ix_album_title_key", title_key),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+    @validates("title")
+    def _set_title_key(self, key, value):
+        self.title_key = name_key(value)
+        return value
+
     def __repr__(self):
         return f"<Album(title='{self.title}', artist_id={self.artist_id})>"
 
@@ -55,12 +122,43 @@ class Song(Base):
     id: int = Column(Integer, primary_key=True)
     title: str = Column(String(255), nullable=False)
     duration: int = Column(Integer)
-    album_id: int = Column(Integer, ForeignKey('album.id', ondelete='CASCADE'), nullable=False)
+    title_key: str = Column(String(255), info={"internal": True})      #name_key(title)
+    album_id: int = Column(Integer, ForeignKey('album.id', ondelete='CASCADE'), nullable=False, index=True)
+    version: int = Column(Integer, nullable=False, default=1, server_default="1")    #ver CONCURRENCIA OPTIMISTA
 
     # Relationships
     album = relationship("Album", back_populates="songs")
     #producers = relationship("Producer", secondary="song_producer", back_populates="songs")
     #songwriters = relationship("Songwriter", secondary="songwriter_song", back_populates="songs")
 
+    # Índice para la búsqueda por prefijo (typeahead): lower(title) LIKE 'abc%'
+    __table_args__ = (
+        Index("ix_song_title_prefix", func.lower(title).label("title_lower"),
+              postgresql_ops={"title_lower": "text_pattern_ops"}),
+        Index("ix_song_title_key", title_key),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+    @validates("title")
+    def _set_title_key(self, key, value):
+        self.title_key = name_key(value)
+        return value
+
     def __repr__(self):
         return f"<Song(title='{self.title}', album_id={self.album_id})>"
+
+
+#ChangeLog model
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+
+    # Registro de solo inserción de las escrituras hechas por services.py; seq es el cursor de /changes
+    seq: int = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity: str = Column(String(20), nullable=False)       # "artists", "albums" o "songs"
+    entity_id: int = Column(Integer, nullable=False)
+    op: str = Column(String(10), nullable=False)           # "create", "update" o "delete"
+    data = Column(JSON)                                    # fila tras el cambio (None en los borrados)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<ChangeLog(seq={self.seq}, entity='{self.entity}', entity_id={self.entity_id}, op='{self.op}')>"
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, constr
-from typing import Optional
-from datetime import date
+from typing import Optional, List, Any, Literal, Union
+from datetime import date, datetime
 
 #El archivo schemas.py define esquemas de validación de datos usando Pydantic, que es el motor de validación de FastAPI.
 #Para validar lo que entra (por ejemplo, cuando alguien hace un POST desde el frontend o Swagger).
@@ -28,6 +28,11 @@ class ArtistResponse(BaseModel):
     country_of_origin: Optional[str] = None
     email: Optional[EmailStr] = None
     instagram_handle: Optional[str] = None
+    album_count: int = 0          #Acumulados (se leen de la fila, no se calculan al vuelo)
+    track_count: int = 0
+    total_duration: int = 0
+    last_release_date: Optional[date] = None
+    version: int = 1              #Cambia con cada modificación; se devuelve también como ETag
 
     class Config:
         from_attributes = True
@@ -57,6 +62,9 @@ class AlbumResponse(BaseModel):
     title: constr(min_length=1, max_length=255)
     release_date: Optional[date] = None
     artist_id: int
+    track_count: int = 0          #Acumulados (se leen de la fila, no se calculan al vuelo)
+    total_duration: int = 0
+    version: int = 1              #Cambia con cada modificación; se devuelve también como ETag
 
     class Config:
         from_attributes = True
@@ -64,7 +72,7 @@ class AlbumResponse(BaseModel):
 class AlbumUpdate(BaseModel):
     title: Optional[constr(min_length=1, max_length=255)] = None
     release_date: Optional[date] = None
-    artist_id: Optional[int]
+    artist_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -91,8 +99,152 @@ class SongResponse(BaseModel):
     title: str
     duration: int
     album_id: int
+    version: int = 1              #Cambia con cada modificación; se devuelve también como ETag
 
     class Config:
         from_attributes = True
 
+# DETAIL SCHEMAS (?include=) ---------------------------------------------------------------------------
+#Respuestas con relaciones embebidas. Los campos de relación solo aparecen si se piden con include.
+class ArtistDetail(ArtistResponse):
+    albums: Optional[List["AlbumDetail"]] = None
 
+class AlbumDetail(AlbumResponse):
+    artist: Optional[ArtistResponse] = None
+    songs: Optional[List[SongResponse]] = None
+
+class SongDetail(SongResponse):
+    album: Optional[AlbumDetail] = None
+
+ArtistDetail.model_rebuild()
+
+# LOOKUP SCHEMAS --------------------------------------------------------------------------------------
+class LookupItem(BaseModel):   #Par (id, etiqueta) para los selectores con búsqueda por prefijo
+    id: int
+    label: str
+
+class DuplicateCandidate(LookupItem):   #Posible duplicado de un nombre (ver dedup.py)
+    similarity: float       #0-1, 1 = iguales tras normalizar
+
+# CHANGE FEED SCHEMAS ---------------------------------------------------------------------------------
+class ChangeResponse(BaseModel):   #Una escritura registrada en change_log
+    seq: int
+    entity: str
+    entity_id: int
+    op: str
+    data: Optional[dict[str, Any]] = None
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ChangeFeed(BaseModel):   #Página de /changes; next_cursor es el since de la siguiente petición
+    changes: List[ChangeResponse]
+    next_cursor: int
+    has_more: bool
+
+# ANALYTICS SCHEMAS -----------------------------------------------------------------------------------
+class GenreStats(BaseModel):   #Canciones y artistas por género; share = % de las canciones del catálogo
+    music_genre: Optional[str] = None
+    artists: int
+    songs: int
+    total_duration: int
+    avg_duration: Optional[float] = None
+    share: Optional[float] = None
+
+class CountryStats(BaseModel):   #Artistas por país; share = % de los artistas del catálogo
+    country_of_origin: Optional[str] = None
+    artists: int
+    albums: int
+    songs: int
+    share: Optional[float] = None
+
+class ReleaseYearStats(BaseModel):   #Álbumes publicados cada año y acumulado hasta ese año
+    year: int
+    albums: int
+    songs: int
+    cumulative_albums: int
+
+class DurationBucket(BaseModel):   #Canciones con duración en [start, end) segundos
+    start: int
+    end: int
+    songs: int
+
+class DurationStats(BaseModel):
+    bucket: int
+    songs: int
+    min: Optional[int] = None
+    max: Optional[int] = None
+    avg: Optional[float] = None
+    buckets: List[DurationBucket]
+
+# BATCH SCHEMAS (/batch) -------------------------------------------------------------------------------
+#Operaciones de escritura que se aplican juntas en una sola transacción. En id y en artist_id/album_id se
+#puede usar "$N" para referirse al id de la operación N del mismo lote (por ejemplo, un álbum creado antes).
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    entity: Literal["artist", "album", "song"]
+    id: Optional[Union[int, str]] = None            #update y delete
+    data: Optional[dict[str, Any]] = None           #create (campos de *Create) y update (solo los que cambian)
+    version: Optional[int] = None                   #update y delete: versión leída (412 si ya cambió)
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    entity: str
+    status: int
+    id: int
+    data: Optional[dict[str, Any]] = None           #la entidad creada, modificada o borrada
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+# BULK SCHEMAS (PATCH .../bulk) ------------------------------------------------------------------------
+#filter elige las filas (ids y/o los mismos filtros que el listado) y set los campos que se cambian en todas.
+#Solo se pueden cambiar en bloque campos compartidos; los nombres y títulos son de cada fila.
+class ArtistBulkFilter(BaseModel):
+    ids: Optional[List[int]] = None
+    q: Optional[str] = None
+    music_genre: Optional[str] = None
+    country_of_origin: Optional[str] = None
+
+class ArtistBulkPatch(BaseModel):
+    music_genre: Optional[str] = None
+    country_of_origin: Optional[str] = None
+
+class ArtistBulkUpdate(BaseModel):
+    filter: ArtistBulkFilter
+    set: ArtistBulkPatch
+
+class AlbumBulkFilter(BaseModel):
+    ids: Optional[List[int]] = None
+    q: Optional[str] = None
+    artist_id: Optional[int] = None
+
+class AlbumBulkPatch(BaseModel):
+    artist_id: Optional[int] = None
+    release_date: Optional[date] = None
+
+class AlbumBulkUpdate(BaseModel):
+    filter: AlbumBulkFilter
+    set: AlbumBulkPatch
+
+class SongBulkFilter(BaseModel):
+    ids: Optional[List[int]] = None
+    q: Optional[str] = None
+    album_id: Optional[int] = None
+
+class SongBulkPatch(BaseModel):
+    album_id: Optional[int] = None
+    duration: Optional[int] = None
+
+class SongBulkUpdate(BaseModel):
+    filter: SongBulkFilter
+    set: SongBulkPatch
+
+class BulkUpdateResult(BaseModel):
+    updated: int            #filas modificadas
+    ids: List[int]
@@ -0,0 +1,54 @@
+# python serve.py --workers 4
+# Punto de entrada de producción del backend (en desarrollo sigue valiendo: uvicorn main:app --reload).
+#
+# Arranca uvicorn con varios procesos worker. Cada worker importa la app por su cuenta y crea su propio
+# engine y pool de conexiones la primera vez que lo necesita (db.get_engine), así que ningún worker
+# comparte conexiones con otro. Si se usa gunicorn con --preload (la app se importa una vez y después se
+# hace fork), db.py descarta en cada hijo el pool heredado (os.register_at_fork).
+#
+# Apagado ordenado (SIGTERM/SIGINT): uvicorn deja de aceptar conexiones, espera hasta
+# --graceful-timeout segundos a que terminen las peticiones en curso y el lifespan de main.py cierra
+# los streams de /events y las conexiones del pool.
+#
+# Conexiones a PostgreSQL en total: workers x (POOL_SIZE + MAX_OVERFLOW) de db.py; ajusta --workers
+# para no superar max_connections del servidor.
+
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+DEFAULT_WORKERS = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API de Buena Onda Música")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Procesos worker (por defecto WEB_CONCURRENCY o el número de CPUs)")
+    parser.add_argument("--graceful-timeout", type=int, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help="Segundos de espera a las peticiones en curso al apagar")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # uvloop y httptools (pip install "uvicorn[standard]") si están instalados; si no, los de asyncio/h11
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        access_log=False,       #el log de acceso por petición cuesta más que muchas de las rutas
+        log_level=args.log_level,
+    )
+
+if __name__ == "__main__":
+    main()
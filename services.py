@@ -1,17 +1,240 @@
-from models import Artist, Album, Song
-from sqlalchemy.orm import Session
+from models import Artist, Album, Song, ChangeLog, name_key, public_columns
+from sqlalchemy import func, select, update, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
 from typing import Optional, Type
-from schemas import ArtistCreate, AlbumCreate, SongCreate
+from datetime import date
+from schemas import (ArtistCreate, ArtistUpdate, ArtistResponse, AlbumCreate, AlbumUpdate, AlbumResponse,
+                     SongCreate, SongUpdate, SongResponse, BatchOperation)
+import events
 
 
 #Es el archivo donde defines funciones para interactuar con la base de datos usando SQLAlchemy, pero de una manera que está separada del resto de la app.
 
+#PAGINACION--------------------------------------------------------
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _contains(column, text: str):
+    # Búsqueda "contiene" sin distinguir mayúsculas; se escapan los comodines de LIKE
+    return column.ilike(f"%{_escape_like(text)}%", escape="\\")
+
+def _paginate(query: Query, sort_column, descending: bool, skip: int, limit: Optional[int], model,
+              include: tuple = (), as_rows: bool = False) -> tuple[list, int]:
+    # Devuelve (página, total). Se ordena siempre también por id para que las páginas sean estables.
+    # Las relaciones de include solo se cargan en la consulta de la página, no en el COUNT.
+    # Con as_rows la página son tuplas con las columnas de la tabla, sin construir objetos ORM
+    # (respuestas en columnas de formats.py).
+    order = sort_column.desc() if descending else sort_column.asc()
+    query = query.order_by(order, model.id.desc() if descending else model.id.asc())
+    page = query.with_entities(*public_columns(model)) if as_rows else _with_includes(query, model, include)
+    if limit is None and not skip:
+        items = page.all()
+        return items, len(items)
+    total = query.order_by(None).count()
+    items = page.offset(skip).limit(limit).all()
+    return items, total
+
+#RELACIONES EMBEBIDAS (?include=)-------------------------------------
+#Relaciones que se pueden pedir junto a cada entidad y cómo se cargan: joinedload para las
+#relaciones a uno (un JOIN en la misma consulta) y selectinload para las de a muchos
+#(una consulta extra WHERE id IN (...) por nivel), así nunca hay una consulta por fila.
+INCLUDES = {
+    Artist: {
+        "albums": selectinload(Artist.albums),
+        "albums.songs": selectinload(Artist.albums).selectinload(Album.songs),
+    },
+    Album: {
+        "artist": joinedload(Album.artist),
+        "songs": selectinload(Album.songs),
+    },
+    Song: {
+        "album": joinedload(Song.album),
+        "album.artist": joinedload(Song.album).joinedload(Album.artist),
+    },
+}
+
+def _with_includes(query: Query, model, include: tuple) -> Query:
+    if not include:
+        return query
+    return query.options(*(INCLUDES[model][path] for path in include))
+
+#BUSQUEDA POR PREFIJO (typeahead)------------------------------------
+def _lookup(db: Session, model, label_column, q: str, limit: int) -> list[dict]:
+    # Devuelve los primeros `limit` pares (id, label) cuyo label empieza por q (sin distinguir mayúsculas).
+    # El filtro lower(label) LIKE 'q%' usa el índice con text_pattern_ops definido en models.py.
+    key = func.lower(label_column)
+    query = db.query(model.id, label_column)
+    if q:
+        query = query.filter(key.like(f"{_escape_like(q.lower())}%", escape="\\"))
+    rows = query.order_by(key, model.id).limit(limit).all()
+    return [{"id": row[0], "label": row[1]} for row in rows]
+
+#LECTURA POR LOTES--------------------------------------------------
+def _ids_criterion(db: Session, model, ids: list[int]):
+    # En PostgreSQL WHERE id = ANY(:ids) con un único parámetro array (plan reutilizable)
+    if db.get_bind().dialect.name == "postgresql":
+        return model.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    return model.id.in_(ids)
+
+def _get_by_ids(db: Session, model, ids: list[int]) -> list:
+    # Resuelve varios ids con una sola consulta y devuelve los encontrados en el orden pedido.
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return []
+    found = {obj.id: obj for obj in db.query(model).filter(_ids_criterion(db, model, unique_ids))}
+    return [found[item_id] for item_id in unique_ids if item_id in found]
+
+#REGISTRO DE CAMBIOS (change feed)----------------------------------
+#Cada escritura deja en change_log una fila por entidad afectada (también los hijos borrados en cascada
+#y los padres cuyos acumulados cambian), en la misma transacción. Los cambios se acumulan en
+#db.info y se insertan juntos en _commit, justo antes del commit; tras el commit se avisa a /events.
+
+ENTITY_NAMES = {Artist: "artists", Album: "albums", Song: "songs"}
+CHANGE_LOG_LOCK = 7_310_001     #clave del advisory lock de PostgreSQL que ordena los commits del registro
+
+def _row_data(obj) -> dict:
+    # Columnas públicas de la entidad en formato JSON
+    data = {}
+    for column in public_columns(type(obj)):
+        value = getattr(obj, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, date) else value
+    return data
+
+def _record_change(db: Session, obj, op: str):
+    # Anota el cambio; si la misma entidad cambia varias veces en la transacción queda una sola fila
+    # (crear + modificar = "create"; cualquier cosa + borrar = "delete")
+    pending = db.info.setdefault("pending_changes", {})
+    previous = pending.get(id(obj))
+    if previous is None or op == "delete":
+        pending[id(obj)] = (obj, op)
+
+def _commit(db: Session):
+    # Inserta los cambios anotados y confirma la transacción.
+    # En PostgreSQL el advisory lock (liberado al hacer commit) serializa este último tramo, de modo que
+    # los seq se confirman en orden creciente y un lector de /changes nunca se salta uno que llega tarde.
+    # Dentro de un lote (run_batch) solo se hace flush: el commit es uno solo al final del lote.
+    if db.info.get("batch"):
+        db.flush()
+        return
+    pending = db.info.pop("pending_changes", {})
+    if not pending:
+        db.commit()
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK)))
+    db.flush()      #los objetos creados necesitan su id
+    rows = [
+        ChangeLog(entity=ENTITY_NAMES[type(obj)], entity_id=obj.id, op=op,
+                  data=None if op == "delete" else _row_data(obj))
+        for obj, op in pending.values()
+    ]
+    db.add_all(rows)
+    db.flush()
+    changes, seq = [(row.entity, row.entity_id, row.op) for row in rows], rows[-1].seq
+    db.commit()
+    events.broker.publish(changes, seq)    #aviso a los clientes de /events, solo si el commit fue bien
+
+def list_changes(db: Session, since: int = 0, limit: int = 100) -> tuple[list[Type[ChangeLog]], bool]:
+    # Cambios con seq > since en orden; devuelve también si quedan más
+    rows = db.query(ChangeLog).filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def latest_change_seq(db: Session) -> int:
+    return db.query(func.coalesce(func.max(ChangeLog.seq), 0)).scalar()
+
+#ACUMULADOS (rollups)-----------------------------------------------
+#Número de canciones, duración total y última fecha de lanzamiento se guardan en album/artist
+#y se ajustan de forma incremental en la misma transacción que cada escritura, así leerlos cuesta O(1).
+
+ALBUM_ROLLUPS = ("track_count", "total_duration")
+ARTIST_ROLLUPS = ("album_count", "track_count", "total_duration", "last_release_date")
+
+def _expire_rollups(db: Session):
+    # Los UPDATE de acumulados van directos a la base; se expiran esos atributos en los objetos cargados
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Album):
+            db.expire(obj, ALBUM_ROLLUPS)
+        elif isinstance(obj, Artist):
+            db.expire(obj, ARTIST_ROLLUPS)
+
+def _bump_album(db: Session, album_id: int, tracks: int, duration: int):
+    # Suma (o resta) canciones y duración a un álbum y a su artista
+    if not tracks and not duration:
+        return
+    db.execute(
+        update(Album).where(Album.id == album_id)
+        .values(track_count=Album.track_count + tracks, total_duration=Album.total_duration + duration)
+    )
+    artist_id = select(Album.artist_id).where(Album.id == album_id).scalar_subquery()
+    db.execute(
+        update(Artist).where(Artist.id == artist_id)
+        .values(track_count=Artist.track_count + tracks, total_duration=Artist.total_duration + duration)
+    )
+    _expire_rollups(db)
+    album = db.get(Album, album_id)
+    _record_change(db, album, "update")
+    _record_change(db, db.get(Artist, album.artist_id), "update")
+
+def _bump_artist(db: Session, artist_id: int, albums: int, tracks: int, duration: int):
+    # Suma (o resta) álbumes, canciones y duración a un artista y recalcula su último lanzamiento
+    db.flush()   # el álbum creado/movido/borrado debe estar en la base para el max(release_date)
+    last_release = select(func.max(Album.release_date)).where(Album.artist_id == artist_id).scalar_subquery()
+    db.execute(
+        update(Artist).where(Artist.id == artist_id)
+        .values(album_count=Artist.album_count + albums,
+                track_count=Artist.track_count + tracks,
+                total_duration=Artist.total_duration + duration,
+                last_release_date=last_release)
+    )
+    _expire_rollups(db)
+    _record_change(db, db.get(Artist, artist_id), "update")
+
+def rebuild_rollups(db: Session, album_ids: Optional[list[int]] = None, artist_ids: Optional[list[int]] = None):
+    # Recalcula los acumulados desde cero con dos UPDATE por conjuntos (reparación de desvíos).
+    # Sin filtros recalcula todo el catálogo; el llamador hace commit.
+    album_update = update(Album).values(
+        track_count=select(func.count(Song.id)).where(Song.album_id == Album.id).scalar_subquery(),
+        total_duration=select(func.coalesce(func.sum(Song.duration), 0)).where(Song.album_id == Album.id).scalar_subquery(),
+    )
+    if album_ids is not None:
+        album_update = album_update.where(Album.id.in_(album_ids))
+    db.execute(album_update)
+
+    artist_update = update(Artist).values(
+        album_count=select(func.count(Album.id)).where(Album.artist_id == Artist.id).scalar_subquery(),
+        track_count=select(func.coalesce(func.sum(Album.track_count), 0)).where(Album.artist_id == Artist.id).scalar_subquery(),
+        total_duration=select(func.coalesce(func.sum(Album.total_duration), 0)).where(Album.artist_id == Artist.id).scalar_subquery(),
+        last_release_date=select(func.max(Album.release_date)).where(Album.artist_id == Artist.id).scalar_subquery(),
+    )
+    if artist_ids is not None:
+        artist_update = artist_update.where(Artist.id.in_(artist_ids))
+    db.execute(artist_update)
+    _expire_rollups(db)
+
+#CONCURRENCIA OPTIMISTA------------------------------------------------
+#Las modificaciones y bajas aceptan la versión que el cliente leyó (If-Match). Se compara con la fila que la
+#propia modificación ya carga, sin consultas extra; si coincide, el UPDATE/DELETE lleva "AND version = ?"
+#(version_id_col en models.py), así que si otro escribe entre medias no se modifica nada y SQLAlchemy lanza
+#StaleDataError. Sin bloqueos: en los dos casos se responde 412 y el cliente vuelve a leer.
+class VersionConflictError(Exception):
+    def __init__(self, obj, expected: Optional[int] = None):
+        super().__init__(f"{type(obj).__name__} {obj.id} has version {obj.version}, not {expected}")
+        self.current = obj.version
+
+def _check_version(obj, version: Optional[int]):
+    if version is not None and obj.version != version:
+        raise VersionConflictError(obj, version)
+
 #ARTIST-------------------------------------------------------------
 
 #CREATE ARTISTAS
 def create_artist(db: Session, artist: ArtistCreate):   #En Artist Create es donde FastAPI valida automáticamente que los datos que llegan tienen la forma esperada (tipo, campos, longitud, etc).
     existing = db.query(Artist).filter(
-        (Artist.stage_name == artist.stage_name) |
+        (Artist.stage_name_key == name_key(artist.stage_name)) |    #"Bad Bunny" y "bad bunny" son el mismo artista
         (Artist.email == artist.email)
     ).first()
     if existing:
@@ -19,36 +242,74 @@ def create_artist(db: Session, artist: ArtistCreate):   #En Artist Create es don
     # new artist
     new_artist = Artist(**artist.dict())
     db.add(new_artist)
-    db.commit()
+    _record_change(db, new_artist, "create")
+    _commit(db)
     db.refresh(new_artist)
     return new_artist
 
 # READ ARTISTs
-def get_artist_by_id(db: Session, artist_id: int) -> Optional[Artist]: #significa que puede devolver artist o none
-    return db.query(Artist).filter(Artist.id == artist_id).first()
+def _artist_filters(q: Optional[str] = None, music_genre: Optional[str] = None,
+                    country_of_origin: Optional[str] = None) -> list:
+    # Condiciones WHERE de los filtros del listado (también las usa bulk_update_artists)
+    conditions = []
+    if q:
+        conditions.append(_contains(Artist.stage_name, q))
+    if music_genre:
+        conditions.append(Artist.music_genre == music_genre)
+    if country_of_origin:
+        conditions.append(Artist.country_of_origin == country_of_origin)
+    return conditions
+
+def get_artist_by_id(db: Session, artist_id: int, include: tuple = ()) -> Optional[Artist]: #significa que puede devolver artist o none
+    return _with_includes(db.query(Artist), Artist, include).filter(Artist.id == artist_id).first()
+
+def get_artists_by_ids(db: Session, artist_ids: list[int]) -> list[Type[Artist]]:
+    return _get_by_ids(db, Artist, artist_ids)
 
 def get_all_artists(db: Session) -> list[Type[Artist]]:
     return db.query(Artist).all()
 
+def list_artists(db: Session, skip: int = 0, limit: Optional[int] = None, sort: str = "id",
+                 descending: bool = False, q: Optional[str] = None,
+                 music_genre: Optional[str] = None, country_of_origin: Optional[str] = None,
+                 include: tuple = (), as_rows: bool = False) -> tuple[list[Type[Artist]], int]:
+    query = db.query(Artist).filter(*_artist_filters(q, music_genre, country_of_origin))
+    return _paginate(query, getattr(Artist, sort), descending, skip, limit, Artist, include, as_rows)
+
+def lookup_artists(db: Session, q: str, limit: int = 10) -> list[dict]:
+    return _lookup(db, Artist, Artist.stage_name, q, limit)
+
 def get_artist_by_name(db: Session, artist_name: str) -> Optional[Artist]:
-    return db.query(Artist).filter(Artist.stage_name == artist_name).first()
+    # Sin distinguir acentos ni mayúsculas, con el índice de stage_name_key
+    return db.query(Artist).filter(Artist.stage_name_key == name_key(artist_name)).first()
 
 #UPDATE ARTIST
-def update_artist(db: Session, artist: ArtistCreate, artist_id: int):
+def update_artist(db: Session, artist: ArtistCreate, artist_id: int, version: Optional[int] = None,
+                  partial: bool = False):
+    # PUT reemplaza todos los campos (los que no se envían quedan a None); con partial (ArtistUpdate de
+    # /batch) solo cambian los enviados
     artist_queryset = db.query(Artist).filter(Artist.id== artist_id).first()
     if artist_queryset:
-        for key, value in artist.model_dump().items():
+        _check_version(artist_queryset, version)
+        for key, value in artist.model_dump(exclude_unset=partial).items():
             setattr(artist_queryset,key,value)
-            db.commit()
-            db.refresh(artist_queryset)
+        _record_change(db, artist_queryset, "update")
+        _commit(db)
+        db.refresh(artist_queryset)
     return artist_queryset
 
 #DELETE ARTIST
-def delete_artist(db: Session, id:int):
+def delete_artist(db: Session, id:int, version: Optional[int] = None):
     artist_queryset = db.query(Artist).filter(Artist.id==id).first()
     if artist_queryset:
+        _check_version(artist_queryset, version)
+        for album in artist_queryset.albums:      #hijos que se borran en cascada
+            for song in album.songs:
+                _record_change(db, song, "delete")
+            _record_change(db, album, "delete")
+        _record_change(db, artist_queryset, "delete")
         db.delete(artist_queryset)
-        db.commit()
+        _commit(db)
     return artist_queryset
 
 
@@ -57,7 +318,8 @@ def delete_artist(db: Session, id:int):
 #CREATE ALBUMS
 def create_album(db: Session, album: AlbumCreate):
     existing = db.query(Album).filter(
-        (Album.title == album.title)
+        (Album.artist_id == album.artist_id) &      #el mismo título con otro artista es otro álbum
+        (Album.title_key == name_key(album.title))
     ).first()
 
     if existing:
@@ -66,46 +328,88 @@ def create_album(db: Session, album: AlbumCreate):
     # new album
     new_album = Album(**album.dict())
     db.add(new_album)
-    db.commit()
+    _bump_artist(db, new_album.artist_id, 1, 0, 0)
+    _record_change(db, new_album, "create")
+    _commit(db)
     db.refresh(new_album)
     return new_album
 
 #DELETE ALBUM
-def delete_album(db: Session, album_id: int) -> Type[Album] | None:
+def delete_album(db: Session, album_id: int, version: Optional[int] = None) -> Type[Album] | None:
     album = db.query(Album).filter(Album.id == album_id).first()
 
     if not album:
         return None
+    _check_version(album, version)
 
+    artist_id, tracks, duration = album.artist_id, album.track_count, album.total_duration
+    for song in album.songs:      #canciones que se borran en cascada
+        _record_change(db, song, "delete")
+    _record_change(db, album, "delete")
     db.delete(album)
-    db.commit()
+    _bump_artist(db, artist_id, -1, -tracks, -duration)
+    _commit(db)
     return album
 
 
 #READ ALBUMS
+def _album_filters(q: Optional[str] = None, artist_id: Optional[int] = None) -> list:
+    conditions = []
+    if q:
+        conditions.append(_contains(Album.title, q))
+    if artist_id is not None:
+        conditions.append(Album.artist_id == artist_id)
+    return conditions
+
 def get_album_by_name(db: Session, album_name: str) -> Optional[Album]:
-    return db.query(Album).filter(Album.title == album_name).first()
+    # Sin distinguir acentos ni mayúsculas, con el índice de title_key
+    return db.query(Album).filter(Album.title_key == name_key(album_name)).order_by(Album.id).first()
 
-def get_album_by_id(db: Session, album_id: int) -> Optional[Album]:
-    return db.query(Album).filter(Album.id == album_id).first()
+def get_album_by_id(db: Session, album_id: int, include: tuple = ()) -> Optional[Album]:
+    return _with_includes(db.query(Album), Album, include).filter(Album.id == album_id).first()
+
+def get_albums_by_ids(db: Session, album_ids: list[int]) -> list[Type[Album]]:
+    return _get_by_ids(db, Album, album_ids)
 
 def get_all_albums(db: Session) -> list[Type[Album]]:
     return db.query(Album).all()
 
+def list_albums(db: Session, skip: int = 0, limit: Optional[int] = None, sort: str = "id",
+                descending: bool = False, q: Optional[str] = None,
+                artist_id: Optional[int] = None, include: tuple = (),
+                as_rows: bool = False) -> tuple[list[Type[Album]], int]:
+    query = db.query(Album).filter(*_album_filters(q, artist_id))
+    return _paginate(query, getattr(Album, sort), descending, skip, limit, Album, include, as_rows)
+
+def lookup_albums(db: Session, q: str, limit: int = 10) -> list[dict]:
+    return _lookup(db, Album, Album.title, q, limit)
+
 #UPDATE ALBUMS
-def update_album(db: Session, album_id: int, album_data: AlbumCreate) -> Type[Album] | None:
+def update_album(db: Session, album_id: int, album_data: AlbumCreate,
+                 version: Optional[int] = None) -> Type[Album] | None:
     album_queryset = db.query(Album).filter(Album.id == album_id).first()
     if album_queryset:
+        _check_version(album_queryset, version)
+        old_artist_id, old_release_date = album_queryset.artist_id, album_queryset.release_date
         for key, value in album_data.dict(exclude_unset=True).items():
             setattr(album_queryset,key,value)
-            db.commit()
-            db.refresh(album_queryset)
+
+        if album_queryset.artist_id != old_artist_id:     #el álbum cambia de artista: se mueven sus acumulados
+            tracks, duration = album_queryset.track_count, album_queryset.total_duration
+            _bump_artist(db, old_artist_id, -1, -tracks, -duration)
+            _bump_artist(db, album_queryset.artist_id, 1, tracks, duration)
+        elif album_queryset.release_date != old_release_date:
+            _bump_artist(db, album_queryset.artist_id, 0, 0, 0)   #solo recalcula el último lanzamiento
+        _record_change(db, album_queryset, "update")
+        _commit(db)
+        db.refresh(album_queryset)
     return album_queryset
 
 #SONG--------------------------------------------------------------------------------
 def create_song(db: Session, song: SongCreate):
     existing = db.query(Song).filter(
-        (Song.title == song.title)
+        (Song.album_id == song.album_id) &
+        (Song.title_key == name_key(song.title))
     ).first()
 
     if existing:
@@ -113,39 +417,228 @@ def create_song(db: Session, song: SongCreate):
 
     new_song = Song(**song.dict())
     db.add(new_song)
-    db.commit()
+    _bump_album(db, new_song.album_id, 1, new_song.duration or 0)
+    _record_change(db, new_song, "create")
+    _commit(db)
     db.refresh(new_song)
     return new_song
 
 #READ SONGS
+def _song_filters(q: Optional[str] = None, album_id: Optional[int] = None) -> list:
+    conditions = []
+    if q:
+        conditions.append(_contains(Song.title, q))
+    if album_id is not None:
+        conditions.append(Song.album_id == album_id)
+    return conditions
+
 def get_all_songs(db: Session) -> list[Type[Song]]:
     return db.query(Song).all()
 
-def get_song_by_id(db: Session, song_id: int) -> Optional[Song]:
-    return db.query(Song).filter(Song.id == song_id).first()
+def list_songs(db: Session, skip: int = 0, limit: Optional[int] = None, sort: str = "id",
+               descending: bool = False, q: Optional[str] = None,
+               album_id: Optional[int] = None, include: tuple = (),
+               as_rows: bool = False) -> tuple[list[Type[Song]], int]:
+    query = db.query(Song).filter(*_song_filters(q, album_id))
+    return _paginate(query, getattr(Song, sort), descending, skip, limit, Song, include, as_rows)
+
+def get_song_by_id(db: Session, song_id: int, include: tuple = ()) -> Optional[Song]:
+    return _with_includes(db.query(Song), Song, include).filter(Song.id == song_id).first()
+
+def get_songs_by_ids(db: Session, song_ids: list[int]) -> list[Type[Song]]:
+    return _get_by_ids(db, Song, song_ids)
 
 def get_song_by_title(db: Session, title: str) -> Optional[Song]:
-    return db.query(Song).filter(Song.title.ilike(f"%{title}%")).first() #ESTO PODRIA FALLAR
+    # Primero el título exacto sin acentos ni mayúsculas (índice de title_key); si no hay, el primero que lo contenga
+    song = db.query(Song).filter(Song.title_key == name_key(title)).order_by(Song.id).first()
+    return song or db.query(Song).filter(_contains(Song.title, title)).first()
+
+def lookup_songs(db: Session, q: str, limit: int = 10) -> list[dict]:
+    return _lookup(db, Song, Song.title, q, limit)
 
 #UPDATE SONG
-def update_song(db: Session, song_id: int, song_data: SongCreate) -> Type[Song] | None:
+def update_song(db: Session, song_id: int, song_data: SongCreate,
+                version: Optional[int] = None) -> Type[Song] | None:
     song_queryset = db.query(Song).filter(Song.id == song_id).first()
     if not song_queryset:
         return None
+    _check_version(song_queryset, version)
 
+    old_album_id, old_duration = song_queryset.album_id, song_queryset.duration or 0
     for key, value in song_data.dict(exclude_unset=True).items():  #album_data.dict(exclude_unset=True) convierte el objeto de Pydantic (AlbumCreate) en un diccionario, ignorando los campos no enviados.
         setattr(song_queryset, key, value)                         #objeto.nombre_atributo = valor
 
-    db.commit()
+    new_duration = song_queryset.duration or 0
+    if song_queryset.album_id != old_album_id:     #la canción cambia de álbum: se mueve entre acumulados
+        _bump_album(db, old_album_id, -1, -old_duration)
+        _bump_album(db, song_queryset.album_id, 1, new_duration)
+    else:
+        _bump_album(db, old_album_id, 0, new_duration - old_duration)
+
+    _record_change(db, song_queryset, "update")
+    _commit(db)
     db.refresh(song_queryset)
     return song_queryset
 
-def delete_song(db: Session, song_id: int) -> Type[Song] | None:
+def delete_song(db: Session, song_id: int, version: Optional[int] = None) -> Type[Song] | None:
     song = db.query(Song).filter(Song.id == song_id).first()
     if not song:
         return None
+    _check_version(song, version)
 
+    _record_change(db, song, "delete")
     db.delete(song)
-    db.commit()
+    _bump_album(db, song.album_id, -1, -(song.duration or 0))
+    _commit(db)
     return song
 
+
+
+#LOTES DE ESCRITURAS (/batch)-----------------------------------------------------------------------
+#Varias altas, modificaciones y bajas en una sola transacción con las mismas funciones de arriba: mientras
+#dura el lote _commit solo hace flush, y al final hay un único commit (y un único aviso a /events). Si una
+#operación falla se deshace todo el lote.
+
+class BatchError(Exception):
+    def __init__(self, index: int, status_code: int, detail):
+        super().__init__(detail)
+        self.index = index
+        self.status_code = status_code
+        self.detail = detail
+
+#entidad: (esquema de alta, esquema de modificación, esquema de respuesta, alta, modificación, baja)
+BATCH_ENTITIES = {
+    "artist": (ArtistCreate, ArtistUpdate, ArtistResponse,
+               create_artist, lambda db, item_id, data, version: update_artist(db, data, item_id, version, partial=True),
+               delete_artist),
+    "album": (AlbumCreate, AlbumUpdate, AlbumResponse, create_album, update_album, delete_album),
+    "song": (SongCreate, SongUpdate, SongResponse, create_song, update_song, delete_song),
+}
+REFERENCE_FIELDS = {"artist_id": Artist, "album_id": Album}     #campos de data que aceptan "$N"
+
+def _resolve(value, results: list[dict], index: int):
+    # "$N" -> id de la operación N (anterior a esta) del lote
+    if not (isinstance(value, str) and value.startswith("$")):
+        return value
+    ref = value[1:]
+    if not ref.isdigit() or int(ref) >= index:
+        raise BatchError(index, 422, f"Invalid reference {value}: must point to an earlier operation")
+    return results[int(ref)]["id"]
+
+def _run_operation(db: Session, index: int, operation: BatchOperation, results: list[dict]) -> dict:
+    create_schema, update_schema, response_schema, create, update_item, delete = BATCH_ENTITIES[operation.entity]
+    data = {key: _resolve(value, results, index) if key in REFERENCE_FIELDS else value
+            for key, value in (operation.data or {}).items()}
+    for key, parent in REFERENCE_FIELDS.items():
+        if isinstance(data.get(key), int) and db.get(parent, data[key]) is None:
+            raise BatchError(index, 404, f"{key} {data[key]} not found")
+    item_id = None
+    if operation.op != "create":
+        item_id = _resolve(operation.id, results, index)
+        if not isinstance(item_id, int):
+            raise BatchError(index, 422, f"{operation.op} needs the id of the {operation.entity}")
+    try:
+        if operation.op == "create":
+            obj, status = create(db, create_schema(**data)), 201
+            if obj is None:
+                raise BatchError(index, 409, f"{operation.entity} already exists")
+        else:
+            if operation.op == "update":
+                obj, status = update_item(db, item_id, update_schema(**data), operation.version), 200
+            else:
+                obj, status = delete(db, item_id, operation.version), 200
+            if obj is None:
+                raise BatchError(index, 404, f"{operation.entity} {item_id} not found")
+    except ValidationError as e:
+        raise BatchError(index, 422, e.errors(include_url=False, include_context=False))
+    except IntegrityError as e:
+        raise BatchError(index, 409, f"Integrity error: {e.orig}")
+    except VersionConflictError as e:
+        raise BatchError(index, 412, str(e))
+    except StaleDataError:
+        raise BatchError(index, 412, f"{operation.entity} {item_id} was modified concurrently")
+    return {"index": index, "op": operation.op, "entity": operation.entity, "status": status, "id": obj.id,
+            "data": response_schema.model_validate(obj).model_dump(mode="json")}
+
+def run_batch(db: Session, operations: list[BatchOperation]) -> list[dict]:
+    # Aplica las operaciones en orden y confirma todo junto; con cualquier error hace rollback y lo propaga
+    db.info["batch"] = True
+    results = []
+    try:
+        for index, operation in enumerate(operations):
+            results.append(_run_operation(db, index, operation, results))
+    except BaseException:
+        db.info.pop("batch", None)
+        db.info.pop("pending_changes", None)
+        db.rollback()
+        raise
+    db.info.pop("batch", None)
+    _commit(db)
+    return results
+
+
+#ACTUALIZACIONES MASIVAS (bulk)--------------------------------------------------------------------
+#Cambiar el mismo campo en muchas filas (mover canciones de álbum, corregir el género de varios artistas) con un
+#solo UPDATE ... WHERE ... RETURNING id en lugar de un SELECT + UPDATE + REFRESH por fila. Los acumulados de los
+#padres afectados (los de antes y el nuevo) se recalculan una vez con rebuild_rollups, y el registro de cambios
+#y el aviso a /events se hacen una sola vez en _commit.
+#Los campos que se pueden cambiar en bloque son los de *BulkPatch en schemas.py.
+
+def _bulk_update(db: Session, model, conditions: list, values: dict, ids: Optional[list[int]] = None,
+                 parent_column=None, rollup_fields: tuple = ()) -> tuple[list[int], set]:
+    # Devuelve (ids modificados, ids de los padres cuyos acumulados hay que recalcular)
+    if ids is not None:
+        conditions = [*conditions, _ids_criterion(db, model, list(dict.fromkeys(ids)))]
+    if not conditions:      #nunca un UPDATE sin WHERE sobre toda la tabla
+        raise ValueError(f"Bulk update of {model.__tablename__} without any filter")
+    parents = set()
+    if parent_column is not None and any(key in values for key in rollup_fields):
+        #padres de antes del cambio (los de después se conocen por values)
+        parents = set(db.scalars(select(parent_column).where(*conditions).distinct()))
+    #Cada fila modificada cambia de versión, como en las modificaciones una a una
+    statement = update(model).where(*conditions).values(**values, version=model.version + 1).returning(model.id)
+    updated = list(db.scalars(statement, execution_options={"synchronize_session": "fetch"}))
+    if not updated:
+        return [], set()
+    if parents and parent_column.key in values:
+        parents.add(values[parent_column.key])
+    return updated, parents
+
+def _record_bulk_changes(db: Session, model, ids: list[int]):
+    for obj in _get_by_ids(db, model, ids):
+        _record_change(db, obj, "update")
+
+def bulk_update_artists(db: Session, values: dict, ids: Optional[list[int]] = None, q: Optional[str] = None,
+                        music_genre: Optional[str] = None, country_of_origin: Optional[str] = None) -> list[int]:
+    updated, _ = _bulk_update(db, Artist, _artist_filters(q, music_genre, country_of_origin), values, ids)
+    _record_bulk_changes(db, Artist, updated)
+    _commit(db)
+    return updated
+
+def bulk_update_albums(db: Session, values: dict, ids: Optional[list[int]] = None, q: Optional[str] = None,
+                       artist_id: Optional[int] = None) -> Optional[list[int]]:
+    if "artist_id" in values and db.get(Artist, values["artist_id"]) is None:
+        return None
+    updated, artist_ids = _bulk_update(db, Album, _album_filters(q, artist_id), values, ids,
+                                       Album.artist_id, ("artist_id", "release_date"))
+    if artist_ids:
+        rebuild_rollups(db, album_ids=[], artist_ids=list(artist_ids))
+        _record_bulk_changes(db, Artist, list(artist_ids))
+    _record_bulk_changes(db, Album, updated)
+    _commit(db)
+    return updated
+
+def bulk_update_songs(db: Session, values: dict, ids: Optional[list[int]] = None, q: Optional[str] = None,
+                      album_id: Optional[int] = None) -> Optional[list[int]]:
+    if "album_id" in values and db.get(Album, values["album_id"]) is None:
+        return None
+    updated, album_ids = _bulk_update(db, Song, _song_filters(q, album_id), values, ids,
+                                      Song.album_id, ("album_id", "duration"))
+    if album_ids:
+        artist_ids = list(db.scalars(select(Album.artist_id).where(Album.id.in_(album_ids)).distinct()))
+        rebuild_rollups(db, album_ids=list(album_ids), artist_ids=artist_ids)
+        _record_bulk_changes(db, Album, list(album_ids))
+        _record_bulk_changes(db, Artist, artist_ids)
+    _record_bulk_changes(db, Song, updated)
+    _commit(db)
+    return updated
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base
+import deadlines
+import models  # registra los modelos en Base.metadata
+
+#snapshot.py exporta el catálogo a un archivo SQLite compacto y permite servir las lecturas desde él.
+#Con la variable de entorno BUENAONDA_SNAPSHOT_PATH la API arranca en modo solo lectura: las rutas GET
+#leen del archivo (mapeado en memoria) sin ninguna conexión a PostgreSQL y las escrituras se rechazan.
+#El archivo se reemplaza de forma atómica (os.replace), así que para publicar un catálogo nuevo en
+#varias réplicas basta con copiar el archivo: cada réplica detecta el cambio en la siguiente petición.
+
+SNAPSHOT_PATH = os.environ.get("BUENAONDA_SNAPSHOT_PATH")
+
+EXPORT_BATCH_SIZE = 5000            #filas por INSERT al exportar
+MMAP_SIZE = 256 * 1024 * 1024       #bytes del archivo que SQLite lee vía mmap (páginas compartidas entre procesos)
+
+#EXPORTAR-----------------------------------------------------------
+def export_snapshot(source: Engine, path: str) -> dict:
+    # Copia todas las tablas a un archivo temporal en el mismo directorio y lo mueve a path al terminar.
+    # En PostgreSQL la lectura es una única transacción REPEATABLE READ: todas las tablas son del mismo instante.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", suffix=".sqlite", dir=directory)
+    os.close(fd)
+    target = create_engine(f"sqlite:///{tmp_path}")
+    counts = {}
+    try:
+        Base.metadata.create_all(target)
+        options = {"isolation_level": "REPEATABLE READ"} if source.dialect.name == "postgresql" else {}
+        with source.connect().execution_options(**options) as src, target.begin() as dst:
+            dst.exec_driver_sql("PRAGMA journal_mode=OFF")
+            dst.exec_driver_sql("PRAGMA synchronous=OFF")
+            for table in Base.metadata.sorted_tables:
+                counts[table.name] = 0
+                result = src.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(select(table))
+                for rows in result.partitions():
+                    dst.execute(insert(table), [row._asdict() for row in rows])
+                    counts[table.name] += len(rows)
+        with target.connect() as dst:
+            dst.exec_driver_sql("ANALYZE")
+            dst.exec_driver_sql("VACUUM")      #compacta el archivo
+        target.dispose()
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)     #mkstemp lo crea solo para el usuario actual
+        os.replace(tmp_path, path)
+    except BaseException:
+        target.dispose()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return counts
+
+#SERVIR------------------------------------------------------------
+def _create_read_engine(path: str) -> Engine:
+    # immutable=1: el archivo nunca se modifica en su sitio (solo se reemplaza), así SQLite no usa bloqueos
+    engine = create_engine(f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+                           connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        cursor.execute("PRAGMA query_only=1")
+        cursor.close()
+
+    return engine
+
+class SnapshotReader:
+    # Sesiones de solo lectura sobre el archivo actual. Si el archivo se reemplaza (otro inodo),
+    # la siguiente petición abre el nuevo; las peticiones en curso terminan con el anterior.
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._inode = None
+        self._engine: Optional[Engine] = None
+        self._sessionmaker = None
+
+    def _current(self):
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode:
+            with self._lock:
+                if stat.st_ino != self._inode:
+                    old = self._engine
+                    self._engine = _create_read_engine(self.path)
+                    self._sessionmaker = sessionmaker(bind=self._engine, autoflush=False)
+                    self._inode = stat.st_ino
+                    if old is not None:
+                        old.dispose()
+        return self._sessionmaker
+
+    def info(self) -> dict:
+        stat = os.stat(self.path)
+        return {"path": self.path, "size": stat.st_size,
+                "exported_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()}
+
+    def session(self):
+        # Sesión nueva sobre el archivo actual (para tareas de fondo; las rutas usan get_db)
+        return self._current()()
+
+    def get_db(self, request: Request):
+        try:
+            session_factory = self._current()
+        except OSError:
+            raise HTTPException(status_code=503, detail="Snapshot not available")
+        db = session_factory()
+        deadlines.attach(db, request.scope)     #aquí sin statement_timeout (solo PostgreSQL); sí se cancela al desconectarse
+        try:
+            yield db
+        finally:
+            db.close()
+
+reader = SnapshotReader(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
@@ -1,7 +1,10 @@
 import streamlit as st
 from typing import Dict, List, Any, Optional
 from base_st import CRUDView
-from api_st import APIClient
+from api_st import APIClient, VersionConflictError
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from ui_st import format_duration
 
 class SongView(CRUDView):
     """
@@ -9,52 +12,51 @@ class SongView(CRUDView):
     Implementa operaciones CRUD para la entidad Song.
     """
     
-    def __init__(self, api_client: APIClient):
+    def __init__(self, api_client: APIClient, async_client: Optional[AsyncAPIClient] = None,
+                 events: Optional[EventListener] = None):
         """
         Inicializa la vista de canciones.
         
         Args:
             api_client: Cliente API para interactuar con el backend
+            async_client: Cliente asíncrono opcional para cargar datos en paralelo
+            events: Listener opcional de /events para ver los cambios de otros usuarios
         """
-        super().__init__("Gestión de Canciones")
-        self.api_client = api_client
+        super().__init__("Gestión de Canciones", api_client, async_client, events)
     
     def render_list_view(self):
         """Renderiza la vista de listado de canciones"""
         st.header("Lista de Canciones")
         
-        # Obtener todas las canciones
-        songs = self.get_all_items()
-        
-        # Obtener todos los álbumes para mostrar nombres en lugar de IDs
-        albums = self.api_client.get_all_albums()
-        album_dict = {album["id"]: album["title"] for album in albums}
-        
-        # Añadir nombre de álbum a cada canción y formatear duración
-        for song in songs:
-            song["album_title"] = album_dict.get(song["album_id"], f"Álbum ID: {song['album_id']}")
-            minutes = song["duration"] // 60
-            seconds = song["duration"] % 60
-            song["duration_formatted"] = f"{minutes}:{seconds:02d}"
-        
-        # Mostrar tabla de canciones
-        if songs:
-            self.display_data_table(
-                songs, 
-                ["id", "title", "duration_formatted", "album_title"]
-            )
-        else:
-            st.info("No hay canciones registradas")
+        # Tabla paginada en el servidor: solo se pide la página visible
+        self.display_paginated_table(
+            "songs",
+            ["id", "title", "duration_formatted", "album_title"],
+            {"id": "ID", "title": "Título", "duration": "Duración", "album_id": "Álbum"},
+            include="album"
+        )
+    
+    def prepare_rows(self, resource: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Añade el nombre del álbum y la duración formateada a cada canción"""
+        # El álbum llega embebido en cada canción (include="album"), sin peticiones extra
+        for song in rows:
+            album = song.get("album")
+            song["album_title"] = album["title"] if album else f"Álbum ID: {song['album_id']}"
+            song["duration_formatted"] = format_duration(song["duration"])
+        return rows
     
     def render_create_view(self):
         """Renderiza la vista de creación de canciones"""
         st.header("Crear Nueva Canción")
         
-        # Obtener álbumes para el selector
-        albums = self.api_client.get_all_albums()
+        # Selector de álbum con búsqueda (fuera del formulario para que busque al escribir)
+        selected_album = self.select_item("albums", "Álbum *", key="create_song_album")
         
-        if not albums:
-            st.warning("No hay álbumes disponibles. Debes crear al menos un álbum antes de crear una canción.")
+        if not selected_album:
+            # Sin texto de búsqueda no hay resultados solo si el catálogo está vacío;
+            # si el texto no coincide con nada, select_item ya lo indica
+            if not st.session_state.get("create_song_album_query"):
+                st.warning("No hay álbumes disponibles. Debes crear al menos un álbum antes de crear una canción.")
             return
         
         # Formulario para crear canción
@@ -70,13 +72,7 @@ class SongView(CRUDView):
             
             # Calcular duración total en segundos
             duration = minutes * 60 + seconds
-            
-            # Selector de álbum
-            album_ids = [album["id"] for album in albums]
-            album_titles = [album["title"] for album in albums]
-            album_dict = dict(zip(album_titles, album_ids))
-            
-            selected_album = st.selectbox("Álbum *", album_titles)
+            confirm_duplicate = st.checkbox("Crear aunque parezca duplicado")
             
             submit_button = st.form_submit_button("Crear Canción")
             
@@ -89,44 +85,33 @@ class SongView(CRUDView):
                     self.display_error_message("La duración de la canción debe ser mayor a 0")
                     return
                 
+                if not self.check_duplicates("song", title, confirm_duplicate, album_id=selected_album["id"]):
+                    return
+                
                 # Crear canción
                 song_data = {
                     "title": title,
                     "duration": duration,
-                    "album_id": album_dict[selected_album]
+                    "album_id": selected_album["id"]
                 }
                 
                 result = self.create_item(song_data)
                 if result:
                     self.display_success_message(f"Canción '{title}' creada exitosamente")
                 else:
-                    self.display_error_message("Error al crear la canción. Puede que ya exista una canción con ese título.")
+                    self.display_error_message("Error al crear la canción. Puede que el álbum ya tenga una canción con ese título.")
     
     def render_update_view(self):
         """Renderiza la vista de actualización de canciones"""
         st.header("Actualizar Canción")
         
-        # Obtener todas las canciones
-        songs = self.get_all_items()
+        # Seleccionar canción a actualizar (búsqueda por prefijo)
+        selected_song = self.select_item("songs", "Seleccionar canción a actualizar", key="update_song")
         
-        if not songs:
+        if not selected_song:
             st.info("No hay canciones disponibles para actualizar")
             return
-        
-        # Obtener álbumes para el selector
-        albums = self.api_client.get_all_albums()
-        
-        if not albums:
-            st.warning("No hay álbumes disponibles.")
-            return
-        
-        # Seleccionar canción a actualizar
-        song_ids = [song["id"] for song in songs]
-        song_titles = [song["title"] for song in songs]
-        song_dict = dict(zip(song_titles, song_ids))
-        
-        selected_song_title = st.selectbox("Seleccionar canción a actualizar", song_titles)
-        selected_song_id = song_dict[selected_song_title]
+        selected_song_id = selected_song["id"]
         
         # Obtener datos actuales de la canción
         current_song = self.get_item_by_id(selected_song_id)
@@ -135,6 +120,19 @@ class SongView(CRUDView):
             st.error("No se pudo obtener la información de la canción")
             return
         
+        # Selector de álbum, con el álbum actual preseleccionado
+        current_album = self.data.get_item("albums", current_song["album_id"])
+        current_option = {
+            "id": current_song["album_id"],
+            "label": current_album["title"] if current_album else f"Álbum ID: {current_song['album_id']}"
+        }
+        selected_album = self.select_item("albums", "Álbum *", key=f"update_song_album_{selected_song_id}",
+                                          current=current_option)
+        
+        if not selected_album:
+            st.warning("No hay álbumes disponibles.")
+            return
+        
         # Formulario para actualizar canción
         with st.form("update_song_form"):
             title = st.text_input("Título de la Canción *", value=current_song["title"])
@@ -152,18 +150,6 @@ class SongView(CRUDView):
             # Calcular duración total en segundos
             duration = minutes * 60 + seconds
             
-            # Selector de álbum
-            album_ids = [album["id"] for album in albums]
-            album_titles = [album["title"] for album in albums]
-            album_dict = dict(zip(album_ids, album_titles))
-            
-            # Encontrar el índice del álbum actual
-            current_album_title = album_dict.get(current_song["album_id"], album_titles[0])
-            album_index = album_titles.index(current_album_title) if current_album_title in album_titles else 0
-            
-            selected_album = st.selectbox("Álbum *", album_titles, index=album_index)
-            selected_album_id = [k for k, v in album_dict.items() if v == selected_album][0]
-            
             submit_button = st.form_submit_button("Actualizar Canción")
             
             if submit_button:
@@ -179,10 +165,14 @@ class SongView(CRUDView):
                 song_data = {
                     "title": title,
                     "duration": duration,
-                    "album_id": selected_album_id
+                    "album_id": selected_album["id"]
                 }
                 
-                result = self.update_item(selected_song_id, song_data)
+                try:
+                    result = self.update_item(selected_song_id, song_data, current_song.get("version"))
+                except VersionConflictError:
+                    self.display_version_conflict("songs", selected_song_id)
+                    return
                 if result:
                     self.display_success_message(f"Canción '{title}' actualizada exitosamente")
                 else:
@@ -192,20 +182,14 @@ class SongView(CRUDView):
         """Renderiza la vista de eliminación de canciones"""
         st.header("Eliminar Canción")
         
-        # Obtener todas las canciones
-        songs = self.get_all_items()
+        # Seleccionar canción a eliminar (búsqueda por prefijo)
+        selected_song = self.select_item("songs", "Seleccionar canción a eliminar", key="delete_song")
         
-        if not songs:
+        if not selected_song:
             st.info("No hay canciones disponibles para eliminar")
             return
-        
-        # Seleccionar canción a eliminar
-        song_ids = [song["id"] for song in songs]
-        song_titles = [song["title"] for song in songs]
-        song_dict = dict(zip(song_titles, song_ids))
-        
-        selected_song_title = st.selectbox("Seleccionar canción a eliminar", song_titles)
-        selected_song_id = song_dict[selected_song_title]
+        selected_song_id = selected_song["id"]
+        selected_song_title = selected_song["label"]
         
         # Advertencia y confirmación
         st.warning(f"¿Estás seguro de que deseas eliminar la canción '{selected_song_title}'?")
@@ -219,20 +203,30 @@ class SongView(CRUDView):
     
     def get_all_items(self) -> List[Dict[str, Any]]:
         """Obtiene todas las canciones"""
-        return self.api_client.get_all_songs()
+        return self.data.get_all("songs")
     
     def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Obtiene una canción por su ID"""
-        return self.api_client.get_song_by_id(item_id)
+        return self.data.get_item("songs", item_id)
     
     def create_item(self, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea una nueva canción"""
-        return self.api_client.create_song(item_data)
+        result = self.api_client.create_song(item_data)
+        if result:
+            self.data.invalidate("songs", "create")
+        return result
     
-    def update_item(self, item_id: int, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Actualiza una canción existente"""
-        return self.api_client.update_song(item_id, item_data)
+    def update_item(self, item_id: int, item_data: Dict[str, Any],
+                    version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Actualiza una canción existente (VersionConflictError si otro la cambió desde version)"""
+        result = self.api_client.update_song(item_id, item_data, version)
+        if result:
+            self.data.invalidate("songs", "update", item_id)
+        return result
     
     def delete_item(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Elimina una canción por su ID"""
-        return self.api_client.delete_song(item_id)
+        result = self.api_client.delete_song(item_id)
+        if result:
+            self.data.invalidate("songs", "delete", item_id)
+        return result
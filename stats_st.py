@@ -0,0 +1,150 @@
+import streamlit as st
+from typing import Dict, List, Any, Optional
+from api_st import APIClient
+from async_api_st import AsyncAPIClient
+from events_st import EventListener
+from data_st import DataStore
+from ui_st import format_duration
+
+# Intervalos (segundos) que se pueden elegir para el histograma de duraciones
+DURATION_BUCKETS = [10, 15, 30, 60, 120]
+
+# Etiqueta para los artistas sin género o sin país
+UNKNOWN_LABEL = "Sin especificar"
+
+
+class StatsView:
+    """
+    Página de estadísticas del catálogo.
+    Todos los resúmenes se calculan en el servidor (/analytics/*): la página
+    solo recibe las filas agregadas, nunca los listados completos, así que su
+    coste no depende del tamaño del catálogo.
+    """
+
+    def __init__(self, api_client: APIClient, async_client: Optional[AsyncAPIClient] = None,
+                 events: Optional[EventListener] = None):
+        """
+        Inicializa la vista de estadísticas.
+
+        Args:
+            api_client: Cliente API para interactuar con el backend
+            async_client: Cliente asíncrono opcional (compartido con la capa de datos)
+            events: Listener opcional de /events para recalcular tras cambios de otros usuarios
+        """
+        self.data = DataStore(api_client, async_client, events=events)
+
+    def render(self):
+        """Renderiza la página completa"""
+        st.title("Estadísticas")
+
+        tab_genres, tab_countries, tab_years, tab_durations = st.tabs(
+            ["Géneros", "Países", "Años de lanzamiento", "Duraciones"]
+        )
+        with tab_genres:
+            self.render_genres()
+        with tab_countries:
+            self.render_countries()
+        with tab_years:
+            self.render_release_years()
+        with tab_durations:
+            self.render_durations()
+
+    def _load(self, name: str, **params) -> Optional[Any]:
+        """Pide un resumen y muestra un aviso si la API no responde"""
+        data = self.data.get_stats(name, **params)
+        if data is None:
+            st.error("No se pudieron cargar las estadísticas")
+        return data
+
+    def render_genres(self):
+        """Canciones y artistas por género musical"""
+        st.subheader("Canciones por género")
+        rows = self._load("genres")
+        if not rows:
+            st.info("No hay datos disponibles")
+            return
+
+        table = [{
+            "Género": row["music_genre"] or UNKNOWN_LABEL,
+            "Canciones": row["songs"],
+            "Artistas": row["artists"],
+            "Duración media": format_duration(round(row["avg_duration"])) if row["avg_duration"] else "-",
+            "% del catálogo": row["share"],
+        } for row in rows]
+        st.bar_chart(table, x="Género", y="Canciones")
+        st.dataframe(table, hide_index=True)
+
+    def render_countries(self):
+        """Artistas por país de origen"""
+        st.subheader("Artistas por país")
+        rows = self._load("countries")
+        if not rows:
+            st.info("No hay datos disponibles")
+            return
+
+        table = [{
+            "País": row["country_of_origin"] or UNKNOWN_LABEL,
+            "Artistas": row["artists"],
+            "Álbumes": row["albums"],
+            "Canciones": row["songs"],
+            "% de artistas": row["share"],
+        } for row in rows]
+        st.bar_chart(table, x="País", y="Artistas")
+        st.dataframe(table, hide_index=True)
+
+    def render_release_years(self):
+        """Álbumes publicados por año y acumulado"""
+        st.subheader("Álbumes por año de lanzamiento")
+        rows = self._load("release-years")
+        if not rows:
+            st.info("No hay álbumes con fecha de lanzamiento")
+            return
+
+        table = [{
+            "Año": str(row["year"]),
+            "Álbumes": row["albums"],
+            "Canciones": row["songs"],
+            "Acumulado": row["cumulative_albums"],
+        } for row in rows]
+        st.bar_chart(table, x="Año", y="Álbumes")
+        st.line_chart(table, x="Año", y="Acumulado")
+        st.dataframe(table, hide_index=True)
+
+    def render_durations(self):
+        """Histograma de duraciones, opcionalmente de un solo género"""
+        st.subheader("Duración de las canciones")
+
+        genres = self.data.get_stats("genres") or []
+        options = ["Todos"] + [row["music_genre"] for row in genres if row["music_genre"]]
+        col_genre, col_bucket = st.columns(2)
+        genre = col_genre.selectbox("Género", options, key="stats_duration_genre")
+        bucket = col_bucket.select_slider("Intervalo (segundos)", DURATION_BUCKETS, value=30,
+                                          key="stats_duration_bucket")
+
+        stats = self._load("durations", bucket=bucket, music_genre=None if genre == "Todos" else genre)
+        if not stats or not stats["songs"]:
+            st.info("No hay canciones con duración")
+            return
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Canciones", stats["songs"])
+        col2.metric("Mínima", format_duration(stats["min"]))
+        col3.metric("Media", format_duration(round(stats["avg"])))
+        col4.metric("Máxima", format_duration(stats["max"]))
+
+        histogram = self.prepare_histogram(stats["buckets"])
+        st.bar_chart(histogram, x="Duración", y="Canciones")
+
+    @staticmethod
+    def prepare_histogram(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convierte los intervalos del servidor en filas para la gráfica.
+
+        Args:
+            buckets: Lista de {"start", "end", "songs"}
+
+        Returns:
+            Filas con la etiqueta "m:ss–m:ss" de cada intervalo y su número de canciones
+        """
+        return [{"Duración": f"{format_duration(item['start'])}–{format_duration(item['end'])}",
+                 "Canciones": item["songs"]} for item in buckets]
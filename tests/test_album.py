@@ -59,4 +59,61 @@ def test_delete_album():
 
     # Verifica que ya no existe
     response = client.get(f"/album/{album_id}")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_album_rollups():
+    # Crea (si no existen) un artista, un álbum y una canción
+    artist_data = {
+        "stage_name": "RollupArtist",
+        "email": "rollupartist@example.com"
+    }
+    try:
+        client.post("/artist/", json=artist_data)
+    except Exception:
+        pass
+    artist = client.get("/artists/by-name/RollupArtist").json()
+
+    try:
+        client.post("/album/", json={"title": "RollupAlbum", "release_date": "2024-05-01", "artist_id": artist["id"]})
+    except Exception:
+        pass
+    album = client.get("/album/by-name/RollupAlbum").json()
+
+    try:
+        client.post("/song/", json={"title": "RollupSong", "duration": 200, "album_id": album["id"]})
+    except Exception:
+        pass
+
+    # Los acumulados del álbum deben coincidir con sus canciones
+    songs = client.get("/song/", params={"album_id": album["id"]}).json()
+    album = client.get(f"/album/{album['id']}").json()
+    assert album["track_count"] == len(songs)
+    assert album["total_duration"] == sum(song["duration"] for song in songs)
+
+    # Y los del artista con sus álbumes
+    albums = client.get("/album/", params={"artist_id": album["artist_id"]}).json()
+    artist = client.get(f"/artists/{album['artist_id']}").json()
+    assert artist["album_count"] == len(albums)
+    assert artist["track_count"] == sum(a["track_count"] for a in albums)
+
+def test_lookup_by_prefix():
+    client.post("/artist/", json={"stage_name": "LookupArtist", "email": "lookupartist@example.com"})
+    artist = client.get("/artists/by-name/LookupArtist").json()
+    try:
+        for title in ("Lookup Beta", "Lookup Alfa", "lookup gamma", "Otro Lookup"):
+            client.post("/album/", json={"title": title, "artist_id": artist["id"]})
+
+        # Solo los que empiezan por el texto, sin distinguir mayúsculas, ordenados por nombre
+        response = client.get("/album/lookup", params={"q": "LOOKUP"})
+        assert response.status_code == 200
+        assert [item["label"] for item in response.json()] == ["Lookup Alfa", "Lookup Beta", "lookup gamma"]
+
+        response = client.get("/album/lookup", params={"q": "lookup", "limit": 2})
+        assert [item["label"] for item in response.json()] == ["Lookup Alfa", "Lookup Beta"]
+        assert client.get("/album/lookup", params={"q": "Lookup Zeta"}).json() == []
+        assert client.get("/album/lookup", params={"limit": 0}).status_code == 422
+
+        response = client.get("/artists/lookup", params={"q": "lookupart"})
+        assert response.json() == [{"id": artist["id"], "label": "LookupArtist"}]
+    finally:
+        client.delete(f"/artists/{artist['id']}")
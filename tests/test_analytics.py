@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+def test_analytics_follow_writes():
+    genre = "AnalyticsGenre"
+    artist_data = {"stage_name": "AnalyticsArtist", "email": "analyticsartist@example.com", "music_genre": genre}
+    client.post("/artist/", json=artist_data)
+    artist = client.get("/artists/by-name/AnalyticsArtist").json()
+    try:
+        client.post("/album/", json={"title": "AnalyticsAlbum", "artist_id": artist["id"], "release_date": "1987-05-01"})
+        album = client.get("/album/by-name/AnalyticsAlbum").json()
+        client.post("/song/", json={"title": "AnalyticsSong", "duration": 95, "album_id": album["id"]})
+
+        # El resumen en caché se recalcula tras la escritura
+        genres = {row["music_genre"]: row for row in client.get("/analytics/genres").json()}
+        assert genres[genre]["songs"] == 1
+        assert genres[genre]["total_duration"] == 95
+
+        years = {row["year"]: row for row in client.get("/analytics/release-years").json()}
+        assert years[1987]["albums"] >= 1
+
+        response = client.get("/analytics/durations", params={"bucket": 30, "music_genre": genre})
+        assert response.status_code == 200
+        durations = response.json()
+        assert durations["songs"] == 1
+        assert durations["buckets"] == [{"start": 90, "end": 120, "songs": 1}]
+
+        assert client.get("/analytics/durations", params={"bucket": 1}).status_code == 422
+    finally:
+        client.delete(f"/artists/{artist['id']}")
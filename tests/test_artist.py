@@ -38,4 +38,57 @@ def test_delete_artist():
 
     # Verifica que ya no existe
     response = client.get(f"/artists/{artist_id}")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_get_artist_by_name_ignores_accents_and_case():
+    artist_data = {"stage_name": "Ñoño Canción", "email": "nonocancion@example.com"}
+    try:
+        client.post("/artist/", json=artist_data)
+    except Exception:
+        pass
+    artist = client.get("/artists/by-name/Ñoño Canción").json()
+    try:
+        for name in ("nono cancion", "ÑOÑO  CANCIÓN"):
+            response = client.get(f"/artists/by-name/{name}")
+            assert response.status_code == 200
+            assert response.json()["id"] == artist["id"]
+
+        # Un nombre que solo cambia en acentos o mayúsculas es un duplicado
+        try:
+            client.post("/artist/", json={"stage_name": "nono cancion"})
+        except Exception:
+            pass
+        assert all(a["stage_name"] != "nono cancion" for a in client.get("/artist/").json())
+    finally:
+        client.delete(f"/artists/{artist['id']}")
+
+def test_bulk_update_rejects_blank_filters():
+    # Un filtro vacío no filtra nada: no debe acabar en un UPDATE de todos los artistas
+    for blank in ({"q": ""}, {"music_genre": ""}, {"q": "", "country_of_origin": ""}):
+        response = client.patch("/artists/bulk", json={"filter": blank, "set": {"music_genre": "Bulk"}})
+        assert response.status_code == 422
+    assert all(artist["music_genre"] != "Bulk" for artist in client.get("/artist/").json())
+
+def test_put_replaces_and_batch_update_patches():
+    artist_data = {"stage_name": "ReplaceArtist", "music_genre": "Soul", "email": "replaceartist@example.com"}
+    try:
+        client.post("/artist/", json=artist_data)
+    except Exception:
+        pass
+    artist = client.get("/artists/by-name/ReplaceArtist").json()
+    try:
+        # Una modificación en /batch solo cambia los campos enviados
+        response = client.post("/batch", json={"operations": [
+            {"op": "update", "entity": "artist", "id": artist["id"], "data": {"music_genre": "Funk"}}]})
+        assert response.status_code == 200
+        artist = client.get(f"/artists/{artist['id']}").json()
+        assert artist["music_genre"] == "Funk" and artist["email"] == "replaceartist@example.com"
+
+        # PUT reemplaza el artista completo: lo que no se envía queda vacío
+        response = client.put(f"/artist/{artist['id']}", json={"stage_name": "ReplaceArtist", "music_genre": "Funk"})
+        assert response.status_code == 200
+        artist = client.get(f"/artists/{artist['id']}").json()
+        assert artist["music_genre"] == "Funk" and artist.get("email") is None
+    finally:
+        client.delete(f"/artists/{artist['id']}")
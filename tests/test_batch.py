@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+def test_batch_is_atomic():
+    artist_data = {"stage_name": "BatchArtist", "email": "batchartist@example.com"}
+    response = client.post("/batch", json={"operations": [
+        {"op": "create", "entity": "artist", "data": artist_data},
+        {"op": "create", "entity": "album", "data": {"title": "BatchAlbum", "artist_id": "$0"}},
+        {"op": "create", "entity": "song", "data": {"title": "BatchSong1", "duration": 60, "album_id": "$1"}},
+        {"op": "create", "entity": "song", "data": {"title": "BatchSong2", "duration": 90, "album_id": "$1"}},
+        {"op": "delete", "entity": "song", "id": "$3"},
+        {"op": "update", "entity": "album", "id": "$1", "data": {"title": "BatchAlbumRenamed"}},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [201, 201, 201, 201, 200, 200]
+    artist_id, album_id = results[0]["id"], results[1]["id"]
+    try:
+        album = client.get(f"/album/{album_id}").json()
+        assert album["title"] == "BatchAlbumRenamed"
+        assert album["artist_id"] == artist_id
+        assert album["track_count"] == 1 and album["total_duration"] == 60
+
+        # Si una operación falla no se aplica ninguna
+        cursor = client.get("/changes/latest").json()["cursor"]
+        response = client.post("/batch", json={"operations": [
+            {"op": "update", "entity": "album", "id": album_id, "data": {"title": "BatchAlbumLost"}},
+            {"op": "delete", "entity": "song", "id": 999999999},
+        ]})
+        assert response.status_code == 404
+        assert response.json()["index"] == 1
+        assert client.get(f"/album/{album_id}").json()["title"] == "BatchAlbumRenamed"
+        assert client.get("/changes/latest").json()["cursor"] == cursor
+
+        response = client.post("/batch", json={"operations": [{"op": "update", "entity": "song", "id": "$0"}]})
+        assert response.status_code == 422
+    finally:
+        client.delete(f"/artists/{artist_id}")
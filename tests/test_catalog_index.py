@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import catalog_index
+import services
+from db import SessionLocal
+from main import app
+
+client = TestClient(app)
+
+#Columnas por las que se puede ordenar cada listado (las de sort en main.py)
+SORTS = {
+    "artists": ["id", "stage_name", "real_name", "music_genre", "country_of_origin",
+                "album_count", "track_count", "total_duration", "last_release_date"],
+    "albums": ["id", "title", "release_date", "artist_id", "track_count", "total_duration"],
+    "songs": ["id", "title", "duration", "album_id"],
+}
+LISTS = {"artists": services.list_artists, "albums": services.list_albums, "songs": services.list_songs}
+
+def assert_matches_database(index, q):
+    # Mismos ids, totales y valores que la base para cada orden, dirección y página
+    db = SessionLocal()
+    try:
+        for entity, sorts in SORTS.items():
+            for sort in sorts:
+                for descending in (False, True):
+                    for skip, limit in ((0, None), (1, 2)):
+                        rows, total = LISTS[entity](db, skip, limit, sort, descending, q, as_rows=True)
+                        expected = [dict(row._mapping) for row in rows]
+                        assert index.list(entity, skip, limit, sort, descending, q) == (expected, total), (entity, sort)
+    finally:
+        db.close()
+
+def test_index_matches_database_after_refresh():
+    pytest.importorskip("numpy")
+    artists, payloads = [], []
+    for i, genre in enumerate(("Rock", "Pop", "Jazz")):
+        payloads.append({"stage_name": f"IdxArtist {i}", "real_name": f"Real {2 - i}",
+                         "music_genre": genre, "country_of_origin": "MX", "email": f"idx{i}@example.com"})
+        client.post("/artist/", json=payloads[-1])
+        artists.append(client.get(f"/artists/by-name/IdxArtist {i}").json())
+    try:
+        index = catalog_index.CatalogIndex(SessionLocal)
+        index.load()
+        assert_matches_database(index, "idx")
+
+        # Escrituras por la API: altas (con acumulados), modificación y baja
+        for i, artist in enumerate(artists):
+            client.post("/album/", json={"title": f"IdxAlbum {i}", "artist_id": artist["id"],
+                                         "release_date": f"202{i}-05-01"})
+            album = client.get(f"/album/by-name/IdxAlbum {i}").json()
+            for j in range(i + 1):
+                client.post("/song/", json={"title": f"IdxSong {i}{j}", "duration": 100 + 10 * j + i,
+                                            "album_id": album["id"]})
+        response = client.put(f"/artist/{artists[0]['id']}", json={**payloads[0], "music_genre": "Blues"})
+        assert response.status_code == 200
+        song = client.get("/song/by-name/IdxSong 21").json()
+        assert client.delete(f"/song/{song['id']}").status_code == 200
+
+        assert index.refresh() > 0
+        assert_matches_database(index, "idx")
+        assert index.refresh() == 0
+    finally:
+        for artist in artists:
+            client.delete(f"/artists/{artist['id']}")
+
+def test_index_loads_in_background():
+    pytest.importorskip("numpy")
+    available = threading.Event()
+
+    def session_factory():      #base aún no disponible hasta que se marque available
+        if not available.is_set():
+            raise OSError("database not ready")
+        return SessionLocal()
+
+    index = catalog_index.CatalogIndex(session_factory)
+    index.start(interval=0.05)      #no lanza aunque la base no responda
+    previous, catalog_index.index = catalog_index.index, index
+    try:
+        time.sleep(0.2)
+        assert not index.ready
+        assert client.get("/ready").json()["reason"] == "catalog index loading"
+        assert client.get("/song/", params={"limit": 1}).status_code == 200     #mientras tanto, desde la base
+
+        available.set()
+        deadline = time.monotonic() + 5
+        while not index.ready and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert index.ready
+        assert client.get("/ready").json()["status"] == "ready"
+    finally:
+        catalog_index.index = previous
+        index.stop()
@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+def test_changes_feed():
+    cursor = client.get("/changes/latest").json()["cursor"]
+
+    artist_data = {"stage_name": "ChangesArtist", "email": "changesartist@example.com"}
+    client.post("/artist/", json=artist_data)
+    artist = client.get("/artists/by-name/ChangesArtist").json()
+    client.delete(f"/artists/{artist['id']}")
+
+    # Solo llegan los cambios posteriores al cursor, en orden
+    response = client.get("/changes", params={"since": cursor})
+    assert response.status_code == 200
+    feed = response.json()
+    ops = [(c["entity"], c["entity_id"], c["op"]) for c in feed["changes"] if c["entity_id"] == artist["id"]]
+    assert ("artists", artist["id"], "create") in ops
+    assert ops[-1] == ("artists", artist["id"], "delete")
+    seqs = [c["seq"] for c in feed["changes"]]
+    assert seqs == sorted(seqs) and seqs[0] > cursor
+    assert feed["next_cursor"] == seqs[-1]
+
+    # Desde el último cursor no queda nada pendiente
+    response = client.get("/changes", params={"since": feed["next_cursor"]})
+    assert response.json()["changes"] == []
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import db
+import deadlines
+import services
+from main import app
+
+client = TestClient(app)
+
+def _scope(method, path, query_string=b""):
+    return {"type": "http", "method": method, "path": path, "query_string": query_string, "headers": []}
+
+def _interrupted_query() -> OperationalError:
+    # Consulta larga en SQLite cancelada desde otro hilo con deadlines.cancel, como hace el middleware
+    session = Session(create_engine("sqlite://"))
+    session.execute(text("SELECT 1"))      #abre la transacción y registra la conexión
+    timer = threading.Timer(0.2, deadlines.cancel, args=(session,))
+    timer.start()
+    try:
+        session.execute(text("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n"))
+    except OperationalError as exc:
+        return exc
+    finally:
+        timer.cancel()
+        session.close()
+    raise AssertionError("La consulta no se canceló")
+
+def test_statement_timeout_per_route():
+    assert deadlines.statement_timeout_ms(_scope("GET", "/artists/lookup", b"q=a")) == 2000
+    assert deadlines.statement_timeout_ms(_scope("GET", "/album/by-name/Algo")) == 2000
+    assert deadlines.statement_timeout_ms(_scope("GET", "/song/")) == deadlines.EXPORT_STATEMENT_TIMEOUT_MS
+    assert deadlines.statement_timeout_ms(_scope("GET", "/song/", b"limit=10")) == deadlines.STATEMENT_TIMEOUT_MS
+    assert deadlines.statement_timeout_ms(_scope("POST", "/artist/")) == deadlines.STATEMENT_TIMEOUT_MS
+    assert deadlines.statement_timeout_ms(_scope("GET", "/artists/1")) == deadlines.STATEMENT_TIMEOUT_MS
+
+def test_get_db_attaches_deadline():
+    scope = _scope("GET", "/song/lookup")
+    watcher = deadlines._DisconnectWatcher()
+    scope["buenaonda.disconnect"] = watcher
+    sessions = db.get_db(Request(scope))
+    session = next(sessions)
+    try:
+        assert session.info["statement_timeout_ms"] == 2000
+        assert watcher.sessions == [session]
+    finally:
+        sessions.close()
+
+def test_canceled_query_returns_504(monkeypatch):
+    error = _interrupted_query()
+    assert deadlines.is_query_canceled(error)
+
+    def canceled(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(services, "get_artist_by_id", canceled)
+    response = client.get("/artists/1")
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Query exceeded its deadline"}
+
+    # statement_timeout de PostgreSQL: SQLSTATE 57014
+    class QueryCanceled(Exception):
+        pgcode = deadlines.QUERY_CANCELED
+
+    def timed_out(*args, **kwargs):
+        raise OperationalError("SELECT ...", {}, QueryCanceled("canceling statement due to statement timeout"))
+    monkeypatch.setattr(services, "get_artist_by_id", timed_out)
+    assert client.get("/artists/1").status_code == 504
+
+def test_disconnect_cancels_queries():
+    canceled = threading.Event()
+
+    class Connection:
+        def cancel(self):
+            canceled.set()
+
+    async def endpoint(scope, receive, send):
+        # Registra una "sesión" y espera, como una consulta en curso, a que la cancelen
+        session = Session()
+        session.info["dbapi_connection"] = Connection()
+        scope["buenaonda.disconnect"].sessions.append(session)
+        assert (await receive())["body"] == b"{}"
+        for _ in range(100):
+            if canceled.is_set():
+                return
+            await asyncio.sleep(0.01)
+
+    async def run():
+        messages = [{"type": "http.request", "body": b"{}", "more_body": False}, {"type": "http.disconnect"}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+        await deadlines.CancelOnDisconnectMiddleware(endpoint)(_scope("GET", "/song/"), receive, send)
+
+    asyncio.run(run())
+    assert canceled.is_set()
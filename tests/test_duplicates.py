@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+def test_near_duplicates_within_artist():
+    response = client.post("/batch", json={"operations": [
+        {"op": "create", "entity": "artist", "data": {"stage_name": "DupArtist", "email": "dupartist@example.com"}},
+        {"op": "create", "entity": "artist", "data": {"stage_name": "DupOther", "email": "dupother@example.com"}},
+        {"op": "create", "entity": "album", "data": {"title": "Dup Album", "artist_id": "$0"}},
+        {"op": "create", "entity": "album", "data": {"title": "Dup Album", "artist_id": "$1"}},
+        {"op": "create", "entity": "song", "data": {"title": "Dakiti", "duration": 200, "album_id": "$2"}},
+    ]})
+    assert response.status_code == 200     #el mismo título con otro artista no es un duplicado
+    artist_id, other_id, album_id, other_album_id, song_id = [result["id"] for result in response.json()["results"]]
+    try:
+        response = client.get("/duplicates/song", params={"name": "DÁKITI (feat. Jhay Cortez)", "album_id": album_id})
+        assert response.status_code == 200
+        assert response.json() == [{"id": song_id, "label": "Dakiti", "similarity": 1.0}]
+        # Otro artista: no se compara con sus canciones
+        assert client.get("/duplicates/song", params={"name": "Dakiti", "album_id": other_album_id}).json() == []
+        assert client.get("/duplicates/album", params={"name": "Dup Album"}).status_code == 422
+
+        response = client.post("/album/", json={"title": "DupAlbum!", "artist_id": artist_id})
+        assert response.status_code == 200
+        assert response.headers["X-Possible-Duplicates"] == str(album_id)
+    finally:
+        client.delete(f"/artists/{artist_id}")
+        client.delete(f"/artists/{other_id}")
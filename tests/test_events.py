@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import events
+from events_st import EventListener
+from main import app
+
+client = TestClient(app)
+
+class Request:      #lo único que usa EventBroker.stream de la petición
+    async def is_disconnected(self):
+        return False
+
+def _parse(message: bytes) -> tuple[str, dict]:
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+def test_slow_subscriber_gets_reset():
+    async def run():
+        broker = events.EventBroker(queue_size=2)
+        stream = broker.stream(Request())
+        assert (await stream.__anext__()).startswith(b"retry:")
+        broker._fanout([events._encode("change", {"entity": "songs", "op": "update", "ids": [i]}) for i in range(3)])
+        # La cola se llenó: se descartan los avisos pendientes y queda solo el reset
+        assert await stream.__anext__() == events.RESET
+        broker.close()
+        assert [message async for message in stream] == []
+        assert broker.subscriber_count == 0
+    asyncio.run(run())
+
+def test_commit_publishes_grouped_change():
+    async def run():
+        previous = events.broker._loop
+        events.broker.bind(asyncio.get_running_loop())
+        stream = events.broker.stream(Request())
+        try:
+            await stream.__anext__()
+            response = await asyncio.to_thread(client.post, "/batch", json={"operations": [
+                {"op": "create", "entity": "artist", "data": {"stage_name": "EventArtist1", "email": "event1@example.com"}},
+                {"op": "create", "entity": "artist", "data": {"stage_name": "EventArtist2", "email": "event2@example.com"}},
+            ]})
+            assert response.status_code == 200
+            ids = [result["id"] for result in response.json()["results"]]
+            # Un solo commit: un aviso con los dos ids
+            event, data = _parse(await asyncio.wait_for(stream.__anext__(), 5))
+            assert (event, data) == ("change", {"entity": "artists", "op": "create", "ids": ids})
+            return ids
+        finally:
+            await stream.aclose()
+            events.broker._loop = previous
+    ids = asyncio.run(run())
+    for artist_id in ids:
+        client.delete(f"/artists/{artist_id}")
+
+def test_listener_marks_changed_items_stale():
+    listener = EventListener("http://127.0.0.1:9")     #sin servidor: el hilo de fondo no recibe nada
+    try:
+        start = listener.version
+        listener._apply("change", {"entity": "songs", "op": "update", "ids": [7]})
+        assert listener.is_stale("songs", start) and listener.is_stale(("songs", 7), start)
+        assert not listener.is_stale(("songs", 8), start)
+        assert not listener.is_stale("albums", start)
+        assert not listener.is_stale(("songs", 7), listener.version)
+
+        # Tras un reset todo lo pedido antes queda obsoleto
+        listener._apply("reset", {})
+        assert listener.is_stale("albums", start) and listener.is_stale(("songs", 8), start)
+        assert not listener.is_stale("albums", listener.version)
+    finally:
+        listener.close()
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+def test_health():
+    # /health no depende de la base de datos
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+def test_ready():
+    # /ready hace SELECT 1 y revisa que quede margen en el pool
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["pool"]["available"] >= 1
+
+def test_metrics():
+    # /metrics no pasa por el control de admisión y cuenta las peticiones admitidas
+    client.get("/song/", params={"limit": 1})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    admission = response.json()["admission"]
+    assert admission["by_priority"]["normal"]["admitted"] >= 1
+    assert admission["in_flight"] == 0
+    assert set(admission["shed_reasons"]) == {"queue_full", "timeout", "evicted"}
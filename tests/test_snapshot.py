@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+
+import models
+import snapshot
+from db import get_engine
+from main import app
+
+client = TestClient(app)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#La API en modo solo lectura (BUENAONDA_SNAPSHOT_PATH se lee al importar main) en un proceso aparte
+READ_ONLY_APP = """
+import json, os, sys
+from fastapi.testclient import TestClient
+from main import app
+client = TestClient(app)
+result = {
+    "artists": len(client.get("/artist/").json()),
+    "post": client.post("/artist/", json={"stage_name": "SnapshotWrite"}).status_code,
+    "delete": client.delete("/artists/1").status_code,
+}
+os.remove(os.environ["BUENAONDA_SNAPSHOT_PATH"])
+result["missing"] = client.get("/artist/").status_code
+print(json.dumps(result))
+"""
+
+def test_export_snapshot_and_reader():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite")
+        counts = snapshot.export_snapshot(get_engine(), path)
+        assert counts["artist"] == len(client.get("/artist/").json())
+        assert counts["album"] == len(client.get("/album/").json())
+        assert counts["song"] == len(client.get("/song/").json())
+        assert os.listdir(directory) == ["catalog.sqlite"]      #sin temporales
+
+        reader = snapshot.SnapshotReader(path)
+        session = reader.session()
+        try:
+            for model in (models.Artist, models.Album, models.Song):
+                assert session.scalar(select(func.count()).select_from(model)) == counts[model.__tablename__]
+            with pytest.raises(OperationalError):
+                session.execute(insert(models.Artist).values(stage_name="SnapshotWrite", version=1))
+        finally:
+            session.close()
+        reader._engine.dispose()
+
+def test_missing_snapshot_returns_503():
+    reader = snapshot.SnapshotReader(os.path.join(tempfile.gettempdir(), "missing-snapshot.sqlite"))
+    scope = {"type": "http", "method": "GET", "path": "/artist/", "query_string": b"", "headers": []}
+    with pytest.raises(HTTPException) as error:
+        next(reader.get_db(Request(scope)))
+    assert error.value.status_code == 503
+
+def test_read_only_mode():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.sqlite")
+        counts = snapshot.export_snapshot(get_engine(), path)
+        env = {**os.environ, "BUENAONDA_SNAPSHOT_PATH": path}
+        output = subprocess.run([sys.executable, "-c", READ_ONLY_APP], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        assert result == {"artists": counts["artist"], "post": 405, "delete": 405, "missing": 503}
@@ -81,4 +81,141 @@ def test_delete_song():
 
     # Verifica que ya no existe
     response = client.get(f"/song/{song_id}")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_list_songs_paginated():
+    # Lista completa (sin limit) para comparar con el total paginado
+    full_resp = client.get("/song/")
+    assert full_resp.status_code == 200
+    total = len(full_resp.json())
+    assert full_resp.headers["X-Total-Count"] == str(total)
+
+    # Primera página de tamaño 1, ordenada por id descendente
+    page_resp = client.get("/song/", params={"skip": 0, "limit": 1, "sort": "id", "order": "desc"})
+    assert page_resp.status_code == 200
+    page = page_resp.json()
+    assert len(page) == min(1, total)
+    assert page_resp.headers["X-Total-Count"] == str(total)
+    if page:
+        assert page[0]["id"] == max(song["id"] for song in full_resp.json())
+
+    # Columna de orden no permitida
+    response = client.get("/song/", params={"sort": "no_existe"})
+    assert response.status_code == 422
+
+
+def test_get_songs_batch():
+    songs = client.get("/song/", params={"limit": 3}).json()
+    ids = [song["id"] for song in reversed(songs)]
+
+    # Respeta el orden pedido, ignora duplicados e ids inexistentes
+    response = client.get("/song/batch", params={"ids": ",".join(str(i) for i in ids + ids[:1] + [999999999])})
+    assert response.status_code == 200
+    assert [song["id"] for song in response.json()] == ids
+
+    response = client.get("/song/batch", params={"ids": "1,abc"})
+    assert response.status_code == 422
+
+
+def test_get_songs_include_album_artist():
+    songs = client.get("/song/", params={"limit": 3, "include": "album.artist"}).json()
+    for song in songs:
+        assert song["album"]["id"] == song["album_id"]
+        assert song["album"]["artist"]["id"] == song["album"]["artist_id"]
+        assert "songs" not in song["album"]
+
+    # Sin include no se embeben relaciones
+    songs = client.get("/song/", params={"limit": 3}).json()
+    assert all("album" not in song for song in songs)
+    if songs:
+        song = client.get(f"/song/{songs[0]['id']}", params={"include": "album"}).json()
+        assert song["album"]["id"] == songs[0]["album_id"]
+
+    response = client.get("/song/", params={"include": "producers"})
+    assert response.status_code == 400
+
+
+def test_list_songs_arrow_and_parquet():
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    import io
+
+    params = {"limit": 5, "sort": "title"}
+    expected = client.get("/song/", params=params)
+    rows = expected.json()
+
+    response = client.get("/song/", params=params, headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert response.headers["X-Total-Count"] == expected.headers["X-Total-Count"]
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["id", "title", "duration", "album_id", "version"]
+    assert table.to_pylist() == [{key: row[key] for key in table.column_names} for row in rows]
+
+    response = client.get("/song/", params=params, headers={"Accept": "application/vnd.apache.parquet"})
+    assert response.status_code == 200
+    assert pq.read_table(io.BytesIO(response.content)).equals(table)
+
+    # Las relaciones embebidas solo existen en JSON
+    response = client.get("/song/", params={"include": "album"},
+                          headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 400
+
+
+def test_bulk_move_songs():
+    client.post("/artist/", json={"stage_name": "BulkArtist", "email": "bulkartist@example.com"})
+    artist = client.get("/artists/by-name/BulkArtist").json()
+    try:
+        for title in ("BulkFrom", "BulkTo"):
+            client.post("/album/", json={"title": title, "artist_id": artist["id"]})
+        source = client.get("/album/by-name/BulkFrom").json()
+        target = client.get("/album/by-name/BulkTo").json()
+        for i in range(3):
+            client.post("/song/", json={"title": f"BulkSong{i}", "duration": 60, "album_id": source["id"]})
+
+        # Un solo UPDATE mueve todas las canciones del álbum y recalcula los acumulados de ambos
+        response = client.patch("/song/bulk", json={"filter": {"album_id": source["id"]},
+                                                    "set": {"album_id": target["id"]}})
+        assert response.status_code == 200
+        assert response.json()["updated"] == 3
+        assert client.get(f"/album/{source['id']}").json()["track_count"] == 0
+        target = client.get(f"/album/{target['id']}").json()
+        assert target["track_count"] == 3 and target["total_duration"] == 180
+
+        response = client.patch("/song/bulk", json={"filter": {}, "set": {"duration": 1}})
+        assert response.status_code == 422
+    finally:
+        client.delete(f"/artists/{artist['id']}")
+
+def test_update_song_if_match():
+    client.post("/artist/", json={"stage_name": "VersionArtist", "email": "versionartist@example.com"})
+    artist = client.get("/artists/by-name/VersionArtist").json()
+    try:
+        client.post("/album/", json={"title": "VersionAlbum", "artist_id": artist["id"]})
+        album = client.get("/album/by-name/VersionAlbum").json()
+        client.post("/song/", json={"title": "VersionSong", "duration": 60, "album_id": album["id"]})
+        song = client.get("/song/by-name/VersionSong").json()
+        response = client.get(f"/song/{song['id']}")
+        assert response.json()["version"] == 1 and response.headers["ETag"] == '"1"'
+
+        edit = {"title": "VersionSong", "duration": 90, "album_id": album["id"]}
+        response = client.put(f"/song/{song['id']}", json=edit, headers={"If-Match": '"1"'})
+        assert response.status_code == 200
+        assert response.json()["version"] == 2 and response.headers["ETag"] == '"2"'
+
+        # Otra edición con la versión ya superada no pisa la anterior
+        response = client.put(f"/song/{song['id']}", json={**edit, "duration": 30}, headers={"If-Match": '"1"'})
+        assert response.status_code == 412
+        assert response.json()["version"] == 2
+        assert client.get(f"/song/{song['id']}").json()["duration"] == 90
+        assert client.delete(f"/song/{song['id']}", headers={"If-Match": '"1"'}).status_code == 412
+
+        # Los acumulados del álbum no cambian su versión; las modificaciones en bloque sí
+        album = client.get(f"/album/{album['id']}").json()
+        assert album["total_duration"] == 90 and album["version"] == 1
+        client.patch("/song/bulk", json={"filter": {"ids": [song["id"]]}, "set": {"duration": 120}})
+        assert client.get(f"/song/{song['id']}").json()["version"] == 3
+
+        assert client.delete(f"/song/{song['id']}", headers={"If-Match": '"3"'}).status_code == 200
+    finally:
+        client.delete(f"/artists/{artist['id']}")